@@ -1,128 +1,311 @@
+-- Reference copy of the schema produced by `flask db upgrade`.
+-- Do not edit by hand: change the schema with a new script in migrations/.
+
+CREATE TABLE schema_migrations (version INTEGER NOT NULL PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at DATETIME NOT NULL);
+
 CREATE TABLE users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE NOT NULL,
-    email TEXT UNIQUE NOT NULL,
-    password_hash TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    id INTEGER NOT NULL,
+    username VARCHAR(80) NOT NULL,
+    email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(128),
+    created_at DATETIME,
+    bio TEXT,
+    PRIMARY KEY (id),
+    UNIQUE (username),
+    UNIQUE (email)
 );
 
 CREATE TABLE adventure_locations (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name VARCHAR(100) NOT NULL,
     description TEXT,
-    category TEXT NOT NULL,
-    difficulty INTEGER CHECK(difficulty BETWEEN 1 AND 5),
-    latitude REAL,
-    longitude REAL,
+    category VARCHAR(50) NOT NULL,
+    difficulty INTEGER,
+    latitude FLOAT,
+    longitude FLOAT,
     weather_info TEXT,
-    average_rating REAL DEFAULT 0,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    average_rating FLOAT,
+    created_at DATETIME, name_key VARCHAR(100),
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE budgets (
+    id INTEGER NOT NULL,
+    transport INTEGER,
+    accommodation INTEGER,
+    food INTEGER,
+    gear INTEGER,
+    total INTEGER,
+    created_at DATETIME, user_id INTEGER REFERENCES users (id), content_key VARCHAR(64),
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE packing_items (
+    id INTEGER NOT NULL,
+    adventure_type VARCHAR(50) NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    category VARCHAR(50),
+    is_default BOOLEAN,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE user_preferences (
+    user_id INTEGER NOT NULL,
+    preferred_categories TEXT,
+    difficulty_level INTEGER,
+    budget_range TEXT,
+    last_updated DATETIME,
+    PRIMARY KEY (user_id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
 );
 
 CREATE TABLE trips (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INTEGER NOT NULL,
     user_id INTEGER NOT NULL,
     location_id INTEGER NOT NULL,
     start_date DATE NOT NULL,
     end_date DATE NOT NULL,
-    budget_estimate REAL,
-    shared_publicly BOOLEAN DEFAULT FALSE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users (id),
-    FOREIGN KEY (location_id) REFERENCES adventure_locations (id)
+    budget_estimate FLOAT,
+    shared_publicly BOOLEAN,
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id),
+    FOREIGN KEY(location_id) REFERENCES adventure_locations (id)
 );
 
-CREATE TABLE packing_checklist (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    trip_id INTEGER NOT NULL,
-    item_name TEXT NOT NULL,
-    is_checked BOOLEAN DEFAULT FALSE,
-    category TEXT NOT NULL,
-    FOREIGN KEY (trip_id) REFERENCES trips (id)
+CREATE TABLE user_interests (
+    id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    activity_type VARCHAR(50) NOT NULL,
+    experience_level VARCHAR(20),
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
 );
 
-CREATE TABLE user_preferences (
-    user_id INTEGER PRIMARY KEY,
-    preferred_categories TEXT,
-    difficulty_level INTEGER CHECK(difficulty_level BETWEEN 1 AND 5),
-    budget_range TEXT,
-    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users (id)
+CREATE TABLE user_submitted_spots (
+    id INTEGER NOT NULL,
+    spot_name VARCHAR(100) NOT NULL,
+    location VARCHAR(100) NOT NULL,
+    description TEXT,
+    contributor_id INTEGER,
+    contributor_name VARCHAR(80),
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(contributor_id) REFERENCES users (id)
 );
 
-CREATE TABLE adventure_reviews (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
+CREATE TABLE notifications (
+    id INTEGER NOT NULL,
     user_id INTEGER NOT NULL,
-    location_id INTEGER NOT NULL,
-    rating INTEGER CHECK(rating BETWEEN 1 AND 5),
-    review_text TEXT,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users (id),
-    FOREIGN KEY (location_id) REFERENCES adventure_locations (id)
+    message TEXT NOT NULL,
+    read BOOLEAN,
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
 );
 
 CREATE TABLE itinerary_items (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INTEGER NOT NULL,
     trip_id INTEGER NOT NULL,
-    activity_name TEXT NOT NULL,
-    start_time DATETIME,
-    end_time DATETIME,
+    activity_name VARCHAR(200) NOT NULL,
+    start_time DATETIME NOT NULL,
+    end_time DATETIME NOT NULL,
     notes TEXT,
-    FOREIGN KEY (trip_id) REFERENCES trips (id)
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(trip_id) REFERENCES trips (id)
 );
 
-CREATE TABLE travel_buddies (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
+CREATE TABLE reviews (
+    id INTEGER NOT NULL,
+    place_name VARCHAR(200) NOT NULL,
+    rating INTEGER NOT NULL,
+    comment TEXT,
+    picture_filename VARCHAR(200),
     user_id INTEGER NOT NULL,
-    available_from DATE,
-    available_to DATE,
-    preferred_location_ids TEXT,
-    status TEXT CHECK(status IN ('open', 'connected', 'closed')),
-    FOREIGN KEY (user_id) REFERENCES users (id)
-);
-
-CREATE TABLE buddy_matches (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_1_id INTEGER NOT NULL,
-    user_2_id INTEGER NOT NULL,
-    trip_id INTEGER,
-    status TEXT CHECK(status IN ('pending', 'accepted', 'rejected')),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_1_id) REFERENCES users (id),
-    FOREIGN KEY (user_2_id) REFERENCES users (id),
-    FOREIGN KEY (trip_id) REFERENCES trips (id)
-);
-
-CREATE TABLE social_shares (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at DATETIME, location_id INTEGER REFERENCES adventure_locations (id),
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE user_emergency_contacts (
+    id INTEGER NOT NULL,
     user_id INTEGER NOT NULL,
-    trip_id INTEGER NOT NULL,
-    platform TEXT NOT NULL,
-    shared_link TEXT,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users (id),
-    FOREIGN KEY (trip_id) REFERENCES trips (id)
+    contact_name VARCHAR(100) NOT NULL,
+    phone_number VARCHAR(20) NOT NULL,
+    relationship VARCHAR(50),
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE user_medical_reports (
+    id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    condition_name VARCHAR(150) NOT NULL,
+    notes TEXT,
+    reported_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE suggested_events (
+    id INTEGER NOT NULL,
+    name VARCHAR(150) NOT NULL,
+    description TEXT,
+    location_text VARCHAR(250) NOT NULL,
+    event_date DATE NOT NULL,
+    event_time TIME,
+    category VARCHAR(80),
+    user_id INTEGER NOT NULL,
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
 );
 
-CREATE TABLE emergency_contacts (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
+CREATE TABLE user_adventure_difficulty_feedback (
+    id INTEGER NOT NULL,
+    adventure_location_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    submitted_difficulty INTEGER NOT NULL,
+    comment TEXT,
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(adventure_location_id) REFERENCES adventure_locations (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE user_suggestions (
+    id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
     location_id INTEGER NOT NULL,
-    contact_name TEXT NOT NULL,
-    phone TEXT NOT NULL,
-    type TEXT CHECK(type IN ('hospital', 'rescue', 'police')),
-    FOREIGN KEY (location_id) REFERENCES adventure_locations (id)
+    score INTEGER NOT NULL,
+    computed_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id),
+    FOREIGN KEY(location_id) REFERENCES adventure_locations (id)
+);
+
+CREATE TABLE user_suggestion_state (
+    user_id INTEGER NOT NULL,
+    fingerprint VARCHAR(200) NOT NULL,
+    computed_at DATETIME,
+    PRIMARY KEY (user_id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE import_checkpoints (
+    id INTEGER NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    source VARCHAR(500) NOT NULL,
+    fingerprint VARCHAR(64) NOT NULL,
+    rows_read INTEGER NOT NULL,
+    rows_inserted INTEGER NOT NULL,
+    completed_at DATETIME,
+    updated_at DATETIME,
+    PRIMARY KEY (id),
+    CONSTRAINT uq_import_checkpoints_kind_source UNIQUE (kind, source)
 );
 
-CREATE TABLE system_settings (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    setting_key TEXT UNIQUE NOT NULL,
-    setting_value TEXT,
-    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+CREATE TABLE review_rating_aggregates (
+    place_key VARCHAR(200) NOT NULL,
+    place_name VARCHAR(200) NOT NULL,
+    review_count INTEGER NOT NULL,
+    rating_sum INTEGER NOT NULL,
+    stars_1 INTEGER NOT NULL,
+    stars_2 INTEGER NOT NULL,
+    stars_3 INTEGER NOT NULL,
+    stars_4 INTEGER NOT NULL,
+    stars_5 INTEGER NOT NULL,
+    updated_at DATETIME,
+    PRIMARY KEY (place_key)
 );
 
--- Create indexes for better query performance
-CREATE INDEX idx_trips_user ON trips(user_id);
-CREATE INDEX idx_trips_location ON trips(location_id);
-CREATE INDEX idx_checklist_trip ON packing_checklist(trip_id);
-CREATE INDEX idx_reviews_location ON adventure_reviews(location_id);
-CREATE INDEX idx_reviews_user ON adventure_reviews(user_id);
+CREATE TABLE notification_counters (
+    user_id INTEGER NOT NULL,
+    unread INTEGER NOT NULL,
+    PRIMARY KEY (user_id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE notification_outbox (
+    id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE location_cost_factors (
+    location_id INTEGER NOT NULL,
+    transport FLOAT NOT NULL,
+    accommodation FLOAT NOT NULL,
+    food FLOAT NOT NULL,
+    gear FLOAT NOT NULL,
+    PRIMARY KEY (location_id),
+    FOREIGN KEY(location_id) REFERENCES adventure_locations (id)
+);
+
+CREATE TABLE trip_location_spans (
+    location_id INTEGER NOT NULL,
+    max_span_days INTEGER NOT NULL,
+    PRIMARY KEY (location_id),
+    FOREIGN KEY(location_id) REFERENCES adventure_locations (id)
+);
+
+CREATE INDEX ix_user_suggestions_user_rank ON user_suggestions (user_id, rank);
+
+CREATE INDEX ix_adventure_locations_category_id ON adventure_locations (category, id);
+
+CREATE INDEX ix_adventure_locations_name ON adventure_locations (name);
+
+CREATE INDEX ix_packing_items_adventure_type ON packing_items (adventure_type);
+
+CREATE INDEX ix_suggested_events_date_time ON suggested_events (event_date, event_time);
+
+CREATE INDEX ix_suggested_events_category_date ON suggested_events (category, event_date);
+
+CREATE INDEX ix_suggested_events_created_at ON suggested_events (created_at);
+
+CREATE INDEX ix_reviews_created_at ON reviews (created_at);
+
+CREATE INDEX ix_user_submitted_spots_created_at ON user_submitted_spots (created_at);
+
+CREATE INDEX ix_user_interests_activity_user ON user_interests (activity_type, user_id);
+
+CREATE INDEX ix_trips_location_dates ON trips (location_id, start_date, end_date);
+
+CREATE INDEX ix_trips_user_start ON trips (user_id, start_date);
+
+CREATE INDEX ix_itinerary_items_trip_start ON itinerary_items (trip_id, start_time);
+
+CREATE INDEX ix_notifications_user_created ON notifications (user_id, created_at);
+
+CREATE INDEX ix_user_interests_user ON user_interests (user_id);
+
+CREATE INDEX ix_reviews_user ON reviews (user_id);
+
+CREATE INDEX ix_user_submitted_spots_contributor ON user_submitted_spots (contributor_id);
+
+CREATE INDEX ix_user_emergency_contacts_user_created ON user_emergency_contacts (user_id, created_at);
+
+CREATE INDEX ix_user_medical_reports_user_reported ON user_medical_reports (user_id, reported_at);
+
+CREATE INDEX ix_suggested_events_user ON suggested_events (user_id);
+
+CREATE INDEX ix_difficulty_feedback_location ON user_adventure_difficulty_feedback (adventure_location_id);
+
+CREATE INDEX ix_difficulty_feedback_user ON user_adventure_difficulty_feedback (user_id);
+
+CREATE INDEX ix_user_suggestions_location ON user_suggestions (location_id);
+
+CREATE INDEX ix_adventure_locations_name_key ON adventure_locations (name_key);
+
+CREATE INDEX ix_reviews_location_created ON reviews (location_id, created_at);
+
+CREATE INDEX ix_budgets_user_created ON budgets (user_id, created_at);
+
+CREATE UNIQUE INDEX ux_budgets_user_content ON budgets (user_id, content_key);
@@ -1,104 +1,193 @@
-from flask import Blueprint, render_template, jsonify, request, session, redirect, url_for
-from models import db, AdventureLocation, UserInterest, UserPreference, Trip, User
+from flask import Blueprint, render_template, jsonify, request, session, redirect, url_for, abort
+from models import db, AdventureLocation, UserInterest, UserPreference, Trip, User, Review
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from datetime import datetime
-from utils import format_difficulty # Import the filter function
+from utils import format_difficulty, encode_cursor, decode_id_cursor, keyset_page, login_required # Import the filter function
+from suggestion_engine import get_suggestions
+from suggestion_cache import suggestion_cache
+from geo_index import search_nearby
+from suggestion_batch import get_materialized_suggestions
+from query_budget import query_budget
+from db_profile import read_only_db
+from review_stats import rating_summary
 
 adventure_suggestions_bp = Blueprint('adventure_suggestions', __name__, url_prefix='/adventure')
 
-def get_adventure_suggestions(user_id):
-    interests = UserInterest.query.filter_by(user_id=user_id).all()
-    preferences = UserPreference.query.filter_by(user_id=user_id).first()
-    past_trips = Trip.query.filter_by(user_id=user_id).all()
-    query = AdventureLocation.query
-    locations = query.all()
-    location_scores = {}
-    
-    for location in locations:
-        score = 0
-        
-        if interests:
-            for interest in interests:
-                if interest.activity_type == location.category:
-                    score += 2
-        
-        if past_trips:
-            for trip in past_trips:
-                if trip.location_id == location.id:
-                    score += 1
-        
-        if preferences:
-            if preferences.preferred_categories:
-                categories = [cat.strip() for cat in preferences.preferred_categories.split(',')]
-                if location.category in categories:
-                    score += 1
-        
-        location_scores[location.id] = {
-            'location': location,
-            'score': score
-        }
-    
-    sorted_locations = sorted(
-        location_scores.values(),
-        key=lambda x: x['score'],
-        reverse=True
+MAX_NEARBY_RADIUS_KM = 500
+LOCATION_REVIEWS_SHOWN = 10
+
+def get_adventure_suggestions(user_id, limit=10, offset=0):
+    return get_suggestions(user_id, k=limit, offset=offset)
+
+# Enough characters for the template's ``truncate(100)`` to produce the same
+# output as it would on the full description
+LISTING_DESCRIPTION_CHARS = 106
+
+def _listing_page(extra_columns=()):
+    """Keyset-paginated slice of the location catalog for the listing views.
+
+    Reads ``category``, ``after``, ``before`` and ``per_page`` from the query
+    string and loads only the listed columns. Raises ValueError for a bad cursor.
+    """
+    category = request.args.get('category') or None
+    per_page = min(max(request.args.get('per_page', 24, type=int), 1), 100)
+    after = decode_id_cursor(request.args.get('after'))
+    before = decode_id_cursor(request.args.get('before'))
+
+    query = db.session.query(
+        AdventureLocation.id,
+        AdventureLocation.name,
+        AdventureLocation.category,
+        func.substr(AdventureLocation.description, 1, LISTING_DESCRIPTION_CHARS).label('description'),
+        *extra_columns
     )
-    
-    top_suggestions = sorted_locations[:10]
-    
-    return [{
-        'id': loc['location'].id,
-        'name': loc['location'].name,
-        'description': loc['location'].description,
-        'category': loc['location'].category,
-        'score': loc['score'],
-        'latitude': loc['location'].latitude,
-        'longitude': loc['location'].longitude,
-        'weather_info': loc['location'].weather_info
-    } for loc in top_suggestions]
+    if category:
+        # Served by the (category, id) index
+        query = query.filter(AdventureLocation.category == category)
+    rows, next_key, prev_key = keyset_page(query, [AdventureLocation.id], lambda row: [row.id],
+                                           per_page, after=after, before=before)
+    return {
+        'rows': rows,
+        'category': category,
+        'per_page': per_page,
+        'next_cursor': encode_cursor(next_key) if next_key else None,
+        'prev_cursor': encode_cursor(prev_key) if prev_key else None
+    }
 
 @adventure_suggestions_bp.route('/suggestions', methods=['GET'])
+@query_budget(3)
+@read_only_db
 def show_suggestions():
-    query = AdventureLocation.query
-    
-    suggestions = query.all()
-    
+    try:
+        page = _listing_page()
+    except ValueError:
+        abort(400)
+
     processed_suggestions = [{
-        'id': loc.id,
-        'name': loc.name,
-        'description': loc.description,
-        'category': loc.category,
-        'latitude': loc.latitude,
-        'longitude': loc.longitude
-    } for loc in suggestions]
+        'id': row.id,
+        'name': row.name,
+        'description': row.description,
+        'category': row.category
+    } for row in page['rows']]
+    categories = [c for (c,) in db.session.query(AdventureLocation.category).distinct().order_by(AdventureLocation.category)]
 
     return render_template('adventure_suggestions.html', 
-                           suggestions=processed_suggestions)
+                           suggestions=processed_suggestions,
+                           categories=categories,
+                           selected_category=page['category'],
+                           per_page=page['per_page'],
+                           next_cursor=page['next_cursor'],
+                           prev_cursor=page['prev_cursor'])
+
+@adventure_suggestions_bp.route('/api/locations', methods=['GET'])
+@read_only_db
+def api_list_locations():
+    try:
+        page = _listing_page(extra_columns=(AdventureLocation.latitude, AdventureLocation.longitude))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    return jsonify({
+        'locations': [{
+            'id': row.id,
+            'name': row.name,
+            'description': row.description,
+            'category': row.category,
+            'latitude': row.latitude,
+            'longitude': row.longitude
+        } for row in page['rows']],
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor']
+    })
 
 @adventure_suggestions_bp.route('/api/suggestions', methods=['GET'])
 def api_get_suggestions():
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
-    
-    suggestions = get_adventure_suggestions(session['user_id'])
-    user_prefs = UserPreference.query.filter_by(user_id=session['user_id']).first()
+
+    user_id = session['user_id']
+    return jsonify(suggestion_cache.get_or_compute(user_id, lambda: build_suggestions_payload(user_id)))
+
+def build_suggestions_payload(user_id):
+    # Served from the precompute-suggestions table when available
+    suggestions = get_materialized_suggestions(user_id)
+    if suggestions is None:
+        suggestions = get_adventure_suggestions(user_id)
+    user_prefs = UserPreference.query.filter_by(user_id=user_id).first()
     user_difficulty_pref = user_prefs.difficulty_level if user_prefs and user_prefs.difficulty_level is not None else 0
     
     # Also, let's fetch user interests to display them as before
-    user_interests_records = UserInterest.query.filter_by(user_id=session['user_id']).all()
+    user_interests_records = UserInterest.query.filter_by(user_id=user_id).all()
     user_interests_data = [{'activity': interest.activity_type, 'level': interest.experience_level} for interest in user_interests_records]
 
-    return jsonify({
+    return {
         'suggestions': suggestions,
         'user_difficulty_preference': user_difficulty_pref,
         'user_interests': user_interests_data # Sending this back as it was used in the HTML
+    }
+
+@adventure_suggestions_bp.route('/api/suggestions/cache-stats', methods=['GET'])
+@login_required
+def api_suggestion_cache_stats():
+    return jsonify(suggestion_cache.stats())
+
+@adventure_suggestions_bp.route('/api/nearby', methods=['GET'])
+@read_only_db
+def api_nearby_locations():
+    """Locations near ``lat``/``lon``, closest first.
+
+    Filters by ``radius_km`` (default 25) or, when all four are given, by the
+    ``min_lat``/``max_lat``/``min_lon``/``max_lon`` box. Paginated with
+    ``page`` and ``per_page``.
+    """
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({'error': 'lat and lon are required and must be valid coordinates'}), 400
+
+    box_args = [request.args.get(key, type=float) for key in ('min_lat', 'max_lat', 'min_lon', 'max_lon')]
+    box = None
+    radius_km = None
+    if all(value is not None for value in box_args):
+        box = tuple(box_args)
+        if box[0] > box[1] or box[2] > box[3]:
+            return jsonify({'error': 'Bounding box minimums must not exceed maximums'}), 400
+    else:
+        radius_km = request.args.get('radius_km', 25.0, type=float)
+        if not (0 < radius_km <= MAX_NEARBY_RADIUS_KM):
+            return jsonify({'error': f'radius_km must be between 0 and {MAX_NEARBY_RADIUS_KM}'}), 400
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+
+    total, results = search_nearby(lat, lon, radius_km=radius_km, box=box,
+                                   limit=per_page, offset=(page - 1) * per_page)
+    return jsonify({
+        'results': [{
+            'id': location.id,
+            'name': location.name,
+            'category': location.category,
+            'difficulty': location.difficulty,
+            'latitude': location.latitude,
+            'longitude': location.longitude,
+            'distance_km': round(distance, 3)
+        } for location, distance in results],
+        'total': total,
+        'page': page,
+        'per_page': per_page
     })
 
 @adventure_suggestions_bp.route('/location/<int:adventure_id>')
+@read_only_db
 def adventure_detail(adventure_id):
     location = AdventureLocation.query.get_or_404(adventure_id)
+    # Served by ix_reviews_location_created
+    reviews = location.reviews.options(joinedload(Review.user))\
+        .order_by(Review.created_at.desc(), Review.id.desc()).limit(LOCATION_REVIEWS_SHOWN).all()
     # Assuming you have a template named 'adventure_detail.html'
-    return render_template('adventure_detail.html', location=location)
+    return render_template('adventure_detail.html', location=location, reviews=reviews,
+                           rating=rating_summary(location.name))
 
 @adventure_suggestions_bp.route('/plan-trip')
 def create_trip_from_suggestion():
@@ -2,6 +2,7 @@ from flask import Flask, render_template, request, send_file, flash, redirect, u
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, current_user
 import os
+import click
 from datetime import datetime, time
 from typing import Dict
 from utils import login_required # Updated import
@@ -15,10 +16,30 @@ except ImportError:
     from fpdf import FPDF
 
 # Import models
-from models import db, User, UserPreference, AdventureLocation, Trip, Budget, PackingItem, UserInterest, UserSubmittedSpot, Notification, ItineraryItem, Review, UserEmergencyContact, UserMedicalReport, SuggestedEvent, UserAdventureDifficultyFeedback
-from werkzeug.utils import secure_filename
-from flask import send_from_directory
+from models import db, User, UserPreference, AdventureLocation, Trip, PackingItem, UserInterest, UserSubmittedSpot, Notification, ItineraryItem, Review, UserEmergencyContact, UserMedicalReport, SuggestedEvent, UserAdventureDifficultyFeedback
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload, contains_eager
+from query_budget import query_budget
+from pdf_render import pdf_response, itinerary_data
+import upload_store as upload_store_module
+from upload_store import upload_store, InvalidUpload
+from db_profile import read_only_db
+from buddy_matching import find_buddies
+from travel_matching import find_travel_buddies
+from geo_index import location_ids_within
+from event_calendar import calendar_page, events_freshness, calendar_etag
+from review_stats import rating_summary, rating_summaries
+import place_resolver  # links reviews to locations as they are written
+from notification_feed import unread_count, mark_read
+from notification_outbox import enqueue as enqueue_notification, outbox_dispatcher
+from budget_matrix import BASE_COSTS, budget_matrix
+from budget_history import FIGURES as BUDGET_FIGURES, latest_budget, record_budget
+from packing_lists import DEFAULT_ACTIVITY_ITEMS, packing_list
+from utils import encode_cursor, decode_timestamp_cursor, keyset_page, normalize_name
+
+EVENTS_PER_PAGE = 60
+REVIEWS_PER_PAGE = 20
+NOTIFICATIONS_PER_PAGE = 30
 
 def create_app():
     app = Flask(__name__, instance_relative_config=True)
@@ -45,9 +66,34 @@ def create_app():
     except OSError:
         pass
 
-    # Initialize SQLAlchemy
+    # Content-addressed uploads with thumbnail variants (also caps request size)
+    upload_store_module.init_app(app)
+
+    # Initialize SQLAlchemy with the configured engine profile (WAL, pragmas, pooling)
+    import db_profile
+    db_profile.init_app(app)
     db.init_app(app)
 
+    # Per-user suggestion cache, evicted by session events on commit
+    import suggestion_cache
+    suggestion_cache.init_app(app)
+
+    # Content-addressed cache for rendered PDFs
+    import pdf_render
+    pdf_render.init_app(app)
+
+    # Background PDF export jobs (process pool, zip output)
+    import pdf_jobs
+    pdf_jobs.init_app(app)
+
+    # Per-user budget history (compacted by `flask compact-budgets`)
+    import budget_history
+    budget_history.init_app(app)
+
+    # Per-request SQL statement budgets (enforced under TESTING)
+    import query_budget as query_budget_module
+    query_budget_module.init_app(app)
+
     # Register Jinja2 filters
     from utils import format_difficulty
     app.jinja_env.filters['format_difficulty'] = format_difficulty
@@ -65,6 +111,17 @@ def create_app():
     from adventure_suggestions import adventure_suggestions_bp
     app.register_blueprint(adventure_suggestions_bp, url_prefix='/adventure-suggestions')
 
+    from search import search_bp
+    app.register_blueprint(search_bp)
+
+    from exports import exports_bp
+    app.register_blueprint(exports_bp)
+
+    import notification_feed
+    notification_feed.init_app(app)
+    import notification_outbox
+    notification_outbox.init_app(app)
+
     # --- District Adventure & Difficulty Search Feature ---
     DISTRICT_ADVENTURE_DATA = {
         "chittagong": {
@@ -161,10 +218,17 @@ def create_app():
     ]
 
     @app.route('/events/')
+    @query_budget(3)
+    @read_only_db
     def show_nearby_events():
-        """Renders the main page for nearby events."""
-        community_events = SuggestedEvent.query.order_by(SuggestedEvent.event_date, SuggestedEvent.event_time).all()
-        return render_template('nearby_events.html', community_events=community_events)
+        """Renders the main page for nearby events, upcoming ones only."""
+        try:
+            community_events, next_cursor = calendar_page(date_from=datetime.utcnow().date(),
+                                                          cursor=request.args.get('cursor'),
+                                                          limit=EVENTS_PER_PAGE)
+        except ValueError:
+            abort(400)
+        return render_template('nearby_events.html', community_events=community_events, next_cursor=next_cursor)
 
     @app.route('/events/suggest', methods=['GET', 'POST'])
     @login_required
@@ -220,11 +284,13 @@ def create_app():
         return render_template('suggest_event.html')
 
     @app.route('/events/api/filter_community_events')
+    @query_budget(1)
+    @read_only_db
     def api_filter_community_events():
         category_filter = request.args.get('category', type=str)
         date_filter_str = request.args.get('date', type=str)
 
-        query = SuggestedEvent.query
+        query = SuggestedEvent.query.options(joinedload(SuggestedEvent.suggester))
 
         if category_filter:
             query = query.filter(SuggestedEvent.category.ilike(f'%{category_filter}%'))
@@ -253,6 +319,55 @@ def create_app():
             })
         return jsonify({"events": events_list})
 
+    @app.route('/events/api/calendar')
+    @query_budget(2)
+    @read_only_db
+    def api_events_calendar():
+        """Community events between ``from`` and ``to`` (inclusive, YYYY-MM-DD).
+
+        ``category`` is an exact match and ``cursor`` continues from a previous
+        page's ``next_cursor``. Responses carry ETag/Last-Modified so polling
+        clients get a 304 without the events being queried.
+        """
+        try:
+            date_from = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else None
+            date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else None
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+        category = request.args.get('category') or None
+        cursor = request.args.get('cursor') or None
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+
+        last_modified, version = events_freshness()
+        etag = calendar_etag(version, date_from, date_to, category, cursor, limit)
+        if request.if_none_match.contains(etag) or (
+                not request.if_none_match and last_modified and request.if_modified_since
+                and last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)):
+            response = app.response_class(status=304)
+        else:
+            try:
+                events, next_cursor = calendar_page(date_from, date_to, category, cursor, limit)
+            except ValueError:
+                return jsonify({"error": "Invalid cursor."}), 400
+            response = jsonify({
+                "events": [{
+                    'id': event.id,
+                    'name': event.name,
+                    'description': event.description,
+                    'location_text': event.location_text,
+                    'event_date': event.event_date.strftime('%Y-%m-%d'),
+                    'event_time': event.event_time.strftime('%H:%M') if event.event_time else None,
+                    'category': event.category,
+                    'suggester_username': event.suggester.username if event.suggester else 'Unknown'
+                } for event in events],
+                "next_cursor": next_cursor
+            })
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response
+
     @app.route('/events/api/nearby')
     def api_get_nearby_events():
         """
@@ -369,9 +484,33 @@ def create_app():
 
     @app.route('/reviews', methods=['GET'])
     @login_required
+    @query_budget(3)
+    @read_only_db
     def reviews_page():
-        reviews = Review.query.order_by(Review.created_at.desc()).all()
-        return render_template('reviews.html', reviews=reviews, current_user=current_user)
+        """Newest reviews first, keyset-paginated on (created_at, id)."""
+        try:
+            after = decode_timestamp_cursor(request.args.get('after'))
+            before = decode_timestamp_cursor(request.args.get('before'))
+        except ValueError:
+            abort(400)
+        query = Review.query.options(joinedload(Review.user))
+        reviews, next_key, prev_key = keyset_page(
+            query, [Review.created_at, Review.id], lambda review: [review.created_at, review.id],
+            REVIEWS_PER_PAGE, after=after, before=before, descending=True)
+        ratings = rating_summaries(review.place_name for review in reviews)
+        return render_template('reviews.html', reviews=reviews, current_user=current_user,
+                               ratings=ratings, normalize_name=normalize_name,
+                               next_cursor=encode_cursor(next_key) if next_key else None,
+                               prev_cursor=encode_cursor(prev_key) if prev_key else None)
+
+    @app.route('/api/reviews/rating', methods=['GET'])
+    @read_only_db
+    def review_rating():
+        """Review count, average and star histogram for ``?place=<name>``."""
+        place = request.args.get('place', '')
+        if not normalize_name(place):
+            return jsonify({'error': 'place is required'}), 400
+        return jsonify(rating_summary(place))
 
     # Helper function to check allowed file extensions
     def allowed_file(filename):
@@ -402,10 +541,12 @@ def create_app():
         picture_filename_to_save = None
         if picture_file and picture_file.filename != '':
             if allowed_file(picture_file.filename):
-                picture_filename_to_save = secure_filename(picture_file.filename)
                 try:
-                    upload_path = os.path.join(app.config['UPLOAD_FOLDER'], picture_filename_to_save)
-                    picture_file.save(upload_path)
+                    # Stored under its content hash; thumbnails render in the background
+                    picture_filename_to_save = upload_store.save(picture_file)
+                except InvalidUpload:
+                    flash('Invalid image file. Please upload a PNG, JPG or GIF picture.', 'danger')
+                    return redirect(url_for('reviews_page'))
                 except Exception as e:
                     # Log e for server-side debugging
                     flash('An error occurred while saving the picture.', 'danger')
@@ -433,9 +574,17 @@ def create_app():
         return redirect(url_for('reviews_page'))
 
 
+    @app.errorhandler(413)
+    def upload_too_large(error):
+        limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+        if request.endpoint == 'submit_review':
+            flash(f'That picture is too large. The limit is {limit_mb} MB.', 'danger')
+            return redirect(url_for('reviews_page'))
+        return jsonify({'error': f'Request too large; the limit is {limit_mb} MB'}), 413
+
     @app.route('/uploads/<filename>')
     def uploaded_file(filename):
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        return upload_store.send(filename)
 
     return app
 
@@ -466,7 +615,8 @@ def create_trip():
                 location_id=request.form['location_id'],
                 start_date=datetime.strptime(request.form['start_date'], '%Y-%m-%d'),
                 end_date=datetime.strptime(request.form['end_date'], '%Y-%m-%d'),
-                budget_estimate=float(request.form.get('budget', 0))
+                budget_estimate=float(request.form.get('budget', 0)),
+                shared_publicly=bool(request.form.get('shared_publicly'))
             )
             db.session.add(new_trip)
             db.session.commit()
@@ -509,16 +659,10 @@ def budget():
             # Calculate budget
             estimated_budget = calculate_budget(adventure_type, location_name, duration, people)
             
-            # Save to database
-            budget = Budget(
-                transport=estimated_budget['transportation'],
-                accommodation=estimated_budget['accommodation'],
-                food=estimated_budget['food'],
-                gear=estimated_budget['equipment'],
-                total=estimated_budget['total']
-            )
-            db.session.add(budget)
-            db.session.commit()
+            # Save to the user's history; anonymous estimates only live in the session
+            if current_user.is_authenticated:
+                record_budget(current_user.id, estimated_budget)
+                db.session.commit()
             
             # Store budget and location details in session
             session['estimated_budget'] = estimated_budget
@@ -541,27 +685,18 @@ def budget():
 def init_db():
     with app.app_context():
         print("[DEBUG] Attempting to initialize database...")
-        # Import all models here to ensure they are registered with SQLAlchemy before create_all()
-        from models import User, UserPreference, AdventureLocation, Trip, Budget, PackingItem, UserInterest, UserSubmittedSpot, Notification, ItineraryItem, Review, UserEmergencyContact, UserMedicalReport
+        from schema_migrations import upgrade
         
         try:
-            db.create_all()  # Create sql tables for our data models
-            print("[DEBUG] db.create_all() executed successfully.")
+            upgrade()  # Bring the schema up to date without touching existing data
+            print("[DEBUG] Schema migrations applied successfully.")
         except Exception as e:
-            print(f"[DEBUG] Error during db.create_all(): {e}")
+            print(f"[DEBUG] Error while applying schema migrations: {e}")
         
         # Add default packing items only if they don't exist
-        default_items = {
-            'camping': ['Tent', 'Sleeping Bag', 'Camping Stove', 'Cooler'],
-            'hiking': ['Hiking Boots', 'Backpack', 'Trekking Poles', 'Trail Map'],
-            'rock_climbing': ['Climbing Shoes', 'Harness', 'Ropes', 'Chalk Bag'],
-            'kayaking': ['Life Jacket', 'Dry Bags', 'Paddle', 'Spray Skirt']
-        }
-        
-        # Check if any default packing items exist
         existing_items = PackingItem.query.filter_by(is_default=True).all()
         if not existing_items:
-            for activity, items in default_items.items():
+            for activity, items in DEFAULT_ACTIVITY_ITEMS.items():
                 for item in items:
                     packing_item = PackingItem(
                         adventure_type=activity,
@@ -574,15 +709,126 @@ def init_db():
         else:
             print("Database already has default packing items. No changes made to packing items.")
 
+@app.cli.group('db')
+def db_cli():
+    """Versioned schema migrations."""
+
+@db_cli.command('upgrade')
+@click.option('--to', 'target', default=None, type=int, help='Stop after this migration version.')
+def db_upgrade_command(target):
+    """Apply pending migrations from migrations/."""
+    from schema_migrations import upgrade, current_version
+    applied = upgrade(target)
+    print(f"Applied {len(applied)} migration(s); schema is at version {current_version()}.")
+
+@db_cli.command('current')
+def db_current_command():
+    """Show the applied schema version and any pending migrations."""
+    from schema_migrations import current_version, pending_migrations
+    print(f"Schema version {current_version()}.")
+    for migration in pending_migrations():
+        print(f"Pending: {migration.version:04d}_{migration.name}")
+
+@db_cli.command('check')
+def db_check_command():
+    """Report tables, columns and indexes the models expect but the database lacks."""
+    from schema_migrations import check_schema
+    problems = check_schema()
+    for problem in problems:
+        print(problem)
+    if problems:
+        raise SystemExit(1)
+    print("Database schema matches the models.")
+
+@app.cli.command('import-locations')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--kind', type=click.Choice(['locations', 'spots']), default='locations', show_default=True)
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Source format (detected from the file extension by default).')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows written per transaction.')
+@click.option('--restart', is_flag=True, help='Ignore the saved checkpoint and read the file from the start.')
+def import_locations_command(path, kind, fmt, chunk_size, restart):
+    """Bulk-load adventure locations or submitted spots from CSV or JSON Lines."""
+    from location_import import import_file
+    stats = import_file(path, kind=kind, fmt=fmt, chunk_size=chunk_size, restart=restart)
+    print(f"Imported {stats['inserted']} {kind} from {stats['read']} records "
+          f"({stats['duplicates']} duplicates, {stats['invalid']} invalid) in {stats['seconds']}s.")
+
+@app.cli.command('export')
+@click.argument('dataset', type=click.Choice(['trips', 'itinerary', 'reviews']))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--from', 'date_from', type=click.DateTime(['%Y-%m-%d']), default=None, help='First date to include.')
+@click.option('--to', 'date_to', type=click.DateTime(['%Y-%m-%d']), default=None, help='Last date to include.')
+@click.option('--user-id', type=int, default=None, help='Only this user (default: everyone).')
+@click.option('--output', '-o', type=click.File('wb'), default='-', help='Output file (default: stdout).')
+def export_command(dataset, fmt, compress, date_from, date_to, user_id, output):
+    """Stream trips, itinerary items or reviews as CSV or JSON Lines."""
+    from exports import export_stream
+    for chunk in export_stream(dataset, fmt, compress, user_id,
+                               date_from.date() if date_from else None,
+                               date_to.date() if date_to else None):
+        output.write(chunk)
+
+@app.cli.command('precompute-suggestions')
+@click.option('--full', is_flag=True, help='Recompute every user, not only those whose inputs changed.')
+@click.option('--chunk-size', default=500, show_default=True, help='Users scored and written per batch.')
+@click.option('--workers', default=None, type=int, help='Scoring processes (defaults to the CPU count).')
+def precompute_suggestions_command(full, chunk_size, workers):
+    """Materialize adventure suggestions for all users."""
+    from suggestion_batch import precompute_suggestions
+    precompute_suggestions(full=full, chunk_size=chunk_size, workers=workers)
+
+@app.cli.command('backfill-review-stats')
+def backfill_review_stats_command():
+    """Recompute per-place rating aggregates from all reviews."""
+    from review_stats import backfill_rating_aggregates
+    count = backfill_rating_aggregates()
+    print(f"Rebuilt rating aggregates for {count} places.")
+
+@app.cli.command('link-reviews')
+@click.option('--batch-size', default=1000, show_default=True, help='Reviews resolved per transaction.')
+def link_reviews_command(batch_size):
+    """Link reviews without a location to the location their place name matches."""
+    from place_resolver import resolve_reviews
+    scanned, linked = resolve_reviews(batch_size=batch_size)
+    print(f"Linked {linked} of {scanned} unlinked reviews to locations.")
+
+@app.cli.command('dispatch-notifications')
+def dispatch_notifications_command():
+    """Deliver every queued notification now and report the outbox state."""
+    from notification_outbox import outbox_dispatcher
+    delivered = outbox_dispatcher.drain()
+    stats = outbox_dispatcher.stats()
+    print(f"Delivered {delivered} notifications ({stats['coalesced']} duplicates coalesced); "
+          f"{stats['queue_depth']} still queued.")
+
+@app.cli.command('compact-budgets')
+@click.option('--keep', default=None, type=click.IntRange(min=1), help='Budgets kept per user (defaults to BUDGET_HISTORY_KEEP).')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows deleted per transaction.')
+def compact_budgets_command(keep, batch_size):
+    """Trim each user's budget history to their newest estimates; drop unowned rows."""
+    from budget_history import compact_budgets
+    keep = app.config['BUDGET_HISTORY_KEEP'] if keep is None else keep
+    deleted = compact_budgets(keep, batch_size, log=click.echo)
+    click.echo(f'Deleted {deleted} budgets; kept the newest {keep} per user.')
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuild the full-text index over locations, spots, reviews and events."""
+    from search import rebuild_search_index
+    count = rebuild_search_index()
+    print(f"Indexed {count} documents for search.")
+
+@app.cli.command('rebuild-geo-index')
+def rebuild_geo_index_command():
+    """Rebuild the spatial index used by the nearby-locations API."""
+    from geo_index import rebuild_geo_index
+    count = rebuild_geo_index()
+    print(f"Indexed {count} locations with coordinates.")
+
 def calculate_budget(adventure_type: str, location: str, duration: int, people: int) -> Dict:
-    base_costs = {
-        'camping': {'transport': 50, 'accommodation': 20, 'food': 30, 'gear': 100},
-        'hiking': {'transport': 40, 'accommodation': 0, 'food': 25, 'gear': 80},
-        'rock_climbing': {'transport': 60, 'accommodation': 40, 'food': 35, 'gear': 150},
-        'kayaking': {'transport': 70, 'accommodation': 30, 'food': 35, 'gear': 120}
-    }
-    
-    costs = base_costs.get(adventure_type, base_costs['camping'])
+    costs = BASE_COSTS.get(adventure_type, BASE_COSTS['camping'])
     total = sum(cost * duration * people for cost in costs.values())
     
     return {
@@ -594,41 +840,41 @@ def calculate_budget(adventure_type: str, location: str, duration: int, people:
     }
 
 
-def generate_packing_list(adventure_type: str, duration: int, season: str) -> Dict:
-    base_items = {
-        'Clothing': [
-            'Socks',
-            'Underwear',
-            'T-shirts',
-            'Long-sleeve shirts',
-            'Pants/Shorts',
-            'Rain jacket'
-        ],
-        'Personal Care': [
-            'Toothbrush',
-            'Toothpaste',
-            'Sunscreen',
-            'First Aid Kit',
-            'Hand Sanitizer',
-            'Insect Repellent',
-            'Personal Medications'
-        ]
-    }
-
-    activity_specific = {
-        'camping': ['Tent', 'Sleeping Bag', 'Camping Stove', 'Cooler'],
-        'hiking': ['Hiking Boots', 'Backpack', 'Trekking Poles', 'Trail Map'],
-        'rock_climbing': ['Climbing Shoes', 'Harness', 'Ropes', 'Chalk Bag'],
-        'kayaking': ['Life Jacket', 'Dry Bags', 'Paddle', 'Spray Skirt']
-    }
-
-    checklist = base_items.copy()
-    checklist['Activity Specific'] = activity_specific[adventure_type]
-    
-    if season in ['winter', 'fall']:
-        checklist['Clothing'].extend(['Warm Jacket', 'Thermal Layers', 'Gloves'])
+def _int_axis(value, default, low, high):
+    """Parse ``2-14`` or ``1,2,5`` into a list of ints within [low, high]."""
+    if not value:
+        return default
+    numbers = []
+    for part in value.split(','):
+        first, _, last = part.partition('-')
+        try:
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise ValueError(f'{part!r} is not a number or a range like 2-14') from None
+        if not low <= first <= last <= high:
+            raise ValueError(f'{part} is outside {low}-{high}')
+        numbers.extend(range(first, last + 1))
+    return numbers
+
+@app.route('/api/budget/matrix', methods=['GET'])
+def api_budget_matrix():
+    """Budget estimates for every combination of the requested scenarios.
+
+    Query args: ``types`` (comma-separated, default all), ``durations``
+    (e.g. ``2-14``), ``people`` (e.g. ``1-10`` or ``2,4``) and optional
+    ``location_ids`` whose cost factors apply.
+    """
+    try:
+        types = [t for t in request.args.get('types', '').split(',') if t] or None
+        durations = _int_axis(request.args.get('durations'), [1], 1, 365)
+        people = _int_axis(request.args.get('people'), [1], 1, 100)
+        location_ids = [int(i) for i in request.args.get('location_ids', '').split(',') if i] or [None]
+        matrix = budget_matrix(types, durations, people, location_ids)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(matrix.to_dict())
 
-    return checklist
 
 @app.route('/')
 @login_required
@@ -638,98 +884,83 @@ def index():
 @app.route('/packing', methods=['GET', 'POST'])
 def packing():
     if request.method == 'POST':
-        checklist = generate_packing_list(
-            request.form['adventure_type'],
-            int(request.form['duration']),
-            request.form['season']
-        )
-        return render_template('packing.html', checklist=checklist)
+        try:
+            selection = {
+                'adventure_type': request.form['adventure_type'],
+                'duration': int(request.form['duration']),
+                'season': request.form['season']
+            }
+            checklist = packing_list(**selection)
+        except (ValueError, KeyError):
+            flash('Error generating checklist. Please check your inputs.', 'danger')
+            return render_template('packing.html'), 400
+        # checklist_pdf prints the last generated list
+        session['packing_selection'] = selection
+        return render_template('packing.html', checklist=checklist, selection=selection)
     return render_template('packing.html')
 
 @app.route('/download_pdf')
 def download_pdf():
-    budget = db.session.query(Budget).order_by(Budget.id.desc()).first()
-    
-    if not budget:
+    estimated_on = None
+    if current_user.is_authenticated:
+        budget = latest_budget(current_user.id)
+        estimate = {key: getattr(budget, column) for column, key in BUDGET_FIGURES.items()} if budget else None
+        estimated_on = budget.created_at.date() if budget and budget.created_at else None
+    else:
+        estimate = session.get('estimated_budget')
+
+    if not estimate:
         return "No budget data found."
 
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=14)
-    pdf.cell(200, 10, txt="Trip Budget Estimation", ln=True, align='C')
-    pdf.ln(10)
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
-    pdf.ln(10)
-
-    items = [
-        ('Transport', budget.transport),
-        ('Accommodation', budget.accommodation),
-        ('Food', budget.food),
-        ('Gear', budget.gear),
-        ('Total', budget.total)
-    ]
-
-    for label, value in items:
-        pdf.cell(200, 10, txt=f"{label}: ${value}", ln=True)
-
-    filename = "budget_estimate.pdf"
-    filepath = os.path.join(app.static_folder, filename)
-    pdf.output(filepath)
+    data = {column: estimate[key] for column, key in BUDGET_FIGURES.items()}
+    data['estimated_on'] = estimated_on
+    return pdf_response('budget', data, "budget_estimate.pdf")
 
-    return send_file(filepath, as_attachment=True)
+PACKING_DEFAULTS = {'adventure_type': 'camping', 'duration': 1, 'season': 'summer'}
 
 @app.route('/checklist_pdf')
 def checklist_pdf():
-    selected_type = 'Camping'  # default or fetch from session
-    items = db.session.query(PackingItem).filter_by(adventure_type=selected_type).all()
-
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=14)
-    pdf.cell(200, 10, txt=f"Packing Checklist: {selected_type}", ln=True, align='C')
-    pdf.ln(10)
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
-    pdf.ln(10)
-
-    for item in items:
-        pdf.cell(200, 10, txt=f"- {item.name}", ln=True)
-
-    filename = "packing_checklist.pdf"
-    filepath = os.path.join(app.static_folder, filename)
-    pdf.output(filepath)
-    return send_file(filepath, as_attachment=True)
+    """Checklist PDF for the query's, or else the last generated, selection."""
+    selection = dict(PACKING_DEFAULTS)
+    selected_location = session.get('selected_location')
+    if selected_location:
+        selection['adventure_type'] = selected_location['adventure_type']
+    selection.update(session.get('packing_selection') or {})
+    selection.update({key: request.args[key] for key in PACKING_DEFAULTS if key in request.args})
+    try:
+        checklist = packing_list(selection['adventure_type'], int(selection['duration']), selection['season'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    data = {'adventure_type': selection['adventure_type'].replace('_', ' ').title(),
+            'names': [name for names in checklist.values() for name in names]}
+    return pdf_response('checklist', data, "packing_checklist.pdf")
+
+BUDDIES_PER_PAGE = 20
 
 @app.route('/buddy-finder', methods=['GET'])
 @login_required
+@query_budget(5)
+@read_only_db
 def buddy_finder():
     # Get current user's interests
     user_interests = UserInterest.query.filter_by(user_id=current_user.id).all()
     user_activities = [interest.activity_type for interest in user_interests]
     user_experience = user_interests[0].experience_level if user_interests else None
     
-    # Find matching buddies
-    matching_buddies = []
-    if user_interests:
-        # Get all users except current user
-        potential_buddies = User.query.filter(User.id != current_user.id).all()
-        
-        for buddy in potential_buddies:
-            buddy_interests = [interest.activity_type for interest in buddy.interests]
-            # Check for common interests
-            common_interests = set(user_activities) & set(buddy_interests)
-            if common_interests:
-                matching_buddies.append({
-                    'id': buddy.id,
-                    'username': buddy.username,
-                    'interests': ', '.join(buddy_interests),
-                    'experience_level': next((i.experience_level for i in buddy.interests if i.activity_type in common_interests), 'Not specified'),
-                    'bio': buddy.bio or 'No bio available'
-                })
+    # Rank matching buddies in SQL and load only the current page
+    page = max(request.args.get('page', 1, type=int), 1)
+    total_matches, matching_buddies = find_buddies(
+        current_user.id, user_activities, user_experience,
+        limit=BUDDIES_PER_PAGE, offset=(page - 1) * BUDDIES_PER_PAGE
+    )
+    total_pages = max((total_matches + BUDDIES_PER_PAGE - 1) // BUDDIES_PER_PAGE, 1)
     
     return render_template('buddy_finder.html',
                          matching_buddies=matching_buddies,
+                         total_matches=total_matches,
+                         page=page,
+                         total_pages=total_pages,
                          user_interests=user_activities,
                          user_experience=user_experience,
                          current_user=current_user)
@@ -738,8 +969,10 @@ def buddy_finder():
 @login_required
 def update_interests():
     try:
-        # Delete existing interests
-        UserInterest.query.filter_by(user_id=current_user.id).delete()
+        # Delete existing interests through the session so the suggestion cache
+        # can see which user changed
+        for existing in UserInterest.query.filter_by(user_id=current_user.id).all():
+            db.session.delete(existing)
         
         # Get form data
         interests = request.form.getlist('interests')
@@ -810,9 +1043,12 @@ def submit_spot():
     return render_template('submit_spot.html') # Removed difficulty_levels
 
 @app.route('/user-spots')
+@query_budget(2)
+@read_only_db
 def user_spots():
-    # Get all spots with their contributors
+    # Get all spots with their contributors, filled from the same join
     spots = UserSubmittedSpot.query.join(User, UserSubmittedSpot.contributor_id == User.id)\
+        .options(contains_eager(UserSubmittedSpot.contributor))\
         .order_by(UserSubmittedSpot.created_at.desc())\
         .all()
     return render_template('user_spots.html', spots=spots)
@@ -833,12 +1069,11 @@ def send_spot_request(spot_id):
         flash('Please provide your email address.', 'danger')
         return redirect(url_for('spot_request_form', spot_id=spot_id))
     
-    # Create notification for the spot submitter
-    notification = Notification(
-        user_id=spot.contributor_id,
-        message=f'New spot request received from {current_user.username} ({email}) for your spot: {spot.spot_name}'
+    # Queue a notification for the spot submitter; the outbox dispatcher delivers it
+    enqueue_notification(
+        [spot.contributor_id],
+        f'New spot request received from {current_user.username} ({email}) for your spot: {spot.spot_name}'
     )
-    db.session.add(notification)
     db.session.commit()
     
     flash(f'Request sent to {spot.contributor.username} for spot: {spot.spot_name}. They will contact you at {email}.', 'success')
@@ -851,19 +1086,42 @@ def mark_notification_read(notification_id):
     if notification.user_id != session.get('user_id'):
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
-    notification.mark_as_read()
+    mark_read(notification.user_id, [notification.id])
     return jsonify({'success': True})
 
+@app.route('/api/notifications/outbox-stats', methods=['GET'])
+@login_required
+def notification_outbox_stats():
+    """Outbox queue depth and delivery latency."""
+    return jsonify(outbox_dispatcher.stats())
+
 @app.route('/notifications')
 @login_required
+@query_budget(3)
+@read_only_db
 def notifications():
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.created_at.desc()).all()
-    return render_template('notifications.html', notifications=notifications)
+    """Newest notifications first, keyset-paginated on (created_at, id)."""
+    try:
+        after = decode_timestamp_cursor(request.args.get('after'))
+        before = decode_timestamp_cursor(request.args.get('before'))
+    except ValueError:
+        abort(400)
+    # Served by ix_notifications_user_created
+    notifications, next_key, prev_key = keyset_page(
+        Notification.query.filter_by(user_id=current_user.id), [Notification.created_at, Notification.id],
+        lambda notification: [notification.created_at, notification.id],
+        NOTIFICATIONS_PER_PAGE, after=after, before=before, descending=True)
+    return render_template('notifications.html', notifications=notifications,
+                           unread=unread_count(current_user.id),
+                           next_cursor=encode_cursor(next_key) if next_key else None,
+                           prev_cursor=encode_cursor(prev_key) if prev_key else None)
 
 @app.route('/itinerary/<int:trip_id>', methods=['GET'])
 @login_required
+@query_budget(3)
+@read_only_db
 def view_itinerary(trip_id):
-    trip = Trip.query.join(AdventureLocation).filter(Trip.id == trip_id).first_or_404()
+    trip = Trip.query.join(AdventureLocation).options(contains_eager(Trip.location)).filter(Trip.id == trip_id).first_or_404()
     # Ensure user owns this trip
     if trip.user_id != current_user.id:
         abort(403)
@@ -929,10 +1187,72 @@ def delete_itinerary_item(trip_id, item_id):
 
 @app.route('/trips')
 @login_required
+@query_budget(2)
+@read_only_db
 def view_trips():
-    trips = Trip.query.filter_by(user_id=current_user.id).order_by(Trip.start_date).all()
+    trips = Trip.query.options(joinedload(Trip.location)).filter_by(user_id=current_user.id).order_by(Trip.start_date).all()
     return render_template('trips.html', trips=trips)
 
+@app.route('/trip/<int:trip_id>/sharing', methods=['POST'])
+@login_required
+def update_trip_sharing(trip_id):
+    """Make a trip visible to travel-buddy matching, or hide it again."""
+    trip = Trip.query.get_or_404(trip_id)
+    if trip.user_id != current_user.id:
+        abort(403)
+    trip.shared_publicly = bool(request.form.get('shared_publicly'))
+    db.session.commit()
+    if trip.shared_publicly:
+        flash('Trip shared: other travellers can now find it when matching.', 'success')
+    else:
+        flash('Trip is private again.', 'info')
+    return redirect(url_for('view_trips'))
+
+@app.route('/api/trips/<int:trip_id>/travel-buddies')
+@login_required
+def api_travel_buddies(trip_id):
+    """Public trips by other users that overlap one of my trips.
+
+    ``radius_km`` widens the match from the trip's location to every location
+    within that distance. Paginated with ``page`` and ``per_page``; responses
+    carry an ETag so polling clients get a 304 when nothing changed.
+    """
+    trip = Trip.query.get_or_404(trip_id)
+    if trip.user_id != current_user.id:
+        abort(403)
+
+    location_ids = None
+    radius_km = request.args.get('radius_km', type=float)
+    if radius_km:
+        if not (0 < radius_km <= 500):
+            return jsonify({'error': 'radius_km must be between 0 and 500'}), 400
+        if trip.location.latitude is not None and trip.location.longitude is not None:
+            location_ids = location_ids_within(trip.location.latitude, trip.location.longitude, radius_km)
+            location_ids.append(trip.location_id)
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    total, rows = find_travel_buddies(trip, location_ids, limit=per_page, offset=(page - 1) * per_page)
+
+    response = jsonify({
+        'trip_id': trip.id,
+        'matches': [{
+            'trip_id': row.trip_id,
+            'user_id': row.user_id,
+            'username': row.username,
+            'location_id': row.location_id,
+            'location_name': row.location_name,
+            'start_date': row.start_date.strftime('%Y-%m-%d'),
+            'end_date': row.end_date.strftime('%Y-%m-%d'),
+            'overlap_days': int(row.overlap_days)
+        } for row in rows],
+        'total': total,
+        'page': page,
+        'per_page': per_page
+    })
+    response.add_etag()
+    return response.make_conditional(request)
+
 @app.route('/export-itinerary/<int:trip_id>')
 @login_required
 def export_itinerary(trip_id):
@@ -940,32 +1260,8 @@ def export_itinerary(trip_id):
     if trip.user_id != current_user.id:
         abort(403)
     
-    itinerary_items = ItineraryItem.query.filter_by(trip_id=trip_id).order_by(ItineraryItem.start_time).all()
-    
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=16)
-    pdf.cell(200, 10, txt=f"Trip Itinerary - {trip.location.name}", ln=True, align='C')
-    pdf.ln(10)
-    
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"From: {trip.start_date.strftime('%Y-%m-%d')} To: {trip.end_date.strftime('%Y-%m-%d')}", ln=True)
-    pdf.ln(5)
-    
-    for item in itinerary_items:
-        pdf.set_font("Arial", 'B', 12)
-        pdf.cell(200, 10, txt=item.activity_name, ln=True)
-        pdf.set_font("Arial", size=10)
-        pdf.cell(200, 10, txt=f"Time: {item.start_time.strftime('%H:%M')} - {item.end_time.strftime('%H:%M')}", ln=True)
-        if item.notes:
-            pdf.multi_cell(200, 10, txt=f"Notes: {item.notes}")
-        pdf.ln(5)
-    
-    filename = f"itinerary_{trip_id}.pdf"
-    filepath = os.path.join(app.static_folder, filename)
-    pdf.output(filepath)
-    
-    return send_file(filepath, as_attachment=True)
+    itinerary_items = ItineraryItem.query.filter_by(trip_id=trip_id).order_by(ItineraryItem.start_time, ItineraryItem.id).all()
+    return pdf_response('itinerary', itinerary_data(trip, itinerary_items), f"itinerary_{trip_id}.pdf")
 
 if __name__ == '__main__':
     with app.app_context():
@@ -0,0 +1,63 @@
+"""Price a scenario grid with budget_matrix vs looping calculate_budget.
+
+"loop" calls calculate_budget once per scenario, as a client posting to
+/budget for each would; "matrix" is one budget_matrix() call and
+"matrix+json" adds the to_dict() serialization the API endpoint does.
+Both sides are checked to produce the same figures.
+
+Usage: python benchmarks/bench_budget_matrix.py [repeats]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, calculate_budget
+from models import db
+from budget_matrix import BASE_COSTS, METRICS, budget_matrix
+
+# (label, durations, people)
+GRIDS = [
+    ('planner 2-14d x 1-10p', range(2, 15), range(1, 11)),
+    ('season 1-90d x 1-20p', range(1, 91), range(1, 21)),
+]
+
+
+def loop(types, durations, people):
+    return [calculate_budget(t, '', d, p) for t in types for d in durations for p in people]
+
+
+def best_of(repeats, fn):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    types = list(BASE_COSTS)
+    with app.app_context():
+        db.create_all()
+        print(f'{"grid":<24} {"scenarios":>9} {"loop ms":>9} {"matrix ms":>10} {"+json ms":>9} {"speedup":>8}')
+        for label, durations, people in GRIDS:
+            durations, people = list(durations), list(people)
+            expected = loop(types, durations, people)
+            matrix = budget_matrix(types, durations, people)
+            actual = matrix.values.reshape(-1, len(METRICS)).tolist()
+            assert actual == [[e[m] for m in METRICS] for e in expected], 'matrix and loop disagree'
+
+            loop_s = best_of(repeats, lambda: loop(types, durations, people))
+            matrix_s = best_of(repeats, lambda: budget_matrix(types, durations, people))
+            json_s = best_of(repeats, lambda: budget_matrix(types, durations, people).to_dict())
+            print(f'{label:<24} {len(expected):>9} {loop_s * 1000:>9.2f} {matrix_s * 1000:>10.2f} '
+                  f'{json_s * 1000:>9.2f} {loop_s / matrix_s:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Hammer POST /packing and report throughput, response sizes and memory.
+
+"legacy" re-implements the original generate_packing_list, whose shallow
+copy let each winter/fall request extend the shared Clothing list.
+"current" is the /packing route backed by packing_lists. Each round
+sends the same requests from several threads. Then the script compares
+response sizes and the memory traced by tracemalloc with the first round.
+tests/test_packing_lists.py enforces the same checks on a smaller run.
+
+Usage: python benchmarks/bench_packing_lists.py [rounds] [threads] [requests per thread]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, init_db
+from packing_lists import cache_info
+
+FORMS = [{'adventure_type': t, 'duration': str(d), 'season': s}
+         for t in ('camping', 'hiking', 'rock_climbing', 'kayaking')
+         for s in ('summer', 'winter', 'spring', 'fall')
+         for d in (2, 7)]
+
+_LEGACY_BASE = {
+    'Clothing': ['Socks', 'Underwear', 'T-shirts', 'Long-sleeve shirts', 'Pants/Shorts', 'Rain jacket'],
+    'Personal Care': ['Toothbrush', 'Toothpaste', 'Sunscreen', 'First Aid Kit', 'Hand Sanitizer',
+                      'Insect Repellent', 'Personal Medications'],
+}
+_LEGACY_ACTIVITY = {
+    'camping': ['Tent', 'Sleeping Bag', 'Camping Stove', 'Cooler'],
+    'hiking': ['Hiking Boots', 'Backpack', 'Trekking Poles', 'Trail Map'],
+    'rock_climbing': ['Climbing Shoes', 'Harness', 'Ropes', 'Chalk Bag'],
+    'kayaking': ['Life Jacket', 'Dry Bags', 'Paddle', 'Spray Skirt'],
+}
+
+
+def legacy_packing_list(adventure_type, duration, season):
+    # As before: the base lists live for the whole process (the original
+    # rebuilt them per call, but any shared list shows the same aliasing)
+    checklist = _LEGACY_BASE.copy()
+    checklist['Activity Specific'] = _LEGACY_ACTIVITY[adventure_type]
+    if season in ['winter', 'fall']:
+        checklist['Clothing'].extend(['Warm Jacket', 'Thermal Layers', 'Gloves'])
+    return checklist
+
+
+def legacy_route():
+    from flask import render_template, request
+    checklist = legacy_packing_list(request.form['adventure_type'], int(request.form['duration']),
+                                    request.form['season'])
+    return render_template('packing.html', checklist=checklist, selection=dict(request.form))
+
+
+def run_round(url, threads, per_thread):
+    sizes, errors = set(), []
+
+    def worker(offset):
+        client = app.test_client()
+        for i in range(per_thread):
+            response = client.post(url, data=FORMS[(offset + i) % len(FORMS)])
+            if response.status_code != 200:
+                errors.append(response.status_code)
+            sizes.add(len(response.data))
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - start, max(sizes), errors
+
+
+def hammer(label, url, rounds, threads, per_thread):
+    print(f'{label}:')
+    print(f'{"round":>6} {"req/s":>9} {"largest":>9} {"traced KiB":>11} {"errors":>7}')
+    tracemalloc.start()
+    baseline = None
+    first_size = largest = 0
+    for n in range(1, rounds + 1):
+        elapsed, largest, errors = run_round(url, threads, per_thread)
+        current, _ = tracemalloc.get_traced_memory()
+        if baseline is None:
+            baseline, first_size = current, largest
+        print(f'{n:>6} {threads * per_thread / elapsed:>9.0f} {largest:>9} {current / 1024:>11.0f} {len(errors):>7}')
+    final, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return final - baseline, largest - first_size
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    per_thread = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app.add_url_rule('/bench/legacy-packing', 'bench_legacy_packing', legacy_route, methods=['POST'])
+    init_db()
+
+    print(f'{rounds} rounds of {threads} threads x {per_thread} requests')
+    growth, size_growth = hammer('legacy', '/bench/legacy-packing', rounds, threads, per_thread)
+    print(f'legacy: memory {growth / 1024:+.0f} KiB, largest response {size_growth:+d} bytes\n')
+    growth, size_growth = hammer('current', '/packing', rounds, threads, per_thread)
+    print(f'current: memory {growth / 1024:+.0f} KiB, largest response {size_growth:+d} bytes')
+    print(cache_info())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Concurrent itinerary PDF downloads: write-to-static vs in-memory with cache.
+
+"legacy" re-implements the original export_itinerary (render, write
+static/itinerary_<id>.pdf, send_file). "memory" is the current route with
+the cache disabled, so every download renders into a buffer; "cached" is
+the current route with the cache enabled.
+
+Usage: python benchmarks/bench_pdf.py [threads] [downloads per thread] [items]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import send_file
+from fpdf import FPDF
+
+from app import app
+from models import db, User, AdventureLocation, Trip, ItineraryItem
+from pdf_render import pdf_cache
+
+TRIPS = 8
+
+
+def legacy_export_itinerary(trip_id):
+    trip = Trip.query.get_or_404(trip_id)
+    itinerary_items = ItineraryItem.query.filter_by(trip_id=trip_id).order_by(ItineraryItem.start_time).all()
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=16)
+    pdf.cell(200, 10, txt=f"Trip Itinerary - {trip.location.name}", ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt=f"From: {trip.start_date.strftime('%Y-%m-%d')} To: {trip.end_date.strftime('%Y-%m-%d')}", ln=True)
+    pdf.ln(5)
+    for item in itinerary_items:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(200, 10, txt=item.activity_name, ln=True)
+        pdf.set_font("Arial", size=10)
+        pdf.cell(200, 10, txt=f"Time: {item.start_time.strftime('%H:%M')} - {item.end_time.strftime('%H:%M')}", ln=True)
+        if item.notes:
+            pdf.multi_cell(200, 10, txt=f"Notes: {item.notes}")
+        pdf.ln(5)
+    filepath = os.path.join(app.static_folder, f"itinerary_{trip_id}.pdf")
+    pdf.output(filepath)
+    return send_file(filepath, as_attachment=True)
+
+
+def seed(items_per_trip):
+    user = User(username='bench', email='bench@example.com', password_hash='x')
+    location = AdventureLocation(name='Bench Valley', category='hiking')
+    db.session.add_all([user, location])
+    db.session.commit()
+    for t in range(TRIPS):
+        trip = Trip(user_id=user.id, location_id=location.id, start_date=date(2025, 6, 1), end_date=date(2025, 6, 9))
+        db.session.add(trip)
+        db.session.flush()
+        start = datetime(2025, 6, 1, 8)
+        db.session.add_all([ItineraryItem(
+            trip_id=trip.id, activity_name=f'Activity {i}', start_time=start + timedelta(hours=i),
+            end_time=start + timedelta(hours=i, minutes=45), notes='Bring water, map and layers. ' * 6
+        ) for i in range(items_per_trip)])
+    db.session.commit()
+    return user.id
+
+
+def run(label, url_pattern, user_id, threads, per_thread):
+    errors = []
+
+    def worker(offset):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        for i in range(per_thread):
+            response = client.get(url_pattern.format((offset + i) % TRIPS + 1))
+            if response.status_code != 200 or not response.data.startswith(b'%PDF'):
+                errors.append(response.status_code)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    total = threads * per_thread
+    print(f'{label:<8} {total / elapsed:>10.1f} {elapsed / total * 1000:>10.2f} {len(errors):>7}')
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    items = int(sys.argv[3]) if len(sys.argv) > 3 else 40
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app.static_folder = tempfile.mkdtemp()
+    app.add_url_rule('/bench/legacy-itinerary/<int:trip_id>', 'bench_legacy_itinerary',
+                     legacy_export_itinerary)
+    with app.app_context():
+        db.create_all()
+        user_id = seed(items)
+
+    print(f'{threads} threads x {per_thread} downloads, {TRIPS} trips of {items} items')
+    print(f'{"variant":<8} {"pdf/s":>10} {"ms/pdf":>10} {"errors":>7}')
+    run('legacy', '/bench/legacy-itinerary/{}', user_id, threads, per_thread)
+    pdf_cache.configure(max_entries=0)
+    run('memory', '/export-itinerary/{}', user_id, threads, per_thread)
+    pdf_cache.configure(max_entries=256)
+    run('cached', '/export-itinerary/{}', user_id, threads, per_thread)
+    print(pdf_cache.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Concurrent read/write throughput: bare SQLite engine vs the production profile.
+
+Writer threads insert reviews one transaction at a time while reader threads
+run the reviews-page style query. Reports operations per second and how many
+operations failed with "database is locked".
+
+Usage: python benchmarks/bench_sqlite_profile.py [seconds] [writers] [readers]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from models import db
+from db_profile import PROFILES, _apply_pragmas
+
+SEED_REVIEWS = 20000
+USERS = 200
+
+_INSERT = text(
+    'INSERT INTO reviews (place_name, rating, comment, user_id, created_at) '
+    'VALUES (:place, :rating, :comment, :user_id, :created_at)'
+)
+_READ = text(
+    'SELECT r.id, r.place_name, r.rating, u.username FROM reviews r '
+    'JOIN users u ON u.id = r.user_id ORDER BY r.id DESC LIMIT 50'
+)
+
+
+def _engine(path, options=None, pragmas=None):
+    options = dict(options or {})
+    engine = create_engine(f'sqlite:///{path}', **options)
+    if pragmas:
+        event.listen(engine, 'connect', _apply_pragmas(pragmas))
+    return engine
+
+
+def bare_engines(path):
+    # What create_app used to get: SQLAlchemy defaults, no pragmas
+    engine = _engine(path, {'connect_args': {'check_same_thread': False}})
+    return engine, engine
+
+
+def production_engines(path):
+    profile = PROFILES['production']
+    connect_args = {'check_same_thread': False, 'timeout': 30}
+    writer = _engine(path, dict(profile['pool'], connect_args=connect_args), profile['pragmas'])
+    read_pragmas = {k: v for k, v in profile['pragmas'].items() if k != 'journal_mode'}
+    read_pragmas['query_only'] = 'ON'
+    reader = _engine(path, dict(profile['read_pool'], connect_args=connect_args), read_pragmas)
+    return writer, reader
+
+
+def seed(engine):
+    db.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(text('INSERT INTO users (username, email, password_hash) VALUES (:u, :e, :p)'),
+                     [{'u': f'user{i}', 'e': f'user{i}@example.com', 'p': 'x'} for i in range(USERS)])
+        conn.execute(_INSERT, [{
+            'place': f'Place {i % 500}', 'rating': random.randint(1, 5), 'comment': 'seed review ' * 8,
+            'user_id': random.randint(1, USERS), 'created_at': now
+        } for i in range(SEED_REVIEWS)])
+
+
+def run(label, make_engines, seconds, writers, readers):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    write_engine, read_engine = make_engines(path)
+    seed(write_engine)
+
+    counts = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def writer():
+        while time.perf_counter() < deadline:
+            try:
+                with write_engine.begin() as conn:
+                    conn.execute(_INSERT, {
+                        'place': 'Bench', 'rating': random.randint(1, 5), 'comment': 'concurrent write',
+                        'user_id': random.randint(1, USERS), 'created_at': datetime.utcnow()
+                    })
+                bump('writes')
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                bump('locked')
+
+    def reader():
+        while time.perf_counter() < deadline:
+            try:
+                with read_engine.connect() as conn:
+                    conn.execute(_READ).fetchall()
+                bump('reads')
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                bump('locked')
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    write_engine.dispose()
+    read_engine.dispose()
+    print(f'{label:<12} {counts["writes"] / elapsed:>10.0f} {counts["reads"] / elapsed:>10.0f} {counts["locked"]:>8}')
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    random.seed(42)
+    print(f'{seconds:g}s, {writers} writer threads, {readers} reader threads')
+    print(f'{"profile":<12} {"writes/s":>10} {"reads/s":>10} {"locked":>8}')
+    run('bare', bare_engines, seconds, writers, readers)
+    run('production', production_engines, seconds, writers, readers)
+
+
+if __name__ == '__main__':
+    main()
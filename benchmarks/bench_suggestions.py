@@ -0,0 +1,93 @@
+"""Compare the indexed suggestion engine with the original per-location loop.
+
+Usage: python benchmarks/bench_suggestions.py [catalog sizes...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models import db, User, AdventureLocation, UserInterest, UserPreference, Trip
+from datetime import date
+import suggestion_engine
+
+CATEGORIES = ['hiking', 'camping', 'biking', 'rock_climbing', 'kayaking', 'bird_watching']
+
+
+def legacy_suggestions(user_id):
+    """The original O(locations x (interests + trips)) implementation."""
+    interests = UserInterest.query.filter_by(user_id=user_id).all()
+    preferences = UserPreference.query.filter_by(user_id=user_id).first()
+    past_trips = Trip.query.filter_by(user_id=user_id).all()
+    location_scores = {}
+    for location in AdventureLocation.query.all():
+        score = 0
+        for interest in interests:
+            if interest.activity_type == location.category:
+                score += 2
+        for trip in past_trips:
+            if trip.location_id == location.id:
+                score += 1
+        if preferences and preferences.preferred_categories:
+            categories = [cat.strip() for cat in preferences.preferred_categories.split(',')]
+            if location.category in categories:
+                score += 1
+        location_scores[location.id] = {'location': location, 'score': score}
+    ranked = sorted(location_scores.values(), key=lambda x: x['score'], reverse=True)[:10]
+    return [(loc['location'].id, loc['score']) for loc in ranked]
+
+
+def seed(n_locations, rng):
+    db.drop_all()
+    db.create_all()
+    user = User(username='bench', email='bench@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    db.session.bulk_insert_mappings(AdventureLocation, [
+        {'id': i + 1, 'name': f'Spot {i}', 'category': rng.choice(CATEGORIES),
+         'description': 'x' * 200, 'difficulty': 2}
+        for i in range(n_locations)
+    ])
+    for activity in rng.sample(CATEGORIES, 2):
+        db.session.add(UserInterest(user_id=user.id, activity_type=activity))
+    db.session.add(UserPreference(user_id=user.id, preferred_categories=', '.join(rng.sample(CATEGORIES, 2))))
+    for _ in range(50):
+        db.session.add(Trip(user_id=user.id, location_id=rng.randint(1, n_locations),
+                            start_date=date(2025, 1, 1), end_date=date(2025, 1, 2)))
+    db.session.commit()
+    return user.id
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(sizes):
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        with app.app_context():
+            print(f"{'locations':>10} {'legacy (ms)':>12} {'engine cold':>12} {'engine warm':>12} {'speedup':>8}")
+            for n in sizes:
+                user_id = seed(n, rng)
+                legacy_time, legacy = timed(lambda: legacy_suggestions(user_id))
+                suggestion_engine.invalidate_location_index()
+                cold_time, _ = timed(lambda: suggestion_engine.rank_locations(user_id), repeat=1)
+                warm_time, ranked = timed(lambda: suggestion_engine.rank_locations(user_id))
+                assert ranked == legacy, 'engine diverged from the legacy ranking'
+                print(f"{n:>10} {legacy_time * 1000:>12.1f} {cold_time * 1000:>12.1f} "
+                      f"{warm_time * 1000:>12.1f} {legacy_time / warm_time:>7.0f}x")
+                db.session.remove()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
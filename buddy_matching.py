@@ -0,0 +1,67 @@
+from sqlalchemy import case, func
+
+from models import db, User, UserInterest
+
+EXPERIENCE_RANKS = {'beginner': 0, 'intermediate': 1, 'advanced': 2}
+
+
+def _experience_rank(column):
+    return case(
+        *[(func.lower(column) == level, rank) for level, rank in EXPERIENCE_RANKS.items()],
+        else_=None
+    )
+
+
+def find_buddies(user_id, activities, experience_level=None, limit=20, offset=0):
+    """Rank other users by shared activities, then by experience proximity.
+
+    Matching is a single grouped query over ``user_interests`` (served by the
+    ``(activity_type, user_id)`` index); only the requested page is then
+    loaded. Returns ``(total, buddies)`` with buddies shaped for
+    ``buddy_finder.html``.
+    """
+    if not activities:
+        return 0, []
+
+    my_rank = EXPERIENCE_RANKS.get((experience_level or '').lower())
+    shared = func.count(func.distinct(UserInterest.activity_type)).label('shared')
+    if my_rank is None:
+        distance = func.min(0).label('distance')
+    else:
+        # Candidates with no recognised level sort after every known distance
+        distance = func.coalesce(
+            func.min(func.abs(_experience_rank(UserInterest.experience_level) - my_rank)),
+            len(EXPERIENCE_RANKS)
+        ).label('distance')
+
+    matches = db.session.query(UserInterest.user_id, shared, distance)\
+        .filter(UserInterest.activity_type.in_(activities), UserInterest.user_id != user_id)\
+        .group_by(UserInterest.user_id)\
+        .subquery()
+
+    total = db.session.query(func.count()).select_from(matches).scalar()
+    page = db.session.query(User.id, User.username, User.bio)\
+        .join(matches, matches.c.user_id == User.id)\
+        .order_by(matches.c.shared.desc(), matches.c.distance, User.id)\
+        .limit(limit).offset(offset).all()
+    if not page:
+        return total, []
+
+    interests_by_user = {}
+    for interest in db.session.query(UserInterest.user_id, UserInterest.activity_type, UserInterest.experience_level)\
+            .filter(UserInterest.user_id.in_([row.id for row in page]))\
+            .order_by(UserInterest.id):
+        interests_by_user.setdefault(interest.user_id, []).append(interest)
+
+    activity_set = set(activities)
+    buddies = []
+    for row in page:
+        interests = interests_by_user.get(row.id, [])
+        buddies.append({
+            'id': row.id,
+            'username': row.username,
+            'interests': ', '.join(i.activity_type for i in interests),
+            'experience_level': next((i.experience_level for i in interests if i.activity_type in activity_set), 'Not specified'),
+            'bio': row.bio or 'No bio available'
+        })
+    return total, buddies
@@ -0,0 +1,84 @@
+"""Per-user budget history.
+
+Each saved estimate belongs to a user and carries a content key, the
+sha256 of its figures. Saving an estimate the user already has refreshes
+that row's timestamp instead of adding a copy, so repeated submissions of
+the same form cost nothing. ``ix_budgets_user_created`` makes "my latest
+budget" a single index lookup. ``flask compact-budgets`` trims each user
+to their ``BUDGET_HISTORY_KEEP`` most recent estimates.
+"""
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import text
+
+from models import db, Budget
+
+BUDGET_TABLE = Budget.__tablename__
+
+# Budget column -> calculate_budget key
+FIGURES = {
+    'transport': 'transportation',
+    'accommodation': 'accommodation',
+    'food': 'food',
+    'gear': 'equipment',
+    'total': 'total',
+}
+
+_RECORD = text(
+    f"INSERT INTO {BUDGET_TABLE} (user_id, content_key, {', '.join(FIGURES)}, created_at) "
+    f"VALUES (:user_id, :content_key, {', '.join(':' + column for column in FIGURES)}, :created_at) "
+    f"ON CONFLICT (user_id, content_key) DO UPDATE SET created_at = excluded.created_at"
+)
+
+# Rows beyond each user's newest :keep, plus rows saved before budgets had owners
+_EXCESS_IDS = text(
+    f"SELECT id FROM ("
+    f"SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC, id DESC) AS position "
+    f"FROM {BUDGET_TABLE} WHERE user_id IS NOT NULL"
+    f") WHERE position > :keep "
+    f"UNION ALL SELECT id FROM {BUDGET_TABLE} WHERE user_id IS NULL "
+    f"LIMIT :limit"
+)
+_DELETE_IDS = text(f"DELETE FROM {BUDGET_TABLE} WHERE id = :id")
+
+
+def init_app(app):
+    app.config.setdefault('BUDGET_HISTORY_KEEP', 20)  # estimates kept per user by compact-budgets
+
+
+def content_key(estimate):
+    """sha256 of an estimate's figures (a calculate_budget result)."""
+    figures = '|'.join(str(estimate[key]) for key in FIGURES.values())
+    return hashlib.sha256(figures.encode()).hexdigest()
+
+
+def record_budget(user_id, estimate):
+    """Save ``estimate`` as the user's latest budget; the caller commits."""
+    row = {column: estimate[key] for column, key in FIGURES.items()}
+    row.update(user_id=user_id, content_key=content_key(estimate), created_at=datetime.utcnow())
+    db.session.execute(_RECORD, row)
+
+
+def latest_budget(user_id):
+    """The user's most recently saved Budget, or None."""
+    return Budget.query.filter_by(user_id=user_id)\
+        .order_by(Budget.created_at.desc(), Budget.id.desc()).first()
+
+
+def compact_budgets(keep, batch_size=1000, log=print):
+    """Delete all but each user's ``keep`` newest budgets, and unowned legacy rows.
+
+    Deletes in batches of ``batch_size``, one transaction each, so writers
+    are never blocked for long. Returns the number of rows deleted.
+    """
+    deleted = 0
+    while True:
+        ids = db.session.execute(_EXCESS_IDS, {'keep': keep, 'limit': batch_size}).scalars().all()
+        if not ids:
+            break
+        db.session.execute(_DELETE_IDS, [{'id': budget_id} for budget_id in ids])
+        db.session.commit()
+        deleted += len(ids)
+        log(f'Deleted {deleted} budgets')
+    return deleted
@@ -0,0 +1,150 @@
+"""Vectorized budget estimates over a grid of scenarios.
+
+``calculate_budget`` prices one (adventure type, duration, people) triple.
+:func:`budget_matrix` prices every combination of several adventure types,
+durations, group sizes and locations in one NumPy broadcast over a cost
+table loaded once per process. Per-location multipliers come from
+``location_cost_factors``; the table is reloaded after those rows change.
+"""
+import threading
+
+import numpy as np
+from sqlalchemy import event
+
+from models import db, LocationCostFactor
+
+# Per-person unit costs by adventure type. transport and gear are paid once
+# per trip; accommodation and food per day.
+BASE_COSTS = {
+    'camping': {'transport': 50, 'accommodation': 20, 'food': 30, 'gear': 100},
+    'hiking': {'transport': 40, 'accommodation': 0, 'food': 25, 'gear': 80},
+    'rock_climbing': {'transport': 60, 'accommodation': 40, 'food': 35, 'gear': 150},
+    'kayaking': {'transport': 70, 'accommodation': 30, 'food': 35, 'gear': 120}
+}
+CATEGORIES = ('transport', 'accommodation', 'food', 'gear')
+PER_DAY = np.array([False, True, True, False])
+
+# Figures per scenario, named as calculate_budget names its keys
+METRICS = ('transportation', 'accommodation', 'food', 'equipment', 'total')
+
+# Largest grid one request may ask for
+MAX_SCENARIOS = 50000
+
+
+class CostTable:
+    """Unit costs as a (types x categories) array plus per-location factor rows."""
+
+    def __init__(self, factors):
+        self.types = tuple(BASE_COSTS)
+        self.type_positions = {name: i for i, name in enumerate(self.types)}
+        self.unit_costs = np.array([[BASE_COSTS[name][c] for c in CATEGORIES] for name in self.types],
+                                   dtype=np.float64)
+        # Row 0 is "no location": all factors 1
+        self.location_positions = {None: 0}
+        rows = [np.ones(len(CATEGORIES))]
+        for location_id, values in factors:
+            self.location_positions[location_id] = len(rows)
+            rows.append(np.asarray(values, dtype=np.float64))
+        self.factors = np.vstack(rows)
+
+    @classmethod
+    def load(cls):
+        rows = db.session.query(LocationCostFactor.location_id,
+                                *(getattr(LocationCostFactor, c) for c in CATEGORIES)).all()
+        return cls([(row[0], [1.0 if v is None else v for v in row[1:]]) for row in rows])
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_cost_table():
+    global _table
+    table = _table
+    if table is None:
+        with _table_lock:
+            if _table is None:
+                _table = CostTable.load()
+            table = _table
+    return table
+
+
+def invalidate_cost_table():
+    global _table
+    _table = None
+
+
+@event.listens_for(LocationCostFactor, 'after_insert')
+@event.listens_for(LocationCostFactor, 'after_update')
+@event.listens_for(LocationCostFactor, 'after_delete')
+def _factors_changed(mapper, connection, target):
+    invalidate_cost_table()
+
+
+class BudgetMatrix:
+    """Estimates for a scenario grid: ``values[t, l, d, p]`` holds METRICS for
+    ``adventure_types[t]`` at ``location_ids[l]`` for ``durations[d]`` days and
+    ``people[p]`` people."""
+
+    def __init__(self, adventure_types, location_ids, durations, people, values):
+        self.adventure_types = adventure_types
+        self.location_ids = location_ids
+        self.durations = durations
+        self.people = people
+        self.values = values
+
+    def to_dict(self):
+        """Compact JSON form: each axis once, then the nested value grid."""
+        return {
+            'axes': ['adventure_type', 'location_id', 'duration', 'people', 'metric'],
+            'adventure_types': self.adventure_types,
+            'location_ids': self.location_ids,
+            'durations': self.durations,
+            'people': self.people,
+            'metrics': list(METRICS),
+            'values': self.values.tolist(),
+        }
+
+    def rows(self):
+        """One ``(adventure_type, location_id, duration, people, *metrics)`` tuple per scenario."""
+        flat = self.values.reshape(-1, len(METRICS)).tolist()
+        keys = ((t, l, d, p) for t in self.adventure_types for l in self.location_ids
+                for d in self.durations for p in self.people)
+        return [(*key, *figures) for key, figures in zip(keys, flat)]
+
+
+def budget_matrix(adventure_types=None, durations=(1,), people=(1,), location_ids=(None,)):
+    """Estimate every combination of the given scenario axes in one pass.
+
+    Each scenario gets the figures ``calculate_budget`` returns for it,
+    scaled by the location's cost factors; locations without factors cost
+    the base rates. Returns a BudgetMatrix. Raises ValueError for unknown
+    adventure types or a grid larger than MAX_SCENARIOS.
+    """
+    table = get_cost_table()
+    adventure_types = list(adventure_types or table.types)
+    unknown = [name for name in adventure_types if name not in table.type_positions]
+    if unknown:
+        raise ValueError(f'Unknown adventure types: {", ".join(map(str, unknown))}')
+    location_ids, durations, people = list(location_ids) or [None], list(durations), list(people)
+    size = len(adventure_types) * len(location_ids) * len(durations) * len(people)
+    if size > MAX_SCENARIOS:
+        raise ValueError(f'{size} scenarios requested; the limit is {MAX_SCENARIOS}')
+
+    unit = table.unit_costs[[table.type_positions[name] for name in adventure_types]]      # (T, C)
+    factors = table.factors[[table.location_positions.get(i, 0) for i in location_ids]]   # (L, C)
+    days = np.asarray(durations, dtype=np.float64)
+    group = np.asarray(people, dtype=np.float64)
+
+    per_person = unit[:, None, :] * factors[None, :, :]                                    # (T, L, C)
+    day_scale = np.where(PER_DAY, days[:, None], 1.0)                                      # (D, C)
+    values = np.empty((len(adventure_types), len(location_ids), len(durations), len(people), len(METRICS)))
+    values[..., :-1] = (per_person[:, :, None, None, :] * day_scale[None, None, :, None, :]
+                        * group[None, None, None, :, None])
+    # calculate_budget's total charges every category per day and person
+    values[..., -1] = (per_person.sum(axis=-1)[:, :, None, None] * days[None, None, :, None]
+                       * group[None, None, None, :])
+    values = np.round(values, 2)
+    if np.array_equal(values, np.floor(values)):
+        values = values.astype(np.int64)
+    return BudgetMatrix(adventure_types, location_ids, durations, people, values)
@@ -1,5 +1,6 @@
 from app import create_app, db
+from schema_migrations import upgrade
 
 app = create_app()
 with app.app_context():
-    db.create_all()
+    upgrade()
@@ -0,0 +1,145 @@
+"""SQLite engine profiles: connection pragmas, pooling and read/write routing.
+
+Select a profile with the ``DATABASE_PROFILE`` config key (or the
+environment variable of the same name):
+
+``production``
+    WAL journal, tuned pragmas on every connection, a bounded connection
+    pool, and a separate read engine used by views marked ``@read_only_db``
+    so readers never queue behind a writer's connection.
+``development``
+    SQLite defaults plus a busy timeout.
+"""
+import os
+from functools import wraps
+
+from flask import g, has_request_context
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+
+PROFILES = {
+    'development': {
+        'pragmas': {'busy_timeout': 5000},
+        'read_routing': False,
+    },
+    'production': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'cache_size': -64000,        # KiB, i.e. 64 MB per connection
+            'temp_store': 'MEMORY',
+            'mmap_size': 268435456,      # 256 MB
+        },
+        'pool': {'poolclass': QueuePool, 'pool_size': 5, 'max_overflow': 10,
+                 'pool_timeout': 30},
+        'read_routing': True,
+        'read_pool': {'poolclass': QueuePool, 'pool_size': 10, 'max_overflow': 20,
+                      'pool_timeout': 30},
+    },
+}
+
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def _is_memory(sa_url):
+    return sa_url.drivername.startswith('sqlite') and sa_url.database in (None, '', ':memory:')
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends reads to the read engine inside ``@read_only_db`` views.
+
+    Anything that flushes still goes to the primary engine.
+    """
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and has_request_context() and g.get('db_read_only'):
+            engine = self.db.get_read_engine(self.app)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper, clause)
+
+
+class ProfiledSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy extension that applies the configured SQLite profile."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._read_engines = {}
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def create_engine(self, sa_url, engine_opts):
+        sa_url = make_url(sa_url)
+        pragmas = engine_opts.pop('sqlite_pragmas', None)
+        if _is_memory(sa_url):
+            # Each pooled connection would get its own empty in-memory database
+            for key in ('pool_size', 'max_overflow', 'pool_timeout'):
+                engine_opts.pop(key, None)
+            engine_opts['poolclass'] = StaticPool
+        engine = super().create_engine(sa_url, engine_opts)
+        if pragmas and engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _apply_pragmas(pragmas))
+        return engine
+
+    def get_read_engine(self, app=None):
+        """Engine for read-only views, or None when routing is disabled."""
+        app = self.get_app(app)
+        profile = PROFILES[app.config['DATABASE_PROFILE']]
+        if not profile['read_routing'] or _is_memory(make_url(app.config['SQLALCHEMY_DATABASE_URI'])):
+            return None
+        engine = self._read_engines.get(app)
+        if engine is None:
+            uri = app.config.get('SQLALCHEMY_READ_DATABASE_URI') or app.config['SQLALCHEMY_DATABASE_URI']
+            options = dict(profile['read_pool'])
+            options['connect_args'] = {'check_same_thread': False, 'timeout': 30}
+            # Readers never write, and PRAGMA journal_mode on a reader would take a lock
+            pragmas = {k: v for k, v in profile['pragmas'].items() if k != 'journal_mode'}
+            pragmas['query_only'] = 'ON'
+            options['sqlite_pragmas'] = pragmas
+            engine = self._read_engines[app] = self.create_engine(uri, options)
+        return engine
+
+    @property
+    def read_engine(self):
+        return self.get_read_engine() or self.engine
+
+
+def init_app(app):
+    """Fill in engine options for the selected profile. Call before ``db.init_app``."""
+    app.config.setdefault('DATABASE_PROFILE', os.environ.get('DATABASE_PROFILE', 'production'))
+    name = app.config['DATABASE_PROFILE']
+    if name not in PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE {name!r}; expected one of {sorted(PROFILES)}")
+    profile = PROFILES[name]
+
+    options = dict(profile.get('pool', {}))
+    options['connect_args'] = {'check_same_thread': False, 'timeout': 30}
+    options['sqlite_pragmas'] = dict(profile['pragmas'])
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def read_only_db(view):
+    """Run a view's queries on the read engine (when the profile enables it)."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapped
@@ -0,0 +1,84 @@
+import hashlib
+from datetime import date, time
+
+from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import joinedload
+
+from models import db, SuggestedEvent
+from utils import encode_cursor, decode_cursor
+
+
+def _after_cursor(event_date, event_time, event_id):
+    """Rows strictly after ``(event_date, event_time, id)`` in calendar order.
+
+    SQLite sorts NULL times first, so a NULL time sorts before any set time
+    on the same day.
+    """
+    same_day = SuggestedEvent.event_date == event_date
+    if event_time is None:
+        later_same_day = or_(
+            and_(SuggestedEvent.event_time.is_(None), SuggestedEvent.id > event_id),
+            SuggestedEvent.event_time.isnot(None)
+        )
+    else:
+        later_same_day = or_(
+            SuggestedEvent.event_time > event_time,
+            and_(SuggestedEvent.event_time == event_time, SuggestedEvent.id > event_id)
+        )
+    return or_(SuggestedEvent.event_date > event_date, and_(same_day, later_same_day))
+
+
+def _cursor_for(event):
+    return encode_cursor([
+        event.event_date.isoformat(),
+        event.event_time.isoformat() if event.event_time else None,
+        event.id
+    ])
+
+
+def _parse_cursor(token):
+    try:
+        event_date, event_time, event_id = decode_cursor(token)
+        return (date.fromisoformat(event_date),
+                time.fromisoformat(event_time) if event_time else None,
+                int(event_id))
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def calendar_page(date_from=None, date_to=None, category=None, cursor=None, limit=50):
+    """One page of events in ``(event_date, event_time, id)`` order.
+
+    The date range and exact category are served by the
+    ``(event_date, event_time)`` and ``(category, event_date)`` indexes.
+    Returns ``(events, next_cursor)``; raises ValueError for a bad cursor.
+    """
+    query = SuggestedEvent.query.options(joinedload(SuggestedEvent.suggester))
+    if category:
+        query = query.filter(SuggestedEvent.category == category)
+    if date_from:
+        query = query.filter(SuggestedEvent.event_date >= date_from)
+    if date_to:
+        query = query.filter(SuggestedEvent.event_date <= date_to)
+    if cursor:
+        query = query.filter(_after_cursor(*_parse_cursor(cursor)))
+
+    events = query.order_by(SuggestedEvent.event_date, SuggestedEvent.event_time, SuggestedEvent.id)\
+        .limit(limit + 1).all()
+    next_cursor = _cursor_for(events[limit - 1]) if len(events) > limit else None
+    return events[:limit], next_cursor
+
+
+def events_freshness():
+    """Return ``(last_modified, version)`` for the events table.
+
+    Both come from index-only lookups, so clients can be answered with a 304
+    before any event rows are read.
+    """
+    newest, last_id = db.session.query(func.max(SuggestedEvent.created_at), func.max(SuggestedEvent.id)).one()
+    return newest, f'{newest.isoformat() if newest else ""}:{last_id or 0}'
+
+
+def calendar_etag(version, *args):
+    """Strong ETag for a calendar response from the table version and request args."""
+    return hashlib.sha1(repr((version,) + args).encode()).hexdigest()
@@ -0,0 +1,248 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, time, timedelta
+
+from flask import (Blueprint, Response, jsonify, request, stream_with_context, flash, redirect,
+                   url_for, send_file)
+from flask_login import current_user
+from sqlalchemy.orm import joinedload
+
+from db_profile import read_only_db
+from models import db, Trip, ItineraryItem, Review, AdventureLocation
+from pdf_jobs import pdf_jobs, QueueFull, DONE, itinerary_filename
+from pdf_render import itinerary_data
+from utils import login_required
+
+exports_bp = Blueprint('exports', __name__, url_prefix='/export')
+
+# Rows fetched per round trip; only this many are held in memory at once
+EXPORT_BATCH_SIZE = 1000
+# Serialized output is flushed to the client in chunks of about this size
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+
+def _trips(user_id):
+    columns = [Trip.id, Trip.user_id, Trip.location_id, AdventureLocation.name.label('location_name'),
+               Trip.start_date, Trip.end_date, Trip.budget_estimate, Trip.shared_publicly, Trip.created_at]
+    query = db.session.query(*columns).join(AdventureLocation, AdventureLocation.id == Trip.location_id)
+    if user_id is not None:
+        query = query.filter(Trip.user_id == user_id)
+    return query, Trip.start_date, Trip.id
+
+
+def _itinerary(user_id):
+    columns = [ItineraryItem.id, ItineraryItem.trip_id, Trip.user_id, ItineraryItem.activity_name,
+               ItineraryItem.start_time, ItineraryItem.end_time, ItineraryItem.notes, ItineraryItem.created_at]
+    query = db.session.query(*columns).join(Trip, Trip.id == ItineraryItem.trip_id)
+    if user_id is not None:
+        query = query.filter(Trip.user_id == user_id)
+    return query, ItineraryItem.start_time, ItineraryItem.id
+
+
+def _reviews(user_id):
+    columns = [Review.id, Review.user_id, Review.place_name, Review.rating, Review.comment,
+               Review.picture_filename, Review.created_at]
+    query = db.session.query(*columns)
+    if user_id is not None:
+        query = query.filter(Review.user_id == user_id)
+    return query, Review.created_at, Review.id
+
+
+# Dataset name -> builder returning (query, date column for --from/--to, ordering key)
+DATASETS = {
+    'trips': _trips,
+    'itinerary': _itinerary,
+    'reviews': _reviews,
+}
+
+
+def export_rows(dataset, user_id=None, date_from=None, date_to=None):
+    """Return ``(column_names, rows)`` where rows is a lazy iterator of tuples.
+
+    Rows are read with ``yield_per``, so memory stays flat however many
+    there are. ``date_from``/``date_to`` are inclusive dates.
+    """
+    query, date_column, order_column = DATASETS[dataset](user_id)
+    if isinstance(date_column.type, db.DateTime):
+        # Compare timestamps against midnights so the column's index is usable
+        if date_from:
+            query = query.filter(date_column >= datetime.combine(date_from, time.min))
+        if date_to:
+            query = query.filter(date_column < datetime.combine(date_to + timedelta(days=1), time.min))
+    else:
+        if date_from:
+            query = query.filter(date_column >= date_from)
+        if date_to:
+            query = query.filter(date_column <= date_to)
+    names = [column['name'] for column in query.column_descriptions]
+    rows = query.order_by(order_column).yield_per(EXPORT_BATCH_SIZE)
+    return names, (tuple(row) for row in rows)
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(names, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl_chunks(names, rows):
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps({name: _plain(value) for name, value in zip(names, row)}, ensure_ascii=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield ''.join(lines)
+            lines, size = [], 0
+    yield ''.join(lines)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(dataset, fmt='csv', compress=False, user_id=None, date_from=None, date_to=None):
+    """Generator of encoded output chunks (bytes) for an export."""
+    names, rows = export_rows(dataset, user_id, date_from, date_to)
+    chunks = _csv_chunks(names, rows) if fmt == 'csv' else _jsonl_chunks(names, rows)
+    encoded = (chunk.encode('utf-8') for chunk in chunks if chunk)
+    return _gzipped(encoded) if compress else encoded
+
+
+def _parse_date(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    return date.fromisoformat(value)
+
+
+@exports_bp.route('/<dataset>', methods=['GET'])
+@login_required
+@read_only_db
+def export_dataset(dataset):
+    """Download the current user's trips, itinerary items or reviews."""
+    if dataset not in DATASETS:
+        return jsonify({'error': f'Unknown export {dataset!r}; expected one of {sorted(DATASETS)}'}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'error': 'format must be csv or jsonl'}), 400
+    try:
+        date_from, date_to = _parse_date('from'), _parse_date('to')
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD dates'}), 400
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    mimetype, extension = FORMATS[fmt]
+    filename = f'{dataset}-{date.today().isoformat()}.{extension}'
+    if compress:
+        mimetype, filename = 'application/gzip', filename + '.gz'
+    body = export_stream(dataset, fmt, compress, current_user.id, date_from, date_to)
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+# --- Background PDF exports ---
+
+def _itineraries(user_id, trip_ids=None):
+    """Plain-data snapshots of a user's trips with their items, in two queries."""
+    query = Trip.query.options(joinedload(Trip.location)).filter(Trip.user_id == user_id)
+    if trip_ids:
+        query = query.filter(Trip.id.in_(trip_ids))
+    trips = query.order_by(Trip.start_date, Trip.id).all()
+    items = {trip.id: [] for trip in trips}
+    if items:
+        for item in ItineraryItem.query.filter(ItineraryItem.trip_id.in_(list(items)))\
+                .order_by(ItineraryItem.trip_id, ItineraryItem.start_time, ItineraryItem.id):
+            items[item.trip_id].append(item)
+    return [itinerary_data(trip, items[trip.id]) for trip in trips]
+
+
+def _job_payload(job):
+    payload = job.to_dict()
+    payload['status_url'] = url_for('exports.export_job_status', job_id=job.id)
+    if job.status == DONE:
+        payload['download_url'] = url_for('exports.download_export_job', job_id=job.id)
+    return payload
+
+
+def _wants_json():
+    return request.is_json or request.accept_mimetypes.best == 'application/json'
+
+
+@exports_bp.route('/trips.zip', methods=['POST'])
+@login_required
+def export_trips_zip():
+    """Queue a zip of itinerary PDFs for all (or the selected) trips of the current user."""
+    trip_ids = (request.get_json(silent=True) or {}).get('trip_ids') or request.form.getlist('trip_id', type=int)
+    itineraries = _itineraries(current_user.id, trip_ids)
+    if not itineraries:
+        if _wants_json():
+            return jsonify({'error': 'No trips to export'}), 404
+        flash('You have no trips to export yet.', 'info')
+        return redirect(url_for('view_trips'))
+
+    documents = [(itinerary_filename(it), 'itinerary', it) for it in itineraries]
+    try:
+        job = pdf_jobs.submit(current_user.id, documents, f'trips-{date.today().isoformat()}.zip')
+    except QueueFull:
+        if _wants_json():
+            response = jsonify({'error': 'Too many exports are in progress; try again shortly'})
+            response.headers['Retry-After'] = '30'
+            return response, 503
+        flash('Too many exports are in progress right now. Please try again in a minute.', 'warning')
+        return redirect(url_for('view_trips'))
+
+    if _wants_json():
+        response = jsonify(_job_payload(job))
+        response.headers['Location'] = url_for('exports.export_job_status', job_id=job.id)
+        return response, 202
+    flash('Your trip export is being prepared. You will get a notification when it is ready.', 'success')
+    return redirect(url_for('view_trips'))
+
+
+@exports_bp.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def export_job_status(job_id):
+    job = pdf_jobs.get(job_id, current_user.id)
+    if job is None:
+        return jsonify({'error': 'Export not found'}), 404
+    return jsonify(_job_payload(job))
+
+
+@exports_bp.route('/jobs/<job_id>/download', methods=['GET'])
+@login_required
+def download_export_job(job_id):
+    job = pdf_jobs.get(job_id, current_user.id)
+    if job is None:
+        return jsonify({'error': 'Export not found'}), 404
+    if job.status != DONE:
+        return jsonify(_job_payload(job)), 409
+    return send_file(job.path, mimetype='application/zip', as_attachment=True, download_name=job.filename)
@@ -0,0 +1,180 @@
+import math
+
+import numpy as np
+from sqlalchemy import DDL, event, text
+
+from models import db, AdventureLocation
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+RTREE_TABLE = 'adventure_locations_rtree'
+
+_CREATE_RTREE = text(
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} '
+    'USING rtree(id, min_lat, max_lat, min_lon, max_lon)'
+)
+_BACKFILL_RTREE = text(
+    f'INSERT OR REPLACE INTO {RTREE_TABLE} (id, min_lat, max_lat, min_lon, max_lon) '
+    'SELECT id, latitude, latitude, longitude, longitude FROM adventure_locations '
+    'WHERE latitude IS NOT NULL AND longitude IS NOT NULL'
+)
+_INDEX_AFTER_ID = text(
+    f'INSERT OR REPLACE INTO {RTREE_TABLE} (id, min_lat, max_lat, min_lon, max_lon) '
+    'SELECT id, latitude, latitude, longitude, longitude FROM adventure_locations '
+    'WHERE id > :min_id AND latitude IS NOT NULL AND longitude IS NOT NULL'
+)
+_UPSERT_POINT = text(
+    f'INSERT OR REPLACE INTO {RTREE_TABLE} (id, min_lat, max_lat, min_lon, max_lon) '
+    'VALUES (:id, :lat, :lat, :lon, :lon)'
+)
+_DELETE_POINT = text(f'DELETE FROM {RTREE_TABLE} WHERE id = :id')
+# R*Tree bounds are stored as 32-bit floats, so match on overlap and read the
+# exact coordinates back from the location row
+_QUERY_BOX = text(
+    f'SELECT l.id, l.latitude, l.longitude FROM {RTREE_TABLE} r '
+    'JOIN adventure_locations l ON l.id = r.id '
+    'WHERE r.max_lat >= :min_lat AND r.min_lat <= :max_lat '
+    'AND r.max_lon >= :min_lon AND r.min_lon <= :max_lon '
+    'AND l.latitude BETWEEN :min_lat AND :max_lat '
+    'AND l.longitude BETWEEN :min_lon AND :max_lon'
+)
+
+# Databases (by URL) whose R*Tree has already been checked in this process
+_ready = set()
+
+
+def ensure_geo_index(connection):
+    """Create and backfill the R*Tree the first time a database is used."""
+    key = str(connection.engine.url)
+    if key in _ready:
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': RTREE_TABLE}
+    ).first()
+    if not exists:
+        connection.execute(_CREATE_RTREE)
+        connection.execute(_BACKFILL_RTREE)
+    _ready.add(key)
+
+
+def rebuild_geo_index():
+    """Drop and repopulate the R*Tree from adventure_locations."""
+    with db.engine.begin() as connection:
+        connection.execute(text(f'DROP TABLE IF EXISTS {RTREE_TABLE}'))
+        connection.execute(_CREATE_RTREE)
+        connection.execute(_BACKFILL_RTREE)
+        count = connection.execute(text(f'SELECT count(*) FROM {RTREE_TABLE}')).scalar()
+    _ready.add(str(db.engine.url))
+    return count
+
+
+def index_locations_after(connection, min_id):
+    """Index locations with ``id > min_id`` that were inserted without the ORM."""
+    ensure_geo_index(connection)
+    connection.execute(_INDEX_AFTER_ID, {'min_id': min_id})
+
+
+# --- Keep the index in step with AdventureLocation writes ---
+
+# create_all()/drop_all() manage the R*Tree alongside its source table
+event.listen(AdventureLocation.__table__, 'after_create', DDL(str(_CREATE_RTREE)))
+event.listen(AdventureLocation.__table__, 'before_drop', DDL(f'DROP TABLE IF EXISTS {RTREE_TABLE}'))
+
+
+@event.listens_for(AdventureLocation, 'after_insert')
+@event.listens_for(AdventureLocation, 'after_update')
+def _index_location(mapper, connection, target):
+    ensure_geo_index(connection)
+    if target.latitude is None or target.longitude is None:
+        connection.execute(_DELETE_POINT, {'id': target.id})
+    else:
+        connection.execute(_UPSERT_POINT, {'id': target.id, 'lat': target.latitude, 'lon': target.longitude})
+
+
+@event.listens_for(AdventureLocation, 'after_delete')
+def _unindex_location(mapper, connection, target):
+    ensure_geo_index(connection)
+    connection.execute(_DELETE_POINT, {'id': target.id})
+
+
+# --- Queries ---
+
+def bounding_box(lat, lon, radius_km):
+    """Return ``(min_lat, max_lat, min_lon, max_lon)`` enclosing a circle."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    cos_lat = math.cos(math.radians(lat))
+    if min_lat <= -90.0 or max_lat >= 90.0 or cos_lat < 1e-9:
+        return min_lat, max_lat, -180.0, 180.0
+    dlon = min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+    return min_lat, max_lat, lon - dlon, lon + dlon
+
+
+def _split_antimeridian(min_lon, max_lon):
+    if max_lon - min_lon >= 360.0:
+        return [(-180.0, 180.0)]
+    if min_lon < -180.0:
+        return [(min_lon + 360.0, 180.0), (-180.0, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lon, 180.0), (-180.0, max_lon - 360.0)]
+    return [(min_lon, max_lon)]
+
+
+def points_in_box(min_lat, max_lat, min_lon, max_lon):
+    """Return ``(ids, lats, lons)`` arrays for locations inside the box."""
+    if str(db.engine.url) not in _ready:
+        with db.engine.begin() as connection:
+            ensure_geo_index(connection)
+    with db.read_engine.connect() as connection:
+        rows = []
+        for lo, hi in _split_antimeridian(min_lon, max_lon):
+            rows.extend(connection.execute(_QUERY_BOX, {
+                'min_lat': min_lat, 'max_lat': max_lat, 'min_lon': lo, 'max_lon': hi
+            }).fetchall())
+    if not rows:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty, empty
+    ids, lats, lons = zip(*rows)
+    return np.asarray(ids, dtype=np.int64), np.asarray(lats), np.asarray(lons)
+
+
+def haversine_km(lat, lon, lats, lons):
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def location_ids_within(lat, lon, radius_km):
+    """Ids of every indexed location within ``radius_km`` of a point."""
+    ids, lats, lons = points_in_box(*bounding_box(lat, lon, radius_km))
+    return [int(i) for i in ids[haversine_km(lat, lon, lats, lons) <= radius_km]]
+
+
+def search_nearby(lat, lon, radius_km=None, box=None, limit=20, offset=0):
+    """Distance-sorted locations around ``(lat, lon)``.
+
+    Candidates come from the R*Tree (``box`` if given, otherwise the box around
+    ``radius_km``) and are then filtered to the radius. Returns
+    ``(total, [(location, distance_km), ...])`` for the requested page.
+    """
+    if box is None:
+        box = bounding_box(lat, lon, radius_km)
+    ids, lats, lons = points_in_box(*box)
+    distances = haversine_km(lat, lon, lats, lons)
+    if radius_km is not None:
+        keep = distances <= radius_km
+        ids, distances = ids[keep], distances[keep]
+    order = np.lexsort((ids, distances))
+    page = order[offset:offset + limit]
+    page_ids = [int(i) for i in ids[page]]
+    locations = {
+        loc.id: loc for loc in
+        AdventureLocation.query.filter(AdventureLocation.id.in_(page_ids)).all()
+    } if page_ids else {}
+    return len(ids), [
+        (locations[location_id], float(distance))
+        for location_id, distance in zip(page_ids, distances[page]) if location_id in locations
+    ]
@@ -0,0 +1,230 @@
+import csv
+import gzip
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+
+import geo_index
+import search
+from models import db, AdventureLocation, UserSubmittedSpot, ImportCheckpoint
+from suggestion_cache import suggestion_cache
+from suggestion_engine import invalidate_location_index
+from utils import normalize_name
+
+
+class InvalidRecord(ValueError):
+    """A source record that cannot be imported."""
+
+
+# --- Reading sources ---
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8-sig', newline='')
+    return open(path, encoding='utf-8-sig', newline='')
+
+
+def detect_format(path):
+    base = path[:-3] if path.endswith('.gz') else path
+    extension = os.path.splitext(base)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    raise ValueError(f'Cannot tell the format of {path}; pass csv or jsonl explicitly')
+
+
+def read_records(path, fmt=None):
+    """Yield one dict per record of a CSV or JSON Lines file (optionally gzipped).
+
+    Records are read lazily, so memory does not grow with the file. A JSON
+    line that does not parse is yielded as an InvalidRecord instance so the
+    caller can count it and carry on.
+    """
+    fmt = fmt or detect_format(path)
+    with _open_text(path) as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield InvalidRecord(f'line {line_number}: {e}')
+                continue
+            if not isinstance(record, dict):
+                yield InvalidRecord(f'line {line_number}: expected a JSON object')
+                continue
+            yield record
+
+
+# --- Turning records into rows ---
+
+def _text(record, key, max_length=None, required=False):
+    value = record.get(key)
+    value = str(value).strip() if value is not None else ''
+    if not value:
+        if required:
+            raise InvalidRecord(f'missing {key}')
+        return None
+    if max_length and len(value) > max_length:
+        raise InvalidRecord(f'{key} is longer than {max_length} characters')
+    return value
+
+
+def _number(record, key, cast, low, high):
+    value = record.get(key)
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise InvalidRecord(f'{key} is not a number: {value!r}')
+    if not low <= value <= high:
+        raise InvalidRecord(f'{key} must be between {low} and {high}')
+    return value
+
+
+def location_row(record):
+    name = _text(record, 'name', 100, required=True)
+    return {
+        'name': name,
+        'name_key': normalize_name(name),
+        'category': _text(record, 'category', 50, required=True).lower(),
+        'description': _text(record, 'description'),
+        'difficulty': _number(record, 'difficulty', int, 1, 5),
+        'latitude': _number(record, 'latitude', float, -90.0, 90.0),
+        'longitude': _number(record, 'longitude', float, -180.0, 180.0),
+        'weather_info': _text(record, 'weather_info'),
+    }
+
+
+def spot_row(record):
+    return {
+        'spot_name': _text(record, 'spot_name', 100) or _text(record, 'name', 100, required=True),
+        'location': _text(record, 'location', 100, required=True),
+        'description': _text(record, 'description'),
+        'contributor_name': _text(record, 'contributor_name', 80),
+    }
+
+
+# Per kind: model, name column used for de-duplication, row builder, search entity type
+KINDS = {
+    'locations': (AdventureLocation, 'name', location_row, 'location'),
+    'spots': (UserSubmittedSpot, 'spot_name', spot_row, 'spot'),
+}
+
+
+# --- Writing ---
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+
+def _resume_point(kind, source, fingerprint):
+    checkpoint = ImportCheckpoint.query.filter_by(kind=kind, source=source).first()
+    if checkpoint is None or checkpoint.fingerprint != fingerprint:
+        return 0, 0
+    return checkpoint.rows_read, checkpoint.rows_inserted
+
+
+def _existing_names(model, name_column):
+    column = getattr(model, name_column)
+    return {normalize_name(name) for (name,) in db.session.query(column).yield_per(5000)}
+
+
+def _save_checkpoint(connection, kind, source, fingerprint, rows_read, rows_inserted, completed=False):
+    now = datetime.utcnow()
+    values = {'fingerprint': fingerprint, 'rows_read': rows_read, 'rows_inserted': rows_inserted,
+              'completed_at': now if completed else None, 'updated_at': now}
+    statement = insert(ImportCheckpoint.__table__).values(kind=kind, source=source, **values)
+    connection.execute(statement.on_conflict_do_update(index_elements=['kind', 'source'], set_=values))
+
+
+def _write_chunk(kind, rows, checkpoint):
+    """Insert one chunk with executemany and advance the checkpoint atomically.
+
+    executemany bypasses the ORM events that maintain the geo and search
+    indexes, so the new id range is indexed here in the same transaction.
+    """
+    model, _, _, entity_type = KINDS[kind]
+    table = model.__table__
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+        if rows:
+            last_id = connection.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar()
+            connection.execute(table.insert(), rows)
+            if kind == 'locations':
+                geo_index.index_locations_after(connection, last_id)
+            search.index_rows_after(connection, entity_type, last_id)
+        _save_checkpoint(connection, kind, **checkpoint)
+
+
+def import_file(path, kind='locations', fmt=None, chunk_size=1000, restart=False, log=print):
+    """Stream ``path`` into the database in batched transactions.
+
+    Records whose normalized name already exists, in the database or earlier
+    in the file, are skipped. Progress is checkpointed with every chunk, so
+    re-running after an interruption continues where the last committed chunk
+    ended. Pass ``restart=True`` to read the file from the top again.
+    Returns a dict of counts.
+    """
+    model, name_column, build_row, _ = KINDS[kind]
+    source = os.path.abspath(path)
+    fingerprint = _fingerprint(path)
+    skip, inserted = (0, 0) if restart else _resume_point(kind, source, fingerprint)
+    if skip:
+        log(f'Resuming {path} after {skip} records.')
+
+    seen = _existing_names(model, name_column)
+    stats = {'read': skip, 'inserted': inserted, 'duplicates': 0, 'invalid': 0}
+    records = itertools.islice(read_records(path, fmt), skip, None)
+    started = time.perf_counter()
+
+    while True:
+        batch = list(itertools.islice(records, chunk_size))
+        if not batch:
+            break
+        rows = []
+        for record in batch:
+            stats['read'] += 1
+            try:
+                if isinstance(record, InvalidRecord):
+                    raise record
+                row = build_row(record)
+            except InvalidRecord as e:
+                stats['invalid'] += 1
+                if stats['invalid'] <= 10:
+                    log(f'Skipping record {stats["read"]}: {e}')
+                continue
+            key = normalize_name(row[name_column])
+            if key in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(key)
+            rows.append(row)
+
+        stats['inserted'] += len(rows)
+        _write_chunk(kind, rows, {'source': source, 'fingerprint': fingerprint,
+                                  'rows_read': stats['read'], 'rows_inserted': stats['inserted']})
+        rate = (stats['read'] - skip) / max(time.perf_counter() - started, 1e-9)
+        log(f'{stats["read"]} read, {stats["inserted"]} inserted, {stats["duplicates"]} duplicates, '
+            f'{stats["invalid"]} invalid ({rate:.0f} rows/s)')
+
+    with db.engine.begin() as connection:
+        _save_checkpoint(connection, kind, source, fingerprint, stats['read'], stats['inserted'], completed=True)
+
+    if kind == 'locations' and stats['inserted'] > inserted:
+        # The engine's catalog and cached suggestions never saw these inserts
+        invalidate_location_index()
+        suggestion_cache.clear()
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    return stats
@@ -0,0 +1,201 @@
+"""Baseline schema: the tables as they existed before versioned migrations.
+
+Databases created by ``db.create_all()`` already have these, so every
+statement is ``IF NOT EXISTS``.
+"""
+
+STATEMENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER NOT NULL,
+        username VARCHAR(80) NOT NULL,
+        email VARCHAR(120) NOT NULL,
+        password_hash VARCHAR(128),
+        created_at DATETIME,
+        bio TEXT,
+        PRIMARY KEY (id),
+        UNIQUE (username),
+        UNIQUE (email)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS adventure_locations (
+        id INTEGER NOT NULL,
+        name VARCHAR(100) NOT NULL,
+        description TEXT,
+        category VARCHAR(50) NOT NULL,
+        difficulty INTEGER,
+        latitude FLOAT,
+        longitude FLOAT,
+        weather_info TEXT,
+        average_rating FLOAT,
+        created_at DATETIME,
+        PRIMARY KEY (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS budgets (
+        id INTEGER NOT NULL,
+        transport INTEGER,
+        accommodation INTEGER,
+        food INTEGER,
+        gear INTEGER,
+        total INTEGER,
+        created_at DATETIME,
+        PRIMARY KEY (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS packing_items (
+        id INTEGER NOT NULL,
+        adventure_type VARCHAR(50) NOT NULL,
+        name VARCHAR(100) NOT NULL,
+        category VARCHAR(50),
+        is_default BOOLEAN,
+        PRIMARY KEY (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS user_preferences (
+        user_id INTEGER NOT NULL,
+        preferred_categories TEXT,
+        difficulty_level INTEGER,
+        budget_range TEXT,
+        last_updated DATETIME,
+        PRIMARY KEY (user_id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS trips (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        location_id INTEGER NOT NULL,
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        budget_estimate FLOAT,
+        shared_publicly BOOLEAN,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES users (id),
+        FOREIGN KEY(location_id) REFERENCES adventure_locations (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS user_interests (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        activity_type VARCHAR(50) NOT NULL,
+        experience_level VARCHAR(20),
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS user_submitted_spots (
+        id INTEGER NOT NULL,
+        spot_name VARCHAR(100) NOT NULL,
+        location VARCHAR(100) NOT NULL,
+        description TEXT,
+        contributor_id INTEGER,
+        contributor_name VARCHAR(80),
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(contributor_id) REFERENCES users (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS notifications (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        message TEXT NOT NULL,
+        read BOOLEAN,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS itinerary_items (
+        id INTEGER NOT NULL,
+        trip_id INTEGER NOT NULL,
+        activity_name VARCHAR(200) NOT NULL,
+        start_time DATETIME NOT NULL,
+        end_time DATETIME NOT NULL,
+        notes TEXT,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(trip_id) REFERENCES trips (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS reviews (
+        id INTEGER NOT NULL,
+        place_name VARCHAR(200) NOT NULL,
+        rating INTEGER NOT NULL,
+        comment TEXT,
+        picture_filename VARCHAR(200),
+        user_id INTEGER NOT NULL,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS user_emergency_contacts (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        contact_name VARCHAR(100) NOT NULL,
+        phone_number VARCHAR(20) NOT NULL,
+        relationship VARCHAR(50),
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS user_medical_reports (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        condition_name VARCHAR(150) NOT NULL,
+        notes TEXT,
+        reported_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS suggested_events (
+        id INTEGER NOT NULL,
+        name VARCHAR(150) NOT NULL,
+        description TEXT,
+        location_text VARCHAR(250) NOT NULL,
+        event_date DATE NOT NULL,
+        event_time TIME,
+        category VARCHAR(80),
+        user_id INTEGER NOT NULL,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS user_adventure_difficulty_feedback (
+        id INTEGER NOT NULL,
+        adventure_location_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        submitted_difficulty INTEGER NOT NULL,
+        comment TEXT,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(adventure_location_id) REFERENCES adventure_locations (id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    ''',
+]
+
+
+def upgrade(connection):
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
@@ -0,0 +1,32 @@
+"""Tables for suggestions materialized by ``flask precompute-suggestions``."""
+
+STATEMENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS user_suggestions (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        rank INTEGER NOT NULL,
+        location_id INTEGER NOT NULL,
+        score INTEGER NOT NULL,
+        computed_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES users (id),
+        FOREIGN KEY(location_id) REFERENCES adventure_locations (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS user_suggestion_state (
+        user_id INTEGER NOT NULL,
+        fingerprint VARCHAR(200) NOT NULL,
+        computed_at DATETIME,
+        PRIMARY KEY (user_id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS ix_user_suggestions_user_rank ON user_suggestions (user_id, rank)',
+]
+
+
+def upgrade(connection):
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
@@ -0,0 +1,39 @@
+"""Indexes for foreign keys and the columns routes filter and sort on.
+
+None of the foreign-key columns were indexed, so per-user pages
+(notifications, trips, itineraries, safety info) scanned whole tables.
+"""
+
+INDEXES = [
+    # Listing, filtering and keyset pagination
+    ('ix_adventure_locations_category_id', 'adventure_locations', 'category, id'),
+    ('ix_adventure_locations_name', 'adventure_locations', 'name'),
+    ('ix_packing_items_adventure_type', 'packing_items', 'adventure_type'),
+    ('ix_suggested_events_date_time', 'suggested_events', 'event_date, event_time'),
+    ('ix_suggested_events_category_date', 'suggested_events', 'category, event_date'),
+    ('ix_suggested_events_created_at', 'suggested_events', 'created_at'),
+    ('ix_reviews_created_at', 'reviews', 'created_at'),
+    ('ix_user_submitted_spots_created_at', 'user_submitted_spots', 'created_at'),
+    ('ix_user_interests_activity_user', 'user_interests', 'activity_type, user_id'),
+    ('ix_trips_location_dates', 'trips', 'location_id, start_date, end_date'),
+
+    # Foreign keys, with the route's sort column where it has one
+    ('ix_trips_user_start', 'trips', 'user_id, start_date'),
+    ('ix_itinerary_items_trip_start', 'itinerary_items', 'trip_id, start_time'),
+    ('ix_notifications_user_created', 'notifications', 'user_id, created_at'),
+    ('ix_user_interests_user', 'user_interests', 'user_id'),
+    ('ix_reviews_user', 'reviews', 'user_id'),
+    ('ix_user_submitted_spots_contributor', 'user_submitted_spots', 'contributor_id'),
+    ('ix_user_emergency_contacts_user_created', 'user_emergency_contacts', 'user_id, created_at'),
+    ('ix_user_medical_reports_user_reported', 'user_medical_reports', 'user_id, reported_at'),
+    ('ix_suggested_events_user', 'suggested_events', 'user_id'),
+    ('ix_difficulty_feedback_location', 'user_adventure_difficulty_feedback', 'adventure_location_id'),
+    ('ix_difficulty_feedback_user', 'user_adventure_difficulty_feedback', 'user_id'),
+    ('ix_user_suggestions_location', 'user_suggestions', 'location_id'),
+]
+
+
+def upgrade(connection):
+    for name, table, columns in INDEXES:
+        connection.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+    connection.exec_driver_sql('ANALYZE')
@@ -0,0 +1,23 @@
+"""Progress table for ``flask import-locations`` so interrupted imports resume."""
+
+STATEMENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS import_checkpoints (
+        id INTEGER NOT NULL,
+        kind VARCHAR(20) NOT NULL,
+        source VARCHAR(500) NOT NULL,
+        fingerprint VARCHAR(64) NOT NULL,
+        rows_read INTEGER NOT NULL,
+        rows_inserted INTEGER NOT NULL,
+        completed_at DATETIME,
+        updated_at DATETIME,
+        PRIMARY KEY (id),
+        CONSTRAINT uq_import_checkpoints_kind_source UNIQUE (kind, source)
+    )
+    ''',
+]
+
+
+def upgrade(connection):
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
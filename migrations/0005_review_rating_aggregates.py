@@ -0,0 +1,27 @@
+"""Per-place rating totals maintained by review_stats.
+
+Existing reviews are not counted until ``flask backfill-review-stats`` runs.
+"""
+
+STATEMENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS review_rating_aggregates (
+        place_key VARCHAR(200) NOT NULL,
+        place_name VARCHAR(200) NOT NULL,
+        review_count INTEGER NOT NULL,
+        rating_sum INTEGER NOT NULL,
+        stars_1 INTEGER NOT NULL,
+        stars_2 INTEGER NOT NULL,
+        stars_3 INTEGER NOT NULL,
+        stars_4 INTEGER NOT NULL,
+        stars_5 INTEGER NOT NULL,
+        updated_at DATETIME,
+        PRIMARY KEY (place_key)
+    )
+    ''',
+]
+
+
+def upgrade(connection):
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
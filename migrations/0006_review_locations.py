@@ -0,0 +1,65 @@
+"""Link reviews to locations through a normalized location name.
+
+Adds ``adventure_locations.name_key`` (filled here) and ``reviews.location_id``.
+Place keys now also fold accents, so the rating aggregates are rebuilt
+under the new keys here too. Afterwards run ``flask link-reviews`` to link
+existing reviews.
+"""
+import unicodedata
+from datetime import datetime
+
+COLUMNS = [
+    ('adventure_locations', 'name_key', 'VARCHAR(100)'),
+    ('reviews', 'location_id', 'INTEGER REFERENCES adventure_locations (id)'),
+]
+
+STATEMENTS = [
+    'CREATE INDEX IF NOT EXISTS ix_adventure_locations_name_key ON adventure_locations (name_key)',
+    'CREATE INDEX IF NOT EXISTS ix_reviews_location_created ON reviews (location_id, created_at)',
+]
+
+
+STARS = (1, 2, 3, 4, 5)
+
+
+def _name_key(name):
+    # utils.normalize_name as of this migration
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.split()).casefold()
+
+
+def _rebuild_rating_aggregates(connection):
+    # review_stats.backfill_rating_aggregates as of this migration
+    places = {}
+    for place_name, rating in connection.exec_driver_sql('SELECT place_name, rating FROM reviews'):
+        place_key = _name_key(place_name)
+        if not place_key or rating not in STARS:
+            continue
+        totals = places.setdefault(place_key, [place_name.strip(), 0, 0, dict.fromkeys(STARS, 0)])
+        totals[1] += 1
+        totals[2] += rating
+        totals[3][rating] += 1
+    connection.exec_driver_sql('DELETE FROM review_rating_aggregates')
+    if places:
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')  # SQLAlchemy's DateTime format
+        connection.exec_driver_sql(
+            'INSERT INTO review_rating_aggregates (place_key, place_name, review_count, rating_sum, '
+            'stars_1, stars_2, stars_3, stars_4, stars_5, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(key, name, count, rating_sum, *(stars[star] for star in STARS), now)
+             for key, (name, count, rating_sum, stars) in places.items()])
+
+
+def upgrade(connection):
+    for table, column, definition in COLUMNS:
+        # A database made by create_all() from newer models already has them
+        existing = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info({table})')}
+        if column not in existing:
+            connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
+    rows = connection.exec_driver_sql('SELECT id, name FROM adventure_locations').fetchall()
+    if rows:
+        connection.exec_driver_sql('UPDATE adventure_locations SET name_key = ? WHERE id = ?',
+                                   [(_name_key(name), location_id) for location_id, name in rows])
+    _rebuild_rating_aggregates(connection)
@@ -0,0 +1,21 @@
+"""Per-user unread notification counters, seeded from the notifications table."""
+
+STATEMENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS notification_counters (
+        user_id INTEGER NOT NULL,
+        unread INTEGER NOT NULL,
+        PRIMARY KEY (user_id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    ''',
+    '''
+    INSERT OR REPLACE INTO notification_counters (user_id, unread)
+    SELECT user_id, count(*) FROM notifications WHERE read IS NOT 1 GROUP BY user_id
+    ''',
+]
+
+
+def upgrade(connection):
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
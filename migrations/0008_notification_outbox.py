@@ -0,0 +1,19 @@
+"""Outbox of notification intents drained by the notification dispatcher."""
+
+STATEMENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS notification_outbox (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        message TEXT NOT NULL,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )
+    ''',
+]
+
+
+def upgrade(connection):
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
@@ -0,0 +1,20 @@
+"""Per-location budget cost multipliers used by the budget matrix API."""
+
+STATEMENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS location_cost_factors (
+        location_id INTEGER NOT NULL,
+        transport FLOAT NOT NULL,
+        accommodation FLOAT NOT NULL,
+        food FLOAT NOT NULL,
+        gear FLOAT NOT NULL,
+        PRIMARY KEY (location_id),
+        FOREIGN KEY(location_id) REFERENCES adventure_locations (id)
+    )
+    ''',
+]
+
+
+def upgrade(connection):
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
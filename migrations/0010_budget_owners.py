@@ -0,0 +1,25 @@
+"""Give budgets an owner and a content key for deduplication.
+
+Budgets saved before this have no owner; nothing reads them any more and
+``flask compact-budgets`` deletes them.
+"""
+
+COLUMNS = [
+    ('budgets', 'user_id', 'INTEGER REFERENCES users (id)'),
+    ('budgets', 'content_key', 'VARCHAR(64)'),
+]
+
+STATEMENTS = [
+    'CREATE INDEX IF NOT EXISTS ix_budgets_user_created ON budgets (user_id, created_at)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS ux_budgets_user_content ON budgets (user_id, content_key)',
+]
+
+
+def upgrade(connection):
+    for table, column, definition in COLUMNS:
+        # A database made by create_all() from newer models already has them
+        existing = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info({table})')}
+        if column not in existing:
+            connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
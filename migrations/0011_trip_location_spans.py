@@ -0,0 +1,22 @@
+"""Per-location longest public trip span, used to bound travel-buddy lookups."""
+
+STATEMENTS = [
+    '''
+    CREATE TABLE IF NOT EXISTS trip_location_spans (
+        location_id INTEGER NOT NULL,
+        max_span_days INTEGER NOT NULL,
+        PRIMARY KEY (location_id),
+        FOREIGN KEY(location_id) REFERENCES adventure_locations (id)
+    )
+    ''',
+    '''
+    INSERT OR REPLACE INTO trip_location_spans (location_id, max_span_days)
+    SELECT location_id, CAST(max(julianday(end_date) - julianday(start_date)) AS INTEGER)
+    FROM trips WHERE shared_publicly = 1 GROUP BY location_id
+    ''',
+]
+
+
+def upgrade(connection):
+    for statement in STATEMENTS:
+        connection.exec_driver_sql(statement)
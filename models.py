@@ -1,8 +1,8 @@
 from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from db_profile import ProfiledSQLAlchemy
 
-db = SQLAlchemy()
+db = ProfiledSQLAlchemy()
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -24,7 +24,7 @@ class UserPreference(db.Model):
     preferred_categories = db.Column(db.Text)
     difficulty_level = db.Column(db.Integer)
     budget_range = db.Column(db.Text)
-    last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class AdventureLocation(db.Model):
     __tablename__ = 'adventure_locations'
@@ -38,6 +38,22 @@ class AdventureLocation(db.Model):
     weather_info = db.Column(db.Text)
     average_rating = db.Column(db.Float, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    name_key = db.Column(db.String(100))  # utils.normalize_name(name), set by place_resolver
+
+    __table_args__ = (
+        db.Index('ix_adventure_locations_category_id', 'category', 'id'),
+        db.Index('ix_adventure_locations_name', 'name'),
+        db.Index('ix_adventure_locations_name_key', 'name_key'),
+    )
+
+class LocationCostFactor(db.Model):
+    """Per-location multipliers on the base budget costs (1.0 = base rate)."""
+    __tablename__ = 'location_cost_factors'
+    location_id = db.Column(db.Integer, db.ForeignKey('adventure_locations.id'), primary_key=True)
+    transport = db.Column(db.Float, nullable=False, default=1.0)
+    accommodation = db.Column(db.Float, nullable=False, default=1.0)
+    food = db.Column(db.Float, nullable=False, default=1.0)
+    gear = db.Column(db.Float, nullable=False, default=1.0)
 
 class Trip(db.Model):
     __tablename__ = 'trips'
@@ -51,6 +67,20 @@ class Trip(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     location = db.relationship('AdventureLocation', backref='trips', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_trips_location_dates', 'location_id', 'start_date', 'end_date'),
+        db.Index('ix_trips_user_start', 'user_id', 'start_date'),
+    )
+
+class TripLocationSpan(db.Model):
+    """Longest public trip (end_date - start_date, in days) ever seen per location.
+
+    Only grows; travel_matching uses it to bound start_date when matching.
+    """
+    __tablename__ = 'trip_location_spans'
+    location_id = db.Column(db.Integer, db.ForeignKey('adventure_locations.id'), primary_key=True)
+    max_span_days = db.Column(db.Integer, nullable=False, default=0)
+
 class Budget(db.Model):
     __tablename__ = 'budgets'
     id = db.Column(db.Integer, primary_key=True)
@@ -60,6 +90,15 @@ class Budget(db.Model):
     gear = db.Column(db.Integer)
     total = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Owner; NULL only for rows saved before budgets had owners
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    # sha256 of the figures: saving an identical estimate again refreshes the existing row
+    content_key = db.Column(db.String(64))
+
+    __table_args__ = (
+        db.Index('ix_budgets_user_created', 'user_id', 'created_at'),
+        db.Index('ux_budgets_user_content', 'user_id', 'content_key', unique=True),
+    )
 
 class PackingItem(db.Model):
     __tablename__ = 'packing_items'
@@ -69,6 +108,8 @@ class PackingItem(db.Model):
     category = db.Column(db.String(50))
     is_default = db.Column(db.Boolean, default=True)
 
+    __table_args__ = (db.Index('ix_packing_items_adventure_type', 'adventure_type'),)
+
 class UserInterest(db.Model):
     __tablename__ = 'user_interests'
     id = db.Column(db.Integer, primary_key=True)
@@ -77,6 +118,11 @@ class UserInterest(db.Model):
     experience_level = db.Column(db.String(20))  # beginner, intermediate, advanced
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_user_interests_activity_user', 'activity_type', 'user_id'),
+        db.Index('ix_user_interests_user', 'user_id'),
+    )
+
     @staticmethod
     def get_activity_types():
         return ['Hiking', 'Camping', 'Biking', 'Kayaking', 'Rock Climbing', 'Bird Watching']
@@ -97,6 +143,11 @@ class UserSubmittedSpot(db.Model):
     
     contributor = db.relationship('User', backref='submitted_spots')
 
+    __table_args__ = (
+        db.Index('ix_user_submitted_spots_contributor', 'contributor_id'),
+        db.Index('ix_user_submitted_spots_created_at', 'created_at'),
+    )
+
 class Notification(db.Model):
     __tablename__ = 'notifications'
     id = db.Column(db.Integer, primary_key=True)
@@ -104,10 +155,26 @@ class Notification(db.Model):
     message = db.Column(db.Text, nullable=False)
     read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_notifications_user_created', 'user_id', 'created_at'),)
     
     def mark_as_read(self):
+        """Flag this notification read; the caller commits (see notification_feed.mark_read for batches)."""
         self.read = True
-        db.session.commit()
+
+class NotificationCounter(db.Model):
+    """Unread notifications per user, kept in step by notification_feed."""
+    __tablename__ = 'notification_counters'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+
+class NotificationOutbox(db.Model):
+    """Notifications requested but not yet delivered; drained by notification_outbox."""
+    __tablename__ = 'notification_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # when the intent was queued
 
 class ItineraryItem(db.Model):
     __tablename__ = 'itinerary_items'
@@ -121,6 +188,8 @@ class ItineraryItem(db.Model):
     
     trip = db.relationship('Trip', backref=db.backref('itinerary_items', lazy=True))
 
+    __table_args__ = (db.Index('ix_itinerary_items_trip_start', 'trip_id', 'start_time'),)
+
 class Review(db.Model):
     __tablename__ = 'reviews'
     id = db.Column(db.Integer, primary_key=True)
@@ -130,8 +199,31 @@ class Review(db.Model):
     picture_filename = db.Column(db.String(200), nullable=True)  # Stores the filename of the uploaded picture
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    location_id = db.Column(db.Integer, db.ForeignKey('adventure_locations.id'), nullable=True)  # resolved from place_name
 
     user = db.relationship('User', backref='reviews')
+    location = db.relationship('AdventureLocation', backref=db.backref('reviews', lazy='dynamic'))
+
+    __table_args__ = (
+        db.Index('ix_reviews_user', 'user_id'),
+        db.Index('ix_reviews_created_at', 'created_at'),
+        db.Index('ix_reviews_location_created', 'location_id', 'created_at'),
+    )
+
+
+class ReviewRatingAggregate(db.Model):
+    """Running rating totals per place, kept in step with reviews by review_stats."""
+    __tablename__ = 'review_rating_aggregates'
+    place_key = db.Column(db.String(200), primary_key=True)  # utils.normalize_name(place_name)
+    place_name = db.Column(db.String(200), nullable=False)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    stars_1 = db.Column(db.Integer, nullable=False, default=0)
+    stars_2 = db.Column(db.Integer, nullable=False, default=0)
+    stars_3 = db.Column(db.Integer, nullable=False, default=0)
+    stars_4 = db.Column(db.Integer, nullable=False, default=0)
+    stars_5 = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
 class UserEmergencyContact(db.Model):
@@ -145,6 +237,8 @@ class UserEmergencyContact(db.Model):
 
     user = db.relationship('User', backref=db.backref('emergency_contacts', lazy=True))
 
+    __table_args__ = (db.Index('ix_user_emergency_contacts_user_created', 'user_id', 'created_at'),)
+
 
 class UserMedicalReport(db.Model):
     __tablename__ = 'user_medical_reports'
@@ -156,6 +250,8 @@ class UserMedicalReport(db.Model):
 
     user = db.relationship('User', backref=db.backref('medical_reports', lazy=True))
 
+    __table_args__ = (db.Index('ix_user_medical_reports_user_reported', 'user_id', 'reported_at'),)
+
 
 class SuggestedEvent(db.Model):
     __tablename__ = 'suggested_events'
@@ -171,6 +267,13 @@ class SuggestedEvent(db.Model):
 
     suggester = db.relationship('User', backref=db.backref('suggested_events', lazy='dynamic'))
 
+    __table_args__ = (
+        db.Index('ix_suggested_events_date_time', 'event_date', 'event_time'),
+        db.Index('ix_suggested_events_category_date', 'category', 'event_date'),
+        db.Index('ix_suggested_events_created_at', 'created_at'),
+        db.Index('ix_suggested_events_user', 'user_id'),
+    )
+
     def __repr__(self):
         return f'<SuggestedEvent {self.name}>' 
 
@@ -188,5 +291,49 @@ class UserAdventureDifficultyFeedback(db.Model):
     adventure_location = db.relationship('AdventureLocation', backref=db.backref('difficulty_feedbacks', lazy=True))
     user = db.relationship('User', backref=db.backref('difficulty_feedbacks', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_difficulty_feedback_location', 'adventure_location_id'),
+        db.Index('ix_difficulty_feedback_user', 'user_id'),
+    )
+
     def __repr__(self):
         return f'<UserAdventureDifficultyFeedback {self.user_id} on {self.adventure_location_id} - Difficulty: {self.submitted_difficulty}>'
+
+
+class UserSuggestion(db.Model):
+    """Precomputed suggestion rows written by the precompute-suggestions command."""
+    __tablename__ = 'user_suggestions'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    location_id = db.Column(db.Integer, db.ForeignKey('adventure_locations.id'), nullable=False)
+    score = db.Column(db.Integer, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_user_suggestions_user_rank', 'user_id', 'rank'),
+        db.Index('ix_user_suggestions_location', 'location_id'),
+    )
+
+
+class UserSuggestionState(db.Model):
+    """Fingerprint of the inputs each user's suggestions were computed from."""
+    __tablename__ = 'user_suggestion_state'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    fingerprint = db.Column(db.String(200), nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ImportCheckpoint(db.Model):
+    """How far ``flask import-locations`` got through a source file."""
+    __tablename__ = 'import_checkpoints'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # locations or spots
+    source = db.Column(db.String(500), nullable=False)  # absolute path of the file
+    fingerprint = db.Column(db.String(64), nullable=False)  # size and mtime of the file
+    rows_read = db.Column(db.Integer, nullable=False, default=0)
+    rows_inserted = db.Column(db.Integer, nullable=False, default=0)
+    completed_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('kind', 'source', name='uq_import_checkpoints_kind_source'),)
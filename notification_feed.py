@@ -0,0 +1,294 @@
+"""Live notifications: unread counters, batch mark-read and an SSE stream.
+
+``notification_counters`` holds each user's unread count. Mapper events keep
+it in step with ORM writes to Notification on the flush's own connection,
+and :func:`mark_read` adjusts it in the same transaction as its bulk
+UPDATE, so the navbar badge is a primary-key read.
+
+``/notifications/stream`` is a Server-Sent Events stream. Committed
+notification writes wake the streams of the affected users in this
+process, and every stream also re-checks the database at least every
+``NOTIFICATION_STREAM_POLL`` seconds, so writes made by other processes
+still arrive. Event ids are notification ids: a reconnecting browser
+sends ``Last-Event-ID`` and resumes where it left off. Each open stream
+holds a worker thread, so streams end after ``NOTIFICATION_STREAM_TIMEOUT``
+seconds and the browser reconnects on its own, and a user may hold at most
+``NOTIFICATION_STREAMS_PER_USER`` of them; further tabs poll ``/unread``.
+Streams release the request's database session before streaming and only
+borrow a read connection while they check for changes.
+"""
+import json
+import threading
+import time
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_login import current_user
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from models import db, Notification, NotificationCounter
+from utils import login_required
+
+notifications_bp = Blueprint('notifications_feed', __name__, url_prefix='/notifications')
+
+# Most notifications sent per stream wake-up; the rest follow on the next one
+STREAM_BATCH_SIZE = 50
+# How long the browser waits before reconnecting a closed stream
+STREAM_RETRY_MS = 3000
+
+COUNTER_TABLE = NotificationCounter.__tablename__
+
+_ADD_UNREAD = text(
+    f"INSERT INTO {COUNTER_TABLE} (user_id, unread) VALUES (:user_id, max(:delta, 0)) "
+    f"ON CONFLICT (user_id) DO UPDATE SET unread = max(unread + :delta, 0)"
+)
+
+
+class NotificationBroker:
+    """Wakes the open streams of users whose notifications changed (this process only)."""
+
+    def __init__(self):
+        self._waiters = {}  # user_id -> set of threading.Event
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, limit=None):
+        """A new waiter for ``user_id``, or None if they already hold ``limit`` of them."""
+        waiter = threading.Event()
+        with self._lock:
+            waiters = self._waiters.setdefault(user_id, set())
+            if limit is not None and len(waiters) >= limit:
+                if not waiters:
+                    del self._waiters[user_id]
+                return None
+            waiters.add(waiter)
+        return waiter
+
+    def unsubscribe(self, user_id, waiter):
+        with self._lock:
+            waiters = self._waiters.get(user_id)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[user_id]
+
+    def notify(self, user_ids):
+        with self._lock:
+            waiters = [waiter for user_id in user_ids for waiter in self._waiters.get(user_id, ())]
+        for waiter in waiters:
+            waiter.set()
+
+    def listeners(self):
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+
+notification_broker = NotificationBroker()
+
+
+def init_app(app):
+    app.config.setdefault('NOTIFICATION_STREAM_POLL', 15)       # seconds between database checks
+    app.config.setdefault('NOTIFICATION_STREAM_TIMEOUT', 300)   # seconds before a stream is closed
+    app.config.setdefault('NOTIFICATION_STREAMS_PER_USER', 3)   # open streams (tabs) per user
+    app.register_blueprint(notifications_bp)
+
+
+# --- Counters ---
+
+def add_unread(connection, user_id, delta):
+    """Adjust a user's unread counter on ``connection`` (for writes that bypass the ORM)."""
+    connection.execute(_ADD_UNREAD, {'user_id': user_id, 'delta': delta})
+
+
+def unread_count(user_id, connection=None):
+    """The user's unread notification count, from the counter table."""
+    statement = select(NotificationCounter.unread).where(NotificationCounter.user_id == user_id)
+    if connection is None:
+        return db.session.execute(statement).scalar() or 0
+    return connection.execute(statement).scalar() or 0
+
+
+def mark_read(user_id, notification_ids=None):
+    """Mark the user's notifications read in one UPDATE; None marks all of them.
+
+    Returns the number of notifications that changed. Ids belonging to
+    other users are ignored.
+    """
+    table = Notification.__table__
+    statement = table.update().where(table.c.user_id == user_id, table.c.read.isnot(True))
+    if notification_ids is not None:
+        if not notification_ids:
+            return 0
+        statement = statement.where(table.c.id.in_(notification_ids))
+    changed = db.session.execute(statement.values(read=True)).rowcount
+    if notification_ids is None:
+        # Also repairs a counter that drifted
+        db.session.execute(text(f'UPDATE {COUNTER_TABLE} SET unread = 0 WHERE user_id = :user_id'),
+                           {'user_id': user_id})
+    elif changed:
+        add_unread(db.session.connection(), user_id, -changed)
+    db.session.commit()
+    notification_broker.notify([user_id])
+    return changed
+
+
+@event.listens_for(Notification, 'after_insert')
+def _count_new(mapper, connection, target):
+    if not target.read:
+        add_unread(connection, target.user_id, 1)
+
+
+@event.listens_for(Notification, 'after_update')
+def _count_read_change(mapper, connection, target):
+    history = get_history(target, 'read')
+    if history.has_changes():
+        was_read = bool(history.deleted[0]) if history.deleted else False
+        if was_read != bool(target.read):
+            add_unread(connection, target.user_id, -1 if target.read else 1)
+
+
+@event.listens_for(Notification, 'after_delete')
+def _count_deleted(mapper, connection, target):
+    if not target.read:
+        add_unread(connection, target.user_id, -1)
+
+
+# --- Waking streams after commit ---
+
+@event.listens_for(Session, 'after_flush')
+def _collect_recipients(session, flush_context):
+    recipients = session.info.setdefault('notification_recipients', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Notification):
+            recipients.add(obj.user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_recipients(session):
+    recipients = session.info.pop('notification_recipients', None)
+    if recipients:
+        notification_broker.notify(recipients)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_recipients(session):
+    session.info.pop('notification_recipients', None)
+
+
+# --- Stream ---
+
+def _sse(event_name, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {event_name}', f'data: {json.dumps(data)}']
+    return '\n'.join(lines) + '\n\n'
+
+
+def notification_dict(notification):
+    return {
+        'id': notification.id,
+        'message': notification.message,
+        'read': bool(notification.read),
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+def _latest_id(connection, user_id):
+    table = Notification.__table__
+    return connection.execute(select(db.func.coalesce(db.func.max(table.c.id), 0))
+                              .where(table.c.user_id == user_id)).scalar()
+
+
+def _new_since(connection, user_id, last_id):
+    table = Notification.__table__
+    return connection.execute(
+        select(table.c.id, table.c.message, table.c.read, table.c.created_at)
+        .where(table.c.user_id == user_id, table.c.id > last_id)
+        .order_by(table.c.id).limit(STREAM_BATCH_SIZE)
+    ).all()
+
+
+def notification_events(user_id, engine, waiter, last_id=None, poll=15, timeout=300):
+    """Generator of SSE frames for ``user_id``: new notifications and unread counts.
+
+    ``waiter`` comes from ``notification_broker.subscribe`` and is released
+    when the generator ends. Needs no app or request context: each check
+    borrows a connection from ``engine``. Without ``last_id`` the stream
+    starts after the user's newest notification and only reports the
+    unread count.
+    """
+    try:
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+        deadline = time.monotonic() + timeout
+        unread = None
+        while True:
+            waiter.clear()  # before reading, so a commit during the read wakes the next wait
+            with engine.connect() as connection:
+                if last_id is None:
+                    last_id = _latest_id(connection, user_id)
+                rows = _new_since(connection, user_id, last_id)
+                count = unread_count(user_id, connection)
+            for row in rows:
+                last_id = row.id
+                yield _sse('notification', notification_dict(row), event_id=row.id)
+            if count != unread:
+                unread = count
+                yield _sse('unread', {'unread': count})
+            elif not rows:
+                yield ': keep-alive\n\n'
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if len(rows) < STREAM_BATCH_SIZE:
+                waiter.wait(min(poll, remaining))
+    finally:
+        notification_broker.unsubscribe(user_id, waiter)
+
+
+@notifications_bp.route('/stream', methods=['GET'])
+@login_required
+def notification_stream():
+    """Server-Sent Events: ``notification`` for each new one, ``unread`` for count changes."""
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID must be a notification id'}), 400
+    user_id = current_user.id
+    waiter = notification_broker.subscribe(user_id, current_app.config['NOTIFICATION_STREAMS_PER_USER'])
+    if waiter is None:
+        response = jsonify({'error': 'Too many open notification streams'})
+        response.headers['Retry-After'] = str(current_app.config['NOTIFICATION_STREAM_TIMEOUT'])
+        return response, 429
+    body = notification_events(user_id, db.read_engine, waiter, last_id,
+                               poll=current_app.config['NOTIFICATION_STREAM_POLL'],
+                               timeout=current_app.config['NOTIFICATION_STREAM_TIMEOUT'])
+    # Don't pin the pool connection the user lookup checked out for the
+    # life of the stream; the generator runs without the request context
+    db.session.remove()
+    response = Response(body, mimetype='text/event-stream')
+    # Also covers a client that disconnects before the generator starts
+    response.call_on_close(lambda: notification_broker.unsubscribe(user_id, waiter))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx pass events through unbuffered
+    return response
+
+
+@notifications_bp.route('/unread', methods=['GET'])
+@login_required
+def unread():
+    return jsonify({'unread': unread_count(current_user.id)})
+
+
+@notifications_bp.route('/mark-read', methods=['POST'])
+@login_required
+def mark_notifications_read():
+    """Mark several notifications read: ``{"ids": [...]}`` or ``{"all": true}``."""
+    payload = request.get_json(silent=True) or {}
+    if payload.get('all'):
+        ids = None
+    else:
+        ids = payload.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return jsonify({'error': 'ids must be a list of notification ids, or pass "all": true'}), 400
+    changed = mark_read(current_user.id, ids)
+    return jsonify({'success': True, 'marked': changed, 'unread': unread_count(current_user.id)})
@@ -0,0 +1,223 @@
+"""Transactional outbox for notifications.
+
+Request handlers call :func:`enqueue`, which only appends rows to
+``notification_outbox`` in the caller's transaction: the intent commits or
+rolls back with the write that caused it, and fanning out to many
+recipients costs one executemany instead of N ORM inserts. The dispatcher
+drains the outbox in batches. Each batch takes the write lock, drops
+duplicate (recipient, message) pairs, bulk-inserts the notifications,
+bumps the unread counters and deletes the drained rows in one transaction,
+then wakes the recipients' notification streams.
+
+``NOTIFICATION_OUTBOX_MODE`` picks who drains:
+
+* ``thread`` (default): a daemon thread, started with the first request
+  and woken when a commit added intents; it also polls every
+  ``NOTIFICATION_OUTBOX_INTERVAL`` seconds, so intents left by a crashed
+  process or a ``manual`` one are delivered without new traffic.
+* ``inline``: the committing thread drains right after its commit, so
+  tests see notifications as soon as the request returns.
+* ``manual``: nothing drains until :meth:`OutboxDispatcher.drain` or
+  ``flask dispatch-notifications`` runs.
+"""
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from models import db, Notification, NotificationOutbox
+from notification_feed import add_unread, notification_broker
+
+logger = logging.getLogger(__name__)
+
+MODES = ('thread', 'inline', 'manual')
+
+_outbox = NotificationOutbox.__table__
+_notifications = Notification.__table__
+
+
+def enqueue(user_ids, message, session=None):
+    """Queue ``message`` for each of ``user_ids`` in the current transaction.
+
+    Nothing is delivered until the caller commits. Returns the number of
+    intents added.
+    """
+    session = session or db.session
+    user_ids = list(dict.fromkeys(user_ids))  # drop repeats, keep order
+    if not user_ids:
+        return 0
+    now = datetime.utcnow()
+    session.execute(_outbox.insert(), [
+        {'user_id': user_id, 'message': message, 'created_at': now} for user_id in user_ids
+    ])
+    session.info['notification_outbox_pending'] = True
+    return len(user_ids)
+
+
+class OutboxDispatcher:
+    def __init__(self):
+        self.app = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self.batches = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self._latencies = deque(maxlen=1000)  # seconds from enqueue to delivery
+
+    def init_app(self, app):
+        app.config.setdefault('NOTIFICATION_OUTBOX_MODE', 'thread')
+        app.config.setdefault('NOTIFICATION_OUTBOX_BATCH', 500)      # intents per transaction
+        app.config.setdefault('NOTIFICATION_OUTBOX_INTERVAL', 1.0)   # seconds between polls
+        if app.config['NOTIFICATION_OUTBOX_MODE'] not in MODES:
+            raise ValueError(f"NOTIFICATION_OUTBOX_MODE must be one of {MODES}, "
+                             f"not {app.config['NOTIFICATION_OUTBOX_MODE']!r}")
+        self.app = app
+        # Not at import or CLI time: the schema may not be migrated yet
+        app.before_first_request(self._start)
+
+    def _start(self):
+        if self.app.config['NOTIFICATION_OUTBOX_MODE'] == 'thread':
+            self._ensure_thread()
+
+    # --- Triggering ---
+
+    def wake(self):
+        """Called after a commit that queued intents."""
+        mode = self.app.config['NOTIFICATION_OUTBOX_MODE']
+        if mode == 'inline':
+            self.drain()
+        elif mode == 'thread':
+            self._ensure_thread()
+            self._wake.set()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='notification-outbox', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.app.config['NOTIFICATION_OUTBOX_INTERVAL'])
+            self._wake.clear()
+            if self._stopping:
+                break
+            with self.app.app_context():
+                try:
+                    self.drain()
+                except Exception:
+                    logger.exception('Notification outbox dispatch failed')
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+
+    # --- Draining ---
+
+    def drain(self, max_batches=None):
+        """Deliver queued intents batch by batch until the outbox is empty.
+
+        Returns the number of notifications inserted.
+        """
+        delivered = batches = 0
+        with self._drain_lock:
+            while max_batches is None or batches < max_batches:
+                inserted, drained = self._dispatch_batch()
+                if not drained:
+                    break
+                delivered += inserted
+                batches += 1
+        return delivered
+
+    def _dispatch_batch(self):
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+            rows = connection.execute(
+                select(_outbox.c.id, _outbox.c.user_id, _outbox.c.message, _outbox.c.created_at)
+                .order_by(_outbox.c.id).limit(self.app.config['NOTIFICATION_OUTBOX_BATCH'])
+            ).all()
+            if not rows:
+                return 0, 0
+            # One notification per (recipient, message); the earliest intent's time wins
+            unique = {}
+            for row in rows:
+                unique.setdefault((row.user_id, row.message), row)
+            connection.execute(_notifications.insert(), [
+                {'user_id': row.user_id, 'message': row.message, 'read': False, 'created_at': row.created_at}
+                for row in unique.values()
+            ])
+            recipients = Counter(user_id for user_id, _ in unique)
+            for user_id, count in recipients.items():
+                add_unread(connection, user_id, count)
+            # Rows are taken in id order under the write lock, so this is exactly the batch
+            connection.execute(_outbox.delete().where(_outbox.c.id <= rows[-1].id))
+        delivered_at = datetime.utcnow()
+
+        notification_broker.notify(recipients)
+        with self._lock:
+            self.batches += 1
+            self.delivered += len(unique)
+            self.coalesced += len(rows) - len(unique)
+            self._latencies.extend((delivered_at - row.created_at).total_seconds() for row in rows)
+        return len(unique), len(rows)
+
+    # --- Reporting ---
+
+    def stats(self):
+        """Queue depth and delivery latency (over the last 1000 intents) for this process."""
+        with db.engine.connect() as connection:
+            depth, oldest = connection.execute(
+                select(func.count(_outbox.c.id), func.min(_outbox.c.created_at))).one()
+        if isinstance(oldest, str):
+            oldest = datetime.fromisoformat(oldest)
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'queue_depth': depth,
+                'oldest_age_seconds': round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else None,
+                'batches': self.batches,
+                'delivered': self.delivered,
+                'coalesced': self.coalesced,
+                'mode': self.app.config['NOTIFICATION_OUTBOX_MODE'],
+                'dispatcher_running': self._thread is not None and self._thread.is_alive(),
+            }
+        if latencies:
+            stats['latency_ms'] = {
+                'avg': round(sum(latencies) / len(latencies) * 1000, 1),
+                'p95': round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+                'max': round(latencies[-1] * 1000, 1),
+            }
+        else:
+            stats['latency_ms'] = None
+        return stats
+
+
+outbox_dispatcher = OutboxDispatcher()
+
+
+def init_app(app):
+    outbox_dispatcher.init_app(app)
+
+
+# --- Waking the dispatcher after commit ---
+
+@event.listens_for(Session, 'after_commit')
+def _wake_dispatcher(session):
+    if session.info.pop('notification_outbox_pending', None):
+        outbox_dispatcher.wake()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('notification_outbox_pending', None)
@@ -0,0 +1,124 @@
+"""Packing lists composed from immutable templates.
+
+``PackingItem`` rows are read once per process into a template per
+adventure type: a read-only mapping of category to a tuple of item names.
+Items without a category are filed under "Activity Specific". Lists are
+composed from those templates plus the base and seasonal items, and
+memoized per ``(adventure_type, season)`` in a bounded cache. Every
+result is a ``MappingProxyType`` of tuples, so cached lists can be shared
+between requests and no caller can change them. Writes to PackingItem
+drop the templates and the cache.
+"""
+import threading
+from functools import lru_cache
+from types import MappingProxyType
+
+from sqlalchemy import event
+
+from models import db, PackingItem
+
+BASE_ITEMS = MappingProxyType({
+    'Clothing': ('Socks', 'Underwear', 'T-shirts', 'Long-sleeve shirts', 'Pants/Shorts', 'Rain jacket'),
+    'Personal Care': ('Toothbrush', 'Toothpaste', 'Sunscreen', 'First Aid Kit', 'Hand Sanitizer',
+                      'Insect Repellent', 'Personal Medications'),
+})
+
+# Extra items per season, by category
+_COLD_WEATHER = MappingProxyType({'Clothing': ('Warm Jacket', 'Thermal Layers', 'Gloves')})
+SEASON_ITEMS = MappingProxyType({
+    'summer': MappingProxyType({}),
+    'spring': MappingProxyType({}),
+    'fall': _COLD_WEATHER,
+    'winter': _COLD_WEATHER,
+})
+
+# Seeded into packing_items by init_db; also used for types with no rows yet
+DEFAULT_ACTIVITY_ITEMS = MappingProxyType({
+    'camping': ('Tent', 'Sleeping Bag', 'Camping Stove', 'Cooler'),
+    'hiking': ('Hiking Boots', 'Backpack', 'Trekking Poles', 'Trail Map'),
+    'rock_climbing': ('Climbing Shoes', 'Harness', 'Ropes', 'Chalk Bag'),
+    'kayaking': ('Life Jacket', 'Dry Bags', 'Paddle', 'Spray Skirt'),
+})
+
+ACTIVITY_CATEGORY = 'Activity Specific'
+
+# Composed lists kept; there are only types x seasons distinct keys
+CACHE_SIZE = 128
+
+_templates = None
+_templates_lock = threading.Lock()
+
+
+def _load_templates():
+    grouped = {}
+    rows = db.session.query(PackingItem.adventure_type, PackingItem.category, PackingItem.name)\
+        .order_by(PackingItem.id).all()
+    for adventure_type, category, name in rows:
+        categories = grouped.setdefault(adventure_type.lower(), {})
+        categories.setdefault(category or ACTIVITY_CATEGORY, []).append(name)
+    for adventure_type, names in DEFAULT_ACTIVITY_ITEMS.items():
+        grouped.setdefault(adventure_type, {ACTIVITY_CATEGORY: names})
+    return MappingProxyType({
+        adventure_type: MappingProxyType({category: tuple(names) for category, names in categories.items()})
+        for adventure_type, categories in grouped.items()
+    })
+
+
+def get_templates():
+    """Adventure type -> read-only mapping of category -> item names."""
+    global _templates
+    templates = _templates
+    if templates is None:
+        with _templates_lock:
+            if _templates is None:
+                _templates = _load_templates()
+            templates = _templates
+    return templates
+
+
+def invalidate_templates():
+    global _templates
+    _templates = None
+    _compose.cache_clear()
+
+
+@event.listens_for(PackingItem, 'after_insert')
+@event.listens_for(PackingItem, 'after_update')
+@event.listens_for(PackingItem, 'after_delete')
+def _templates_changed(mapper, connection, target):
+    invalidate_templates()
+
+
+def _merge(checklist, items):
+    for category, names in items.items():
+        existing = checklist.get(category, ())
+        checklist[category] = existing + tuple(name for name in names if name not in existing)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compose(adventure_type, season):
+    checklist = dict(BASE_ITEMS)
+    _merge(checklist, get_templates()[adventure_type])
+    _merge(checklist, SEASON_ITEMS[season])
+    return MappingProxyType(checklist)
+
+
+def packing_list(adventure_type, duration, season):
+    """The checklist for a trip: a read-only mapping of category -> tuple of names.
+
+    ``duration`` is validated but does not change the list yet, so it is not
+    part of the cache key. Raises ValueError for an unknown adventure type
+    or season, or a duration below one day.
+    """
+    adventure_type, season = adventure_type.lower(), season.lower()
+    if adventure_type not in get_templates():
+        raise ValueError(f'Unknown adventure type {adventure_type!r}')
+    if season not in SEASON_ITEMS:
+        raise ValueError(f'Unknown season {season!r}')
+    if duration < 1:
+        raise ValueError('Duration must be at least one day')
+    return _compose(adventure_type, season)
+
+
+def cache_info():
+    return _compose.cache_info()
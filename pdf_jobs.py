@@ -0,0 +1,238 @@
+"""Background PDF export jobs.
+
+A request snapshots the data to render (see ``pdf_render.itinerary_data``)
+and enqueues a job; the response carries a job id to poll. Jobs run on a
+small coordinator thread pool, which bounds how many exports run at once,
+and fan their documents out to a process pool so fpdf work runs in parallel
+outside the web process's GIL. Identical jobs that are queued, running or
+recently finished share one job. When a zip is ready the owner also gets a
+Notification.
+
+Job state lives in this process; the finished files live in
+``PDF_EXPORT_FOLDER`` until ``PDF_JOB_RETENTION`` seconds after completion.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.utils import secure_filename
+
+from models import db
+from notification_outbox import enqueue
+from pdf_render import RENDERERS, content_key, pdf_cache
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class QueueFull(Exception):
+    """Raised when the export queue already holds its maximum number of jobs."""
+
+
+class PDFJob:
+    def __init__(self, job_id, user_id, key, documents, filename, notify):
+        self.id = job_id
+        self.user_id = user_id
+        self.key = key
+        self.documents = documents  # [(filename in archive, kind, data)]
+        self.filename = filename
+        self.notify = notify
+        self.status = QUEUED
+        self.error = None
+        self.path = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done_count = 0
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'documents': len(self.documents),
+            'rendered': self.done_count,
+            'filename': self.filename,
+            'error': self.error,
+        }
+
+
+def _render(kind, data):
+    # Runs in a worker process
+    return RENDERERS[kind](data)
+
+
+class PDFJobQueue:
+    def __init__(self):
+        self.app = None
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+        self._coordinators = None
+        self._processes = None
+
+    def init_app(self, app):
+        app.config.setdefault('PDF_EXPORT_FOLDER', os.path.join(app.instance_path, 'exports'))
+        app.config.setdefault('PDF_JOB_CONCURRENCY', 2)      # jobs running at once
+        app.config.setdefault('PDF_JOB_MAX_PENDING', 20)     # queued + running jobs
+        app.config.setdefault('PDF_JOB_WORKERS', min(os.cpu_count() or 1, 4))  # 0 renders in-thread
+        app.config.setdefault('PDF_JOB_RETENTION', 3600)     # seconds a finished export is kept
+        os.makedirs(app.config['PDF_EXPORT_FOLDER'], exist_ok=True)
+        self.app = app
+
+    # --- Pools ---
+
+    def _executors(self):
+        with self._lock:
+            if self._coordinators is None:
+                self._coordinators = ThreadPoolExecutor(
+                    max_workers=self.app.config['PDF_JOB_CONCURRENCY'], thread_name_prefix='pdf-job')
+                workers = self.app.config['PDF_JOB_WORKERS']
+                if workers:
+                    # spawn, not fork: this process has live threads and DB connections
+                    self._processes = ProcessPoolExecutor(
+                        max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._coordinators, self._processes
+
+    def shutdown(self):
+        with self._lock:
+            coordinators, processes = self._coordinators, self._processes
+            self._coordinators = self._processes = None
+        if coordinators:
+            coordinators.shutdown(wait=True)
+        if processes:
+            processes.shutdown(wait=True)
+
+    # --- Jobs ---
+
+    def submit(self, user_id, documents, filename, notify=True):
+        """Queue a zip of ``documents`` for ``user_id`` and return its PDFJob.
+
+        ``documents`` is a list of ``(name_in_zip, kind, data)``. An identical
+        job that is pending, running or still retained is returned instead of
+        starting a new one. Raises QueueFull when too many jobs are pending.
+        """
+        digest = hashlib.sha256(repr((user_id, filename, [
+            (name, content_key(kind, data)) for name, kind, data in documents
+        ])).encode()).hexdigest()
+
+        self._expire()
+        with self._lock:
+            existing = self._jobs.get(self._by_key.get(digest))
+            if existing is not None and existing.status != FAILED:
+                return existing
+            pending = sum(1 for job in self._jobs.values() if job.status in (QUEUED, RUNNING))
+            if pending >= self.app.config['PDF_JOB_MAX_PENDING']:
+                raise QueueFull(f'{pending} exports are already pending')
+            job = PDFJob(secrets.token_urlsafe(12), user_id, digest, documents, filename, notify)
+            self._jobs[job.id] = job
+            self._by_key[digest] = job.id
+
+        coordinators, _ = self._executors()
+        coordinators.submit(self._run, job)
+        return job
+
+    def get(self, job_id, user_id=None):
+        """The job with ``job_id``, or None (also when owned by someone else)."""
+        self._expire()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            return None
+        return job
+
+    def _run(self, job):
+        job.status = RUNNING
+        try:
+            job.path = self._build_zip(job)
+            job.status = DONE
+        except Exception as e:
+            logger.exception('PDF export job %s failed', job.id)
+            job.status = FAILED
+            job.error = str(e) or e.__class__.__name__
+        finally:
+            job.finished_at = time.time()
+            job.documents = [(name, kind, None) for name, kind, _ in job.documents]  # drop the snapshots
+        if job.notify:
+            self._notify(job)
+        # Also here, so old zips go away even when nobody submits new exports
+        self._expire()
+
+    def _build_zip(self, job):
+        _, processes = self._executors()
+        # Reuse anything the request-time cache already rendered
+        rendered, futures = {}, {}
+        for name, kind, data in job.documents:
+            key = content_key(kind, data)
+            pdf = pdf_cache.get(key)
+            if pdf is not None:
+                rendered[name] = pdf
+                job.done_count += 1
+            elif processes is not None:
+                futures[name] = (key, processes.submit(_render, kind, data))
+            else:
+                futures[name] = (key, None)
+
+        for name, kind, data in job.documents:
+            if name not in futures:
+                continue
+            key, future = futures[name]
+            pdf = future.result() if future is not None else _render(kind, data)
+            pdf_cache.set(key, pdf)
+            rendered[name] = pdf
+            job.done_count += 1
+
+        folder = self.app.config['PDF_EXPORT_FOLDER']
+        path = os.path.join(folder, f'{job.id}.zip')
+        partial = path + '.part'
+        with zipfile.ZipFile(partial, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, _, _ in job.documents:
+                archive.writestr(name, rendered[name])
+        os.replace(partial, path)
+        return path
+
+    def _notify(self, job):
+        if job.status == DONE:
+            message = f'Your export "{job.filename}" is ready: /export/jobs/{job.id}/download'
+        else:
+            message = f'Your export "{job.filename}" failed. Please try again.'
+        with self.app.app_context():
+            try:
+                enqueue([job.user_id], message)
+                db.session.commit()
+            except Exception:
+                logger.exception('Could not notify user %s about export job %s', job.user_id, job.id)
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+    def _expire(self):
+        retention = self.app.config['PDF_JOB_RETENTION']
+        cutoff = time.time() - retention
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+                if self._by_key.get(job.key) == job.id:
+                    del self._by_key[job.key]
+        for job in expired:
+            if job.path and os.path.exists(job.path):
+                os.remove(job.path)
+
+
+pdf_jobs = PDFJobQueue()
+
+
+def init_app(app):
+    pdf_jobs.init_app(app)
+
+
+def itinerary_filename(itinerary):
+    name = secure_filename(itinerary['location_name']) or 'trip'
+    return f"itinerary_{itinerary['trip_id']}_{name}.pdf"
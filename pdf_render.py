@@ -0,0 +1,207 @@
+"""In-memory PDF rendering with a content-addressed cache.
+
+Renderers take plain data (no ORM objects) and return the PDF as bytes, so
+the same inputs always map to the same cache key and the functions can run
+in worker processes. Routes send the bytes straight from memory instead of
+writing shared files under ``static/``.
+"""
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from flask import send_file
+
+from fpdf import FPDF
+
+# Bump when a layout changes so previously cached PDFs are not served
+RENDER_VERSION = 2
+
+
+# --- Renderers ---
+
+def _new_document(title, title_size=14):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=title_size)
+    pdf.cell(200, 10, txt=title, ln=True, align='C')
+    pdf.ln(10)
+    return pdf
+
+
+def _dated_line(pdf, label, day):
+    # Only dates taken from the data: cached bytes are reused for the same data
+    pdf.set_font("Arial", size=12)
+    if day is not None:
+        pdf.cell(200, 10, txt=f"{label}: {day.strftime('%Y-%m-%d')}", ln=True)
+    pdf.ln(10)
+
+
+def render_budget(budget):
+    """``budget`` maps transport/accommodation/food/gear/total to amounts, and
+    ``estimated_on`` to the date of the estimate (optional)."""
+    pdf = _new_document("Trip Budget Estimation")
+    _dated_line(pdf, "Estimated on", budget.get('estimated_on'))
+    for label in ('Transport', 'Accommodation', 'Food', 'Gear', 'Total'):
+        pdf.cell(200, 10, txt=f"{label}: ${budget[label.lower()]}", ln=True)
+    return bytes(pdf.output())
+
+
+def render_checklist(checklist):
+    """``checklist`` has ``adventure_type`` and a list of item ``names``."""
+    pdf = _new_document(f"Packing Checklist: {checklist['adventure_type']}")
+    pdf.set_font("Arial", size=12)
+    pdf.ln(10)
+    for name in checklist['names']:
+        pdf.cell(200, 10, txt=f"- {name}", ln=True)
+    return bytes(pdf.output())
+
+
+def render_itinerary(itinerary):
+    """``itinerary`` as built by :func:`itinerary_data`."""
+    pdf = _new_document(f"Trip Itinerary - {itinerary['location_name']}", title_size=16)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt=f"From: {itinerary['start_date'].strftime('%Y-%m-%d')} "
+                          f"To: {itinerary['end_date'].strftime('%Y-%m-%d')}", ln=True)
+    pdf.ln(5)
+    for item in itinerary['items']:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(200, 10, txt=item['activity_name'], ln=True)
+        pdf.set_font("Arial", size=10)
+        pdf.cell(200, 10, txt=f"Time: {item['start_time'].strftime('%H:%M')} - {item['end_time'].strftime('%H:%M')}", ln=True)
+        if item['notes']:
+            pdf.multi_cell(200, 10, txt=f"Notes: {item['notes']}")
+        pdf.ln(5)
+    return bytes(pdf.output())
+
+
+RENDERERS = {
+    'budget': render_budget,
+    'checklist': render_checklist,
+    'itinerary': render_itinerary,
+}
+
+
+def itinerary_data(trip, items):
+    """Plain-data snapshot of a trip and its itinerary items for rendering."""
+    return {
+        'trip_id': trip.id,
+        'location_name': trip.location.name,
+        'start_date': trip.start_date,
+        'end_date': trip.end_date,
+        'items': [{
+            'activity_name': item.activity_name,
+            'start_time': item.start_time,
+            'end_time': item.end_time,
+            'notes': item.notes,
+        } for item in items],
+    }
+
+
+def content_key(kind, data):
+    """Hash of everything that affects a document's content."""
+    payload = json.dumps([RENDER_VERSION, kind, data], sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# --- Cache ---
+
+class PDFCache:
+    """Bounded LRU cache of rendered PDFs keyed by content hash.
+
+    Bounded both by entry count and by total bytes. Entries never go stale:
+    changed inputs produce a different key, and old keys age out.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_entries=None, max_bytes=None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._trim()
+
+    def get(self, key):
+        with self._lock:
+            pdf = self._entries.get(key)
+            if pdf is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pdf
+
+    def set(self, key, pdf):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = pdf
+            self._size += len(pdf)
+            self._trim()
+
+    def get_or_render(self, kind, data):
+        """Return ``(key, pdf_bytes)``, rendering only on a miss."""
+        key = content_key(kind, data)
+        pdf = self.get(key)
+        if pdf is None:
+            pdf = RENDERERS[kind](data)
+            self.set(key, pdf)
+        return key, pdf
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _trim(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            _, pdf = self._entries.popitem(last=False)
+            self._size -= len(pdf)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+
+pdf_cache = PDFCache()
+
+
+def init_app(app):
+    app.config.setdefault('PDF_CACHE_MAX_ENTRIES', 256)
+    app.config.setdefault('PDF_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+    pdf_cache.configure(max_entries=app.config['PDF_CACHE_MAX_ENTRIES'],
+                        max_bytes=app.config['PDF_CACHE_MAX_BYTES'])
+
+
+def pdf_response(kind, data, filename):
+    """Render (or reuse) a PDF and send it from memory.
+
+    The content hash doubles as the ETag, so a client re-downloading an
+    unchanged document gets a 304 without a body.
+    """
+    key, pdf = pdf_cache.get_or_render(kind, data)
+    response = send_file(io.BytesIO(pdf), mimetype='application/pdf', as_attachment=True,
+                         download_name=filename, etag=key, conditional=True, max_age=0)
+    response.cache_control.private = True
+    return response
@@ -0,0 +1,96 @@
+"""Link free-text review place names to AdventureLocation rows.
+
+Locations carry ``name_key``, their name run through
+``utils.normalize_name`` (case, whitespace and accents folded), under an
+index. A review's ``place_name`` is normalized the same way and looked up
+there when the review is written, so "Lac Léman " and "lac leman" land on
+the same location. Reviews written before a matching location existed are
+linked by :func:`resolve_reviews` (``flask link-reviews``).
+"""
+from sqlalchemy import event, select
+from sqlalchemy.orm.attributes import get_history
+
+from models import db, AdventureLocation, Review
+from utils import normalize_name
+
+RESOLVE_BATCH_SIZE = 1000
+
+_locations = AdventureLocation.__table__
+_reviews = Review.__table__
+
+
+def _lookup(connection, keys):
+    """Map normalized names to location ids; the lowest id wins on duplicates."""
+    keys = list(keys)
+    if not keys:
+        return {}
+    rows = connection.execute(
+        select(_locations.c.name_key, db.func.min(_locations.c.id))
+        .where(_locations.c.name_key.in_(keys))
+        .group_by(_locations.c.name_key)
+    )
+    return dict(rows.all())
+
+
+def resolve_location_id(place_name, connection=None):
+    """Id of the location whose normalized name matches ``place_name``, or None."""
+    key = normalize_name(place_name)
+    if not key:
+        return None
+    if connection is None:
+        connection = db.session.connection()
+    return _lookup(connection, [key]).get(key)
+
+
+def resolve_reviews(batch_size=RESOLVE_BATCH_SIZE, log=print):
+    """Set ``location_id`` on unlinked reviews whose place name matches a location.
+
+    Walks the unlinked reviews in id order, one transaction per batch, with
+    a single location lookup per batch. Returns ``(scanned, linked)``.
+    """
+    scanned = linked = 0
+    last_id = 0
+    while True:
+        with db.engine.begin() as connection:
+            batch = connection.execute(
+                select(_reviews.c.id, _reviews.c.place_name)
+                .where(_reviews.c.location_id.is_(None), _reviews.c.id > last_id)
+                .order_by(_reviews.c.id).limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+            keys = {review.id: normalize_name(review.place_name) for review in batch}
+            found = _lookup(connection, set(keys.values()) - {''})
+            updates = [{'review_id': review_id, 'location_id': found[key]}
+                       for review_id, key in keys.items() if key in found]
+            if updates:
+                connection.execute(
+                    _reviews.update().where(_reviews.c.id == db.bindparam('review_id'))
+                    .values(location_id=db.bindparam('location_id')),
+                    updates
+                )
+        scanned += len(batch)
+        linked += len(updates)
+        log(f'{scanned} reviews scanned, {linked} linked')
+    return scanned, linked
+
+
+# --- Keep keys and links current on ORM writes ---
+
+@event.listens_for(AdventureLocation, 'before_insert')
+@event.listens_for(AdventureLocation, 'before_update')
+def _set_name_key(mapper, connection, target):
+    target.name_key = normalize_name(target.name)
+
+
+@event.listens_for(Review, 'before_insert')
+def _link_new_review(mapper, connection, target):
+    if target.location_id is None:
+        target.location_id = resolve_location_id(target.place_name, connection)
+
+
+@event.listens_for(Review, 'before_update')
+def _relink_review(mapper, connection, target):
+    if get_history(target, 'place_name').has_changes() and not get_history(target, 'location_id').has_changes():
+        target.location_id = resolve_location_id(target.place_name, connection)
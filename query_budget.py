@@ -0,0 +1,72 @@
+import logging
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view runs more SQL statements than its declared budget."""
+
+
+def query_budget(max_queries):
+    """Declare the most SQL statements a view may run per request.
+
+    The count includes everything executed while handling the request,
+    such as the Flask-Login user lookup. Overruns raise QueryBudgetExceeded
+    when QUERY_BUDGET_ENFORCE is set (the default under TESTING), so N+1
+    regressions fail the test suite; otherwise they are logged.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+    for statements in _active_counters:
+        statements.append(statement)
+
+
+def _check_budget(response):
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    count = g.get('query_count', 0)
+    if current_app.debug or current_app.testing:
+        response.headers['X-Query-Count'] = str(count)
+    if budget is not None and count > budget:
+        message = f'{request.endpoint} ran {count} queries, budget is {budget}'
+        if current_app.config.get('QUERY_BUDGET_ENFORCE', current_app.testing):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+    return response
+
+
+def init_app(app):
+    app.after_request(_check_budget)
+
+
+# Lists collecting statements for count_queries() blocks, outermost first
+_active_counters = []
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements executed inside the block.
+
+        with count_queries() as statements:
+            client.get('/trips')
+        assert len(statements) <= 3
+    """
+    statements = []
+    _active_counters.append(statements)
+    try:
+        yield statements
+    finally:
+        _active_counters.remove(statements)
@@ -0,0 +1,126 @@
+"""Per-place rating aggregates, maintained alongside Review writes.
+
+Each place (keyed by its normalized name) has a row in
+``review_rating_aggregates`` with the review count, the rating sum and a
+count per star level. Mapper events apply each insert, update or delete
+as a delta on the flush's own connection, so the aggregate commits or
+rolls back together with the review. Reading an average or a star
+distribution is then a primary-key lookup instead of a scan of reviews.
+"""
+from datetime import datetime
+
+from sqlalchemy import event, text
+from sqlalchemy.orm.attributes import get_history
+
+from models import db, Review, ReviewRatingAggregate
+from utils import normalize_name
+
+STARS = (1, 2, 3, 4, 5)
+AGGREGATE_TABLE = ReviewRatingAggregate.__tablename__
+
+_STAR_COLUMNS = ', '.join(f'stars_{star}' for star in STARS)
+_STAR_PARAMS = ', '.join(f':stars_{star}' for star in STARS)
+_STAR_UPDATES = ', '.join(f'stars_{star} = stars_{star} + excluded.stars_{star}' for star in STARS)
+
+_APPLY_DELTA = text(
+    f"INSERT INTO {AGGREGATE_TABLE} (place_key, place_name, review_count, rating_sum, {_STAR_COLUMNS}, updated_at) "
+    f"VALUES (:place_key, :place_name, :review_count, :rating_sum, {_STAR_PARAMS}, :updated_at) "
+    f"ON CONFLICT (place_key) DO UPDATE SET "
+    f"review_count = review_count + excluded.review_count, "
+    f"rating_sum = rating_sum + excluded.rating_sum, "
+    f"{_STAR_UPDATES}, updated_at = excluded.updated_at"
+)
+_DROP_EMPTY = text(f"DELETE FROM {AGGREGATE_TABLE} WHERE place_key = :place_key AND review_count <= 0")
+
+
+def _delta_row(place_key, place_name, count, rating_sum, stars, updated_at):
+    row = {'place_key': place_key, 'place_name': place_name, 'review_count': count,
+           'rating_sum': rating_sum, 'updated_at': updated_at}
+    row.update({f'stars_{star}': stars.get(star, 0) for star in STARS})
+    return row
+
+
+def _apply(connection, place_name, rating, sign):
+    place_key = normalize_name(place_name)
+    if not place_key or rating not in STARS:
+        return
+    connection.execute(_APPLY_DELTA, _delta_row(
+        place_key, place_name.strip(), sign, sign * rating, {rating: sign}, datetime.utcnow()))
+    if sign < 0:
+        connection.execute(_DROP_EMPTY, {'place_key': place_key})
+
+
+# --- Keep the aggregates in step with Review writes ---
+
+@event.listens_for(Review, 'after_insert')
+def _count_review(mapper, connection, target):
+    _apply(connection, target.place_name, target.rating, 1)
+
+
+@event.listens_for(Review, 'after_update')
+def _recount_review(mapper, connection, target):
+    place, rating = get_history(target, 'place_name'), get_history(target, 'rating')
+    if not (place.has_changes() or rating.has_changes()):
+        return
+    old_place = place.deleted[0] if place.deleted else target.place_name
+    old_rating = rating.deleted[0] if rating.deleted else target.rating
+    _apply(connection, old_place, old_rating, -1)
+    _apply(connection, target.place_name, target.rating, 1)
+
+
+@event.listens_for(Review, 'after_delete')
+def _uncount_review(mapper, connection, target):
+    _apply(connection, target.place_name, target.rating, -1)
+
+
+def backfill_rating_aggregates():
+    """Recompute every aggregate from the reviews table; returns the number of places.
+
+    Runs in one transaction that takes the write lock first, so reviews
+    submitted meanwhile wait for it instead of being missed.
+    """
+    with db.engine.begin() as connection:
+        connection.execute(text(f'DELETE FROM {AGGREGATE_TABLE}'))
+        places = {}
+        for place_name, rating in connection.execute(text('SELECT place_name, rating FROM reviews')):
+            place_key = normalize_name(place_name)
+            if not place_key or rating not in STARS:
+                continue
+            totals = places.setdefault(place_key, [place_name.strip(), 0, 0, {}])
+            totals[1] += 1
+            totals[2] += rating
+            totals[3][rating] = totals[3].get(rating, 0) + 1
+        now = datetime.utcnow()
+        rows = [_delta_row(key, name, count, rating_sum, stars, now)
+                for key, (name, count, rating_sum, stars) in places.items()]
+        if rows:
+            connection.execute(_APPLY_DELTA, rows)
+    return len(rows)
+
+
+# --- Queries ---
+
+def _summary(aggregate):
+    if aggregate is None:
+        return {'count': 0, 'average': None, 'histogram': {star: 0 for star in STARS}}
+    return {
+        'place_name': aggregate.place_name,
+        'count': aggregate.review_count,
+        'average': round(aggregate.rating_sum / aggregate.review_count, 2) if aggregate.review_count else None,
+        'histogram': {star: getattr(aggregate, f'stars_{star}') for star in STARS},
+    }
+
+
+def rating_summary(place_name):
+    """Count, average and star histogram for one place name."""
+    return _summary(ReviewRatingAggregate.query.get(normalize_name(place_name)))
+
+
+def rating_summaries(place_names):
+    """Summaries for several place names in one query, keyed by normalized name."""
+    keys = {normalize_name(name) for name in place_names} - {''}
+    found = {}
+    if keys:
+        found = {aggregate.place_key: aggregate for aggregate in
+                 ReviewRatingAggregate.query.filter(ReviewRatingAggregate.place_key.in_(keys))}
+    return {key: _summary(found.get(key)) for key in keys}
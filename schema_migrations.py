@@ -0,0 +1,126 @@
+"""Versioned, forward-only schema migrations.
+
+Scripts live in ``migrations/`` as ``NNNN_description.py`` and define
+``upgrade(connection)``. They run in version order, each in its own
+transaction, and the versions applied are recorded in ``schema_migrations``.
+Scripts must never drop data; write them with ``IF NOT EXISTS`` guards so a
+database created by ``db.create_all()`` can be brought under migration.
+"""
+import importlib.util
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from models import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+VERSION_TABLE = 'schema_migrations'
+
+# Tables managed outside the models: the version table and the search/geo indexes
+UNMODELED_TABLES = re.compile(r'^(schema_migrations|search_index.*|adventure_locations_rtree.*|sqlite_.*)$')
+
+_FILENAME = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+Migration = namedtuple('Migration', 'version name path')
+
+
+def available_migrations(directory=MIGRATIONS_DIR):
+    """All migration scripts in ``directory``, in version order."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f'Duplicate migration versions in {directory}')
+    return migrations
+
+
+def _load(migration):
+    spec = importlib.util.spec_from_file_location(f'migration_{migration.version:04d}', migration.path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _ensure_version_table(connection):
+    connection.exec_driver_sql(
+        f'CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ('
+        'version INTEGER NOT NULL PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at DATETIME NOT NULL)'
+    )
+
+
+def applied_versions(connection):
+    _ensure_version_table(connection)
+    return {row[0] for row in connection.exec_driver_sql(f'SELECT version FROM {VERSION_TABLE}')}
+
+
+def current_version(engine=None):
+    """Highest applied migration version, or 0 for an unmigrated database."""
+    with (engine or db.engine).begin() as connection:
+        return max(applied_versions(connection), default=0)
+
+
+def pending_migrations(engine=None):
+    with (engine or db.engine).begin() as connection:
+        applied = applied_versions(connection)
+    return [m for m in available_migrations() if m.version not in applied]
+
+
+def upgrade(target=None, engine=None, log=print):
+    """Apply pending migrations up to ``target`` (default: the latest).
+
+    Returns the migrations applied. A failing script rolls back and stops
+    the run, leaving earlier migrations in place.
+    """
+    engine = engine or db.engine
+    applied = []
+    for migration in pending_migrations(engine):
+        if target is not None and migration.version > target:
+            break
+        module = _load(migration)
+        with engine.begin() as connection:
+            # pysqlite would autocommit each DDL statement; hold one write
+            # transaction so the script and its version row land together.
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+            if migration.version in applied_versions(connection):
+                continue  # applied by a concurrent upgrade
+            log(f'Applying {migration.version:04d}_{migration.name}...')
+            module.upgrade(connection)
+            connection.execute(
+                text(f'INSERT INTO {VERSION_TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)'),
+                {'version': migration.version, 'name': migration.name, 'applied_at': datetime.utcnow()}
+            )
+        applied.append(migration)
+    return applied
+
+
+def check_schema(engine=None):
+    """Differences between the models and the database, as readable strings.
+
+    An empty list means every model table, column and index exists.
+    """
+    inspector = inspect(engine or db.engine)
+    existing_tables = set(inspector.get_table_names())
+    problems = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            problems.append(f'missing table {table.name}')
+            continue
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                problems.append(f'missing column {table.name}.{column.name}')
+        indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                problems.append(f'missing index {index.name} on {table.name}')
+    for name in sorted(existing_tables - set(db.metadata.tables)):
+        if not UNMODELED_TABLES.match(name):
+            problems.append(f'table {name} is not in the models')
+    return problems
@@ -0,0 +1,252 @@
+import re
+
+from flask import Blueprint, render_template, jsonify, request, url_for
+from markupsafe import escape
+from sqlalchemy import event, text
+
+from db_profile import read_only_db
+from models import db, AdventureLocation, UserSubmittedSpot, Review, SuggestedEvent
+from utils import login_required
+
+search_bp = Blueprint('search', __name__)
+
+SEARCH_TABLE = 'search_index'
+
+# One FTS5 table covers every entity type so BM25 scores are comparable.
+# rowid = entity_id * len(ENTITY_TYPES) + type code, so a row can be replaced
+# or removed without scanning the UNINDEXED columns.
+ENTITY_TYPES = ('location', 'spot', 'review', 'event')
+TYPE_CODES = {name: code for code, name in enumerate(ENTITY_TYPES)}
+
+# Per entity type: model and SQL expressions for the indexed title and body
+SOURCES = {
+    'location': (AdventureLocation, 'name',
+                 "coalesce(category, '') || ' ' || coalesce(description, '')"),
+    'spot': (UserSubmittedSpot, 'spot_name',
+             "coalesce(location, '') || ' ' || coalesce(description, '')"),
+    'review': (Review, 'place_name', "coalesce(comment, '')"),
+    'event': (SuggestedEvent, 'name',
+              "coalesce(category, '') || ' ' || coalesce(location_text, '') || ' ' || coalesce(description, '')"),
+}
+
+# Column weights for bm25(): entity_type and entity_id are unindexed
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+_CREATE_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "entity_type UNINDEXED, entity_id UNINDEXED, title, body, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+
+def _row_id(entity_type, entity_id):
+    return entity_id * len(ENTITY_TYPES) + TYPE_CODES[entity_type]
+
+
+def _document(entity_type, obj):
+    """Title and body text for an ORM instance, matching the SQL in SOURCES."""
+    if entity_type == 'location':
+        return obj.name, ' '.join([obj.category or '', obj.description or ''])
+    if entity_type == 'spot':
+        return obj.spot_name, ' '.join([obj.location or '', obj.description or ''])
+    if entity_type == 'review':
+        return obj.place_name, obj.comment or ''
+    return obj.name, ' '.join([obj.category or '', obj.location_text or '', obj.description or ''])
+
+
+def _index_rows(connection, entity_type, min_id=0):
+    model, title, body = SOURCES[entity_type]
+    connection.execute(text(
+        f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, entity_type, entity_id, title, body) "
+        f"SELECT id * {len(ENTITY_TYPES)} + {TYPE_CODES[entity_type]}, '{entity_type}', id, {title}, {body} "
+        f"FROM {model.__tablename__} WHERE id > :min_id"
+    ), {'min_id': min_id})
+
+
+def _backfill(connection):
+    for entity_type in SOURCES:
+        _index_rows(connection, entity_type)
+
+
+# Databases (by URL) whose search table has already been checked in this process
+_ready = set()
+
+
+def _create_if_missing(connection):
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': SEARCH_TABLE}
+    ).first()
+    if not exists:
+        connection.execute(text(_CREATE_TABLE))
+        _backfill(connection)
+
+
+def ensure_search_index(connection):
+    """Create and backfill the FTS5 table the first time a database is used."""
+    key = str(connection.engine.url)
+    if key in _ready:
+        return
+    _create_if_missing(connection)
+    _ready.add(key)
+
+
+def rebuild_search_index():
+    """Drop and repopulate the search table from the source tables."""
+    with db.engine.begin() as connection:
+        connection.execute(text(f'DROP TABLE IF EXISTS {SEARCH_TABLE}'))
+        connection.execute(text(_CREATE_TABLE))
+        _backfill(connection)
+        connection.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"))
+        count = connection.execute(text(f'SELECT count(*) FROM {SEARCH_TABLE}')).scalar()
+    _ready.add(str(db.engine.url))
+    return count
+
+
+def index_rows_after(connection, entity_type, min_id):
+    """Index ``entity_type`` rows with ``id > min_id`` that were inserted without the ORM."""
+    ensure_search_index(connection)
+    _index_rows(connection, entity_type, min_id)
+
+
+# --- Keep the index in step with ORM writes ---
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_table(target, connection, **kw):
+    _create_if_missing(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_table(target, connection, **kw):
+    connection.execute(text(f'DROP TABLE IF EXISTS {SEARCH_TABLE}'))
+
+
+def _register(entity_type, model):
+    def index_row(mapper, connection, target):
+        ensure_search_index(connection)
+        title, body = _document(entity_type, target)
+        connection.execute(text(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, entity_type, entity_id, title, body) '
+            'VALUES (:rowid, :entity_type, :entity_id, :title, :body)'
+        ), {'rowid': _row_id(entity_type, target.id), 'entity_type': entity_type,
+            'entity_id': target.id, 'title': title, 'body': body})
+
+    def unindex_row(mapper, connection, target):
+        ensure_search_index(connection)
+        connection.execute(text(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid'),
+                           {'rowid': _row_id(entity_type, target.id)})
+
+    event.listen(model, 'after_insert', index_row)
+    event.listen(model, 'after_update', index_row)
+    event.listen(model, 'after_delete', unindex_row)
+
+
+for _entity_type, (_model, _title, _body) in SOURCES.items():
+    _register(_entity_type, _model)
+
+
+# --- Queries ---
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+
+def build_match_query(user_query):
+    """Turn free text into an FTS5 query: every word required, the last one as a prefix.
+
+    Returns None when the text has no searchable words.
+    """
+    words = _TOKEN.findall(user_query or '')
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _highlight(snippet):
+    """HTML-escape a snippet, turning the match markers into <mark> tags."""
+    return str(escape(snippet)).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def _result_url(entity_type, entity_id):
+    if entity_type == 'location':
+        return url_for('adventure_suggestions.adventure_detail', adventure_id=entity_id)
+    if entity_type == 'spot':
+        return url_for('spot_request_form', spot_id=entity_id)
+    if entity_type == 'review':
+        return url_for('reviews_page')
+    return url_for('show_nearby_events')
+
+
+def search(user_query, types=None, limit=20, offset=0):
+    """BM25-ranked matches across all entity types.
+
+    Returns ``(total, results)``; each result has ``type``, ``id``, ``title``,
+    ``snippet`` (HTML with <mark> highlights), ``score`` and ``url``.
+    """
+    match = build_match_query(user_query)
+    if match is None:
+        return 0, []
+    types = [t for t in (types or ENTITY_TYPES) if t in TYPE_CODES]
+    if not types:
+        return 0, []
+
+    type_filter = ', '.join(f"'{t}'" for t in types)
+    where = f"{SEARCH_TABLE} MATCH :match AND entity_type IN ({type_filter})"
+    if str(db.engine.url) not in _ready:
+        with db.engine.begin() as connection:
+            ensure_search_index(connection)
+    with db.read_engine.connect() as connection:
+        total = connection.execute(
+            text(f'SELECT count(*) FROM {SEARCH_TABLE} WHERE {where}'), {'match': match}
+        ).scalar()
+        rows = connection.execute(text(
+            f"SELECT entity_type, entity_id, title, "
+            f"snippet({SEARCH_TABLE}, 3, '{_MARK_START}', '{_MARK_END}', '…', 16) AS snippet, "
+            f"bm25({SEARCH_TABLE}, 0, 0, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS score "
+            f"FROM {SEARCH_TABLE} WHERE {where} ORDER BY score, rowid LIMIT :limit OFFSET :offset"
+        ), {'match': match, 'limit': limit, 'offset': offset}).fetchall()
+
+    return total, [{
+        'type': row.entity_type,
+        'id': row.entity_id,
+        'title': row.title,
+        'snippet': _highlight(row.snippet),
+        # bm25() is lower-is-better; flip it so larger means more relevant
+        'score': round(-row.score, 6),
+        'url': _result_url(row.entity_type, row.entity_id)
+    } for row in rows]
+
+
+def _search_args():
+    query = request.args.get('q', '').strip()
+    types = request.args.getlist('type') or None
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    total, results = search(query, types, limit=per_page, offset=(page - 1) * per_page)
+    return {
+        'query': query,
+        'types': types or list(ENTITY_TYPES),
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'results': results
+    }
+
+
+@search_bp.route('/search')
+@login_required
+@read_only_db
+def search_page():
+    data = _search_args()
+    total_pages = max((data['total'] + data['per_page'] - 1) // data['per_page'], 1)
+    return render_template('search.html', entity_types=ENTITY_TYPES, total_pages=total_pages, **data)
+
+
+@search_bp.route('/api/search')
+@login_required
+@read_only_db
+def api_search():
+    return jsonify(_search_args())
@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import event, func
+
+from models import (db, User, AdventureLocation, UserInterest, UserPreference, Trip,
+                    UserSuggestion, UserSuggestionState)
+from suggestion_engine import rank_locations
+
+SUGGESTIONS_PER_USER = 10
+
+
+# --- Input fingerprints for incremental runs ---
+
+def input_fingerprints(user_ids=None):
+    """Return ``{user_id: fingerprint}`` describing each user's scoring inputs.
+
+    Counts catch deletions and max timestamps catch additions/edits; the
+    catalog size is folded in so adding locations recomputes everyone.
+    """
+    def grouped(column_user_id, *columns):
+        query = db.session.query(column_user_id, *columns).group_by(column_user_id)
+        if user_ids is not None:
+            query = query.filter(column_user_id.in_(user_ids))
+        return {row[0]: row[1:] for row in query.all()}
+
+    interests = grouped(UserInterest.user_id, func.count(UserInterest.id), func.max(UserInterest.created_at))
+    trips = grouped(Trip.user_id, func.count(Trip.id), func.max(Trip.created_at))
+    preferences = grouped(UserPreference.user_id, func.max(UserPreference.last_updated))
+    catalog = db.session.query(func.count(AdventureLocation.id), func.max(AdventureLocation.id)).one()
+
+    users = db.session.query(User.id)
+    if user_ids is not None:
+        users = users.filter(User.id.in_(user_ids))
+    fingerprints = {}
+    for (user_id,) in users.all():
+        parts = (catalog, interests.get(user_id), trips.get(user_id), preferences.get(user_id))
+        fingerprints[user_id] = '|'.join(repr(part) for part in parts)
+    return fingerprints
+
+
+def stale_users(full=False):
+    current = input_fingerprints()
+    if full:
+        return sorted(current), current
+    stored = dict(db.session.query(UserSuggestionState.user_id, UserSuggestionState.fingerprint).all())
+    return sorted(user_id for user_id, fp in current.items() if stored.get(user_id) != fp), current
+
+
+# --- Worker processes ---
+
+def _init_worker():
+    from app import app
+    ctx = app.app_context()
+    ctx.push()
+    # Never share the parent's pooled SQLite connections across a fork
+    db.engine.dispose()
+
+
+def _score_chunk(user_ids):
+    rows = []
+    for user_id in user_ids:
+        for rank, (location_id, score) in enumerate(rank_locations(user_id, SUGGESTIONS_PER_USER)):
+            rows.append({'user_id': user_id, 'rank': rank, 'location_id': location_id, 'score': score})
+    db.session.remove()
+    return user_ids, rows
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _write_chunk(user_ids, rows, fingerprints, computed_at):
+    for row in rows:
+        row['computed_at'] = computed_at
+    UserSuggestion.query.filter(UserSuggestion.user_id.in_(user_ids)).delete(synchronize_session=False)
+    UserSuggestionState.query.filter(UserSuggestionState.user_id.in_(user_ids)).delete(synchronize_session=False)
+    if rows:
+        db.session.execute(UserSuggestion.__table__.insert(), rows)
+    db.session.execute(UserSuggestionState.__table__.insert(), [
+        {'user_id': user_id, 'fingerprint': fingerprints[user_id], 'computed_at': computed_at}
+        for user_id in user_ids
+    ])
+    db.session.commit()
+
+
+def precompute_suggestions(full=False, chunk_size=500, workers=None, log=print):
+    """Score stale (or, with ``full``, all) users and materialize the results.
+
+    Scoring runs in a process pool; writes stay in this process, one
+    transaction per chunk, so an interrupted run keeps finished chunks and
+    the next incremental run picks up the rest.
+    """
+    started = time.perf_counter()
+    user_ids, fingerprints = stale_users(full)
+    if not user_ids:
+        log("Suggestions are up to date.")
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    chunks = list(_chunks(user_ids, chunk_size))
+    computed_at = datetime.utcnow()
+    log(f"Scoring {len(user_ids)} users in {len(chunks)} chunks with {workers} workers...")
+
+    done = 0
+    if workers == 1:
+        results = map(_score_chunk, chunks)
+        pool = None
+    else:
+        db.session.remove()
+        db.engine.dispose()
+        pool = multiprocessing.Pool(workers, initializer=_init_worker)
+        results = pool.imap_unordered(_score_chunk, chunks)
+    try:
+        for chunk_user_ids, rows in results:
+            _write_chunk(chunk_user_ids, rows, fingerprints, computed_at)
+            done += len(chunk_user_ids)
+            log(f"  {done}/{len(user_ids)} users")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    log(f"Precomputed suggestions for {done} users in {time.perf_counter() - started:.1f}s.")
+    return done
+
+
+# --- Reads ---
+
+def get_materialized_suggestions(user_id):
+    """Return the stored suggestions for a user, or None if there are none."""
+    rows = db.session.query(UserSuggestion.score, AdventureLocation)\
+        .join(AdventureLocation, AdventureLocation.id == UserSuggestion.location_id)\
+        .filter(UserSuggestion.user_id == user_id)\
+        .order_by(UserSuggestion.rank).all()
+    if not rows:
+        return None
+    return [{
+        'id': location.id,
+        'name': location.name,
+        'description': location.description,
+        'category': location.category,
+        'score': score,
+        'latitude': location.latitude,
+        'longitude': location.longitude,
+        'weather_info': location.weather_info
+    } for score, location in rows]
+
+
+# --- Drop stored rows as soon as their inputs change ---
+# The fingerprint only sees counts and timestamps, so edits such as an
+# interest's experience level would leave it unchanged; dropping the state
+# row as well makes the next incremental run recompute the user.
+
+@event.listens_for(UserInterest, 'after_insert')
+@event.listens_for(UserInterest, 'after_update')
+@event.listens_for(UserInterest, 'after_delete')
+@event.listens_for(UserPreference, 'after_insert')
+@event.listens_for(UserPreference, 'after_update')
+@event.listens_for(UserPreference, 'after_delete')
+@event.listens_for(Trip, 'after_insert')
+@event.listens_for(Trip, 'after_update')
+@event.listens_for(Trip, 'after_delete')
+def _discard_materialized(mapper, connection, target):
+    connection.execute(
+        UserSuggestion.__table__.delete().where(UserSuggestion.user_id == target.user_id)
+    )
+    connection.execute(
+        UserSuggestionState.__table__.delete().where(UserSuggestionState.user_id == target.user_id)
+    )
+
+
+@event.listens_for(AdventureLocation, 'after_update')
+def _discard_all_materialized(mapper, connection, target):
+    # A category change can move the location into or out of anyone's list
+    if db.inspect(target).attrs.category.history.has_changes():
+        connection.execute(UserSuggestion.__table__.delete())
+        connection.execute(UserSuggestionState.__table__.delete())
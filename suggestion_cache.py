@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import AdventureLocation, UserInterest, UserPreference, Trip
+
+# Models whose rows feed a single user's suggestions, via their user_id column
+USER_SCOPED_MODELS = (UserInterest, UserPreference, Trip)
+# Models whose rows can change every user's suggestions
+GLOBAL_MODELS = (AdventureLocation,)
+
+_ALL_USERS = object()
+
+
+class SuggestionCache:
+    """Bounded LRU cache of suggestion payloads keyed by user id.
+
+    Entries older than ``ttl`` seconds are treated as misses. Writes that touch
+    a user's inputs evict that user once the transaction commits.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def configure(self, maxsize=None, ttl=None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._trim()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[user_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return value
+
+    def set(self, user_id, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), value)
+            self._entries.move_to_end(user_id)
+            self._trim()
+
+    def get_or_compute(self, user_id, compute):
+        value = self.get(user_id)
+        if value is None:
+            value = compute()
+            self.set(user_id, value)
+        return value
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def _trim(self):
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
+suggestion_cache = SuggestionCache()
+
+
+def init_app(app):
+    app.config.setdefault('SUGGESTION_CACHE_SIZE', 1024)
+    app.config.setdefault('SUGGESTION_CACHE_TTL', 300)
+    suggestion_cache.configure(maxsize=app.config['SUGGESTION_CACHE_SIZE'],
+                               ttl=app.config['SUGGESTION_CACHE_TTL'])
+
+
+# --- Write-driven invalidation ---
+
+def _pending(session):
+    return session.info.setdefault('suggestion_cache_pending', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_affected_users(session, flush_context):
+    pending = _pending(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, GLOBAL_MODELS):
+            pending.add(_ALL_USERS)
+        elif isinstance(obj, USER_SCOPED_MODELS) and obj.user_id is not None:
+            pending.add(obj.user_id)
+
+
+@event.listens_for(Session, 'after_bulk_update')
+@event.listens_for(Session, 'after_bulk_delete')
+def _collect_bulk_changes(context):
+    # Query.update()/delete() don't expose the affected rows, so be conservative
+    if issubclass(context.mapper.class_, USER_SCOPED_MODELS + GLOBAL_MODELS):
+        _pending(context.session).add(_ALL_USERS)
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_affected_users(session):
+    pending = session.info.pop('suggestion_cache_pending', None)
+    if not pending:
+        return
+    if _ALL_USERS in pending:
+        suggestion_cache.clear()
+        return
+    for user_id in pending:
+        suggestion_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('suggestion_cache_pending', None)
@@ -0,0 +1,175 @@
+import heapq
+import threading
+
+import numpy as np
+from sqlalchemy import event, func
+
+from models import db, AdventureLocation, UserInterest, UserPreference, Trip
+
+# Score weights, kept identical to the original per-location loop
+INTEREST_WEIGHT = 2
+TRIP_WEIGHT = 1
+PREFERENCE_WEIGHT = 1
+
+
+class LocationIndex:
+    """Column-oriented snapshot of the location catalog used for scoring.
+
+    Only ``id`` and ``category`` are loaded. Locations are kept in ascending id
+    order, which is the tie-break order the original sort produced.
+    """
+
+    def __init__(self, ids, categories):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        names, codes = np.unique(np.asarray(categories, dtype=object), return_inverse=True)
+        # category -> positions of its locations
+        self.by_category = {
+            name: np.flatnonzero(codes == code) for code, name in enumerate(names)
+        }
+
+    @classmethod
+    def load(cls):
+        rows = db.session.query(AdventureLocation.id, AdventureLocation.category)\
+            .order_by(AdventureLocation.id).all()
+        return cls([r[0] for r in rows], [r[1] for r in rows])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, location_ids):
+        """Map location ids to positions in the index, dropping unknown ids."""
+        location_ids = np.asarray(location_ids, dtype=np.int64)
+        pos = np.searchsorted(self.ids, location_ids)
+        pos = np.clip(pos, 0, max(len(self.ids) - 1, 0))
+        found = self.ids[pos] == location_ids if len(self.ids) else np.zeros(len(pos), dtype=bool)
+        return pos[found], found
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_location_index():
+    global _index
+    index = _index
+    if index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LocationIndex.load()
+            index = _index
+    return index
+
+
+def invalidate_location_index():
+    global _index
+    _index = None
+
+
+@event.listens_for(AdventureLocation, 'after_insert')
+@event.listens_for(AdventureLocation, 'after_delete')
+def _location_added_or_removed(mapper, connection, target):
+    invalidate_location_index()
+
+
+@event.listens_for(AdventureLocation, 'after_update')
+def _location_updated(mapper, connection, target):
+    # Rating or description edits don't affect scoring
+    if db.inspect(target).attrs.category.history.has_changes():
+        invalidate_location_index()
+
+
+class UserProfile:
+    """A user's scoring inputs, each fetched with a single query."""
+
+    def __init__(self, interest_counts, preferred_categories, trip_counts):
+        self.interest_counts = interest_counts
+        self.preferred_categories = preferred_categories
+        self.trip_counts = trip_counts
+
+    @classmethod
+    def load(cls, user_id):
+        interest_counts = dict(
+            db.session.query(UserInterest.activity_type, func.count(UserInterest.id))
+            .filter(UserInterest.user_id == user_id)
+            .group_by(UserInterest.activity_type).all()
+        )
+        preferences = UserPreference.query.filter_by(user_id=user_id).first()
+        preferred = set()
+        if preferences and preferences.preferred_categories:
+            preferred = {cat.strip() for cat in preferences.preferred_categories.split(',')}
+        trip_counts = dict(
+            db.session.query(Trip.location_id, func.count(Trip.id))
+            .filter(Trip.user_id == user_id)
+            .group_by(Trip.location_id).all()
+        )
+        return cls(interest_counts, preferred, trip_counts)
+
+
+def score_locations(index, profile):
+    """Return an int array with one score per location in ``index``."""
+    category_weights = {}
+    for category, count in profile.interest_counts.items():
+        category_weights[category] = category_weights.get(category, 0) + INTEREST_WEIGHT * count
+    for category in profile.preferred_categories:
+        category_weights[category] = category_weights.get(category, 0) + PREFERENCE_WEIGHT
+
+    scores = np.zeros(len(index), dtype=np.int64)
+    for category, weight in category_weights.items():
+        positions = index.by_category.get(category)
+        if positions is not None:
+            scores[positions] += weight
+    if profile.trip_counts:
+        location_ids = list(profile.trip_counts)
+        positions, found = index.positions(location_ids)
+        counts = np.asarray([profile.trip_counts[i] for i in location_ids], dtype=np.int64)[found]
+        np.add.at(scores, positions, TRIP_WEIGHT * counts)
+    return scores
+
+
+def top_k(scores, k, offset=0):
+    """Positions of the ``k`` best scores after skipping ``offset``.
+
+    Ordering is score descending, then position ascending, matching a stable
+    ``sorted(..., reverse=True)`` over id-ordered rows. Only the entries that
+    can reach the window are pushed through the heap.
+    """
+    need = k + offset
+    if k <= 0 or need <= 0 or len(scores) == 0:
+        return []
+    if need < len(scores):
+        threshold = np.partition(scores, len(scores) - need)[len(scores) - need]
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)[:need - len(above)]
+        candidates = np.concatenate((above, ties))
+    else:
+        candidates = np.arange(len(scores))
+    best = heapq.nsmallest(need, ((-int(scores[p]), int(p)) for p in candidates))
+    return [p for _, p in best[offset:]]
+
+
+def rank_locations(user_id, k=10, offset=0):
+    """Return ``[(location_id, score), ...]`` for a user's top ``k`` locations."""
+    index = get_location_index()
+    profile = UserProfile.load(user_id)
+    scores = score_locations(index, profile)
+    return [(int(index.ids[p]), int(scores[p])) for p in top_k(scores, k, offset)]
+
+
+def get_suggestions(user_id, k=10, offset=0):
+    ranked = rank_locations(user_id, k, offset)
+    if not ranked:
+        return []
+    locations = {
+        loc.id: loc for loc in
+        AdventureLocation.query.filter(AdventureLocation.id.in_([i for i, _ in ranked])).all()
+    }
+    return [{
+        'id': location_id,
+        'name': locations[location_id].name,
+        'description': locations[location_id].description,
+        'category': locations[location_id].category,
+        'score': score,
+        'latitude': locations[location_id].latitude,
+        'longitude': locations[location_id].longitude,
+        'weather_info': locations[location_id].weather_info
+    } for location_id, score in ranked if location_id in locations]
@@ -0,0 +1,83 @@
+"""Shared fixtures: the app on a temporary, migrated and seeded SQLite database."""
+import os
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app
+from models import (db, User, UserInterest, UserPreference, AdventureLocation, Trip, ItineraryItem,
+                    Review, Notification, UserSubmittedSpot, SuggestedEvent)
+
+# Rows per relationship: enough that a per-row query shows up as an overrun
+ROWS = 4
+
+
+@pytest.fixture(scope='session')
+def app():
+    folder = tempfile.mkdtemp()
+    flask_app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(folder, 'test.db'),
+        UPLOAD_FOLDER=os.path.join(folder, 'uploads'),
+        NOTIFICATION_OUTBOX_MODE='inline',
+    )
+    with flask_app.app_context():
+        from schema_migrations import upgrade
+        upgrade(log=lambda *args: None)
+        seed()
+    yield flask_app
+
+
+def seed():
+    users = [User(username=f'user{n}', email=f'user{n}@example.com', password_hash='x') for n in range(ROWS)]
+    categories = ['hiking', 'camping', 'kayaking', 'rock_climbing']
+    locations = [AdventureLocation(name=f'Place {n}', category=categories[n % len(categories)],
+                                   description=f'A {categories[n % len(categories)]} spot', difficulty=2,
+                                   latitude=23.7 + n / 100, longitude=90.4)
+                 for n in range(ROWS * 2)]
+    db.session.add_all(users + locations)
+    db.session.flush()
+
+    today = date.today()
+    for n, user in enumerate(users):
+        db.session.add(UserPreference(user_id=user.id, preferred_categories='hiking,camping', difficulty_level=2))
+        for category in categories[:2]:
+            db.session.add(UserInterest(user_id=user.id, activity_type=category, experience_level='beginner'))
+        for t in range(ROWS):
+            trip = Trip(user_id=user.id, location_id=locations[(n + t) % len(locations)].id,
+                        start_date=today + timedelta(days=7 * t), end_date=today + timedelta(days=7 * t + 3),
+                        budget_estimate=500, shared_publicly=t % 2 == 0)
+            db.session.add(trip)
+            db.session.flush()
+            start = datetime.combine(trip.start_date, time(8))
+            db.session.add_all([ItineraryItem(trip_id=trip.id, activity_name=f'Activity {i}',
+                                              start_time=start + timedelta(hours=i),
+                                              end_time=start + timedelta(hours=i, minutes=45))
+                                for i in range(ROWS)])
+        for r in range(ROWS):
+            db.session.add(Review(user_id=user.id, place_name=locations[r].name, rating=r % 5 + 1,
+                                  comment=f'Review {r} by {user.username}'))
+            db.session.add(Notification(user_id=user.id, message=f'Notification {r}'))
+            db.session.add(UserSubmittedSpot(spot_name=f'Spot {n}-{r}', location='Somewhere',
+                                             description='Hidden gem', contributor_id=user.id,
+                                             contributor_name=user.username))
+            db.session.add(SuggestedEvent(name=f'Event {n}-{r}', location_text='Town square',
+                                          event_date=today + timedelta(days=r), event_time=time(18),
+                                          category='meetup', user_id=user.id))
+    db.session.commit()
+
+
+@pytest.fixture
+def login(app):
+    """``login(user_id)`` returns a test client signed in as that user."""
+    def make_client(user_id=1):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        return client
+    return make_client
@@ -0,0 +1,69 @@
+"""Packing lists are shared read-only data: repeated requests must not grow them."""
+import threading
+import tracemalloc
+
+import pytest
+
+from packing_lists import packing_list
+
+# Allowed growth of traced memory after the first (warm-up) round
+MEMORY_SLACK = 256 * 1024
+ROUNDS = 3
+THREADS = 4
+
+FORMS = [{'adventure_type': t, 'duration': str(d), 'season': s}
+         for t in ('camping', 'hiking', 'rock_climbing', 'kayaking')
+         for s in ('summer', 'winter', 'spring', 'fall')
+         for d in (2, 7)]
+
+
+def _round(app):
+    sizes, statuses = {}, []
+
+    def worker(offset):
+        client = app.test_client()
+        for i in range(len(FORMS)):
+            form = FORMS[(offset + i) % len(FORMS)]
+            response = client.post('/packing', data=form)
+            statuses.append(response.status_code)
+            sizes[tuple(sorted(form.items()))] = len(response.data)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert set(statuses) == {200}
+    return sizes
+
+
+def test_hammering_packing_keeps_responses_and_memory_constant(app):
+    tracemalloc.start()
+    try:
+        first_sizes = _round(app)
+        baseline, _ = tracemalloc.get_traced_memory()
+        for _ in range(ROUNDS):
+            assert _round(app) == first_sizes
+        final, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert final - baseline < MEMORY_SLACK
+
+
+def test_packing_list_is_read_only_and_not_shared_mutably(app):
+    with app.app_context():
+        winter = packing_list('camping', 3, 'winter')
+        summer = packing_list('camping', 3, 'summer')
+        with pytest.raises(TypeError):
+            winter['Clothing'] = ()
+        assert isinstance(winter['Clothing'], tuple)
+        assert 'Warm Jacket' in winter['Clothing']
+        assert 'Warm Jacket' not in summer['Clothing']
+        assert packing_list('camping', 3, 'winter')['Clothing'].count('Warm Jacket') == 1
+
+
+def test_invalid_selection_is_rejected(app):
+    client = app.test_client()
+    assert client.post('/packing', data={'adventure_type': 'surfing', 'duration': '2',
+                                         'season': 'winter'}).status_code == 400
+    assert client.get('/checklist_pdf?season=monsoon').status_code == 400
@@ -0,0 +1,69 @@
+"""Every ``@query_budget`` route stays within its declared statement budget.
+
+Under TESTING an overrun raises QueryBudgetExceeded out of the request, so
+an N+1 regression fails here instead of shipping.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from models import Trip
+from query_budget import query_budget
+from suggestion_batch import precompute_suggestions
+
+
+def _first_trip_id(app, user_id):
+    with app.app_context():
+        return Trip.query.filter_by(user_id=user_id).order_by(Trip.id).first().id
+
+
+BUDGETED_URLS = [
+    '/events/',
+    '/events/api/filter_community_events',
+    '/events/api/filter_community_events?category=meetup',
+    '/events/api/calendar',
+    '/events/api/calendar?from={today}&to={next_month}',
+    '/reviews',
+    '/buddy-finder',
+    '/user-spots',
+    '/notifications',
+    '/itinerary/{trip_id}',
+    '/trips',
+    '/adventure-suggestions/suggestions',
+]
+
+
+@pytest.mark.parametrize('url', BUDGETED_URLS)
+def test_route_within_query_budget(app, login, url):
+    today = date.today()
+    url = url.format(today=today.isoformat(), next_month=(today + timedelta(days=30)).isoformat(),
+                     trip_id=_first_trip_id(app, 1))
+    response = login(1).get(url)
+    assert response.status_code == 200
+
+
+def test_materialized_suggestions_within_query_budget(app, login):
+    with app.app_context():
+        precompute_suggestions(full=True, workers=1, log=lambda message: None)
+    response = login(2).get('/adventure-suggestions/suggestions')
+    assert response.status_code == 200
+
+
+def test_every_budgeted_route_is_covered(app):
+    covered = {url.split('?')[0].split('{')[0].rstrip('/') for url in BUDGETED_URLS}
+    for rule in app.url_map.iter_rules():
+        if getattr(app.view_functions[rule.endpoint], 'query_budget', None) is not None:
+            assert rule.rule.split('<')[0].rstrip('/') in covered, f'{rule.rule} has no budget test'
+
+
+def test_overrun_raises(app, login):
+    from query_budget import QueryBudgetExceeded
+
+    @query_budget(0)
+    def over_budget():
+        Trip.query.count()
+        return 'ok'
+
+    app.add_url_rule('/_test/over-budget', 'test_over_budget', over_budget)
+    with pytest.raises(QueryBudgetExceeded):
+        login(1).get('/_test/over-budget')
@@ -0,0 +1,81 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import and_, event, func, literal, or_, text
+
+from models import db, User, Trip, AdventureLocation, TripLocationSpan
+
+SPAN_TABLE = TripLocationSpan.__tablename__
+
+_RECORD_SPAN = text(
+    f"INSERT INTO {SPAN_TABLE} (location_id, max_span_days) VALUES (:location_id, :days) "
+    f"ON CONFLICT (location_id) DO UPDATE SET max_span_days = max(max_span_days, excluded.max_span_days)"
+)
+
+
+def _trip_days(trip):
+    return (trip.end_date - trip.start_date).days
+
+
+@event.listens_for(Trip, 'after_insert')
+@event.listens_for(Trip, 'after_update')
+def _track_location_span(mapper, connection, target):
+    # Spans only grow: a bound that is too wide costs index range, never matches
+    if target.shared_publicly:
+        connection.execute(_RECORD_SPAN, {'location_id': target.location_id, 'days': _trip_days(target)})
+
+
+def location_spans(location_ids):
+    """``{location_id: longest public trip span in days}``; locations without
+    public trips are left out."""
+    return dict(db.session.query(TripLocationSpan.location_id, TripLocationSpan.max_span_days)
+                .filter(TripLocationSpan.location_id.in_(location_ids)).all())
+
+
+def find_travel_buddies(trip, location_ids=None, limit=20, offset=0):
+    """Other users' public trips overlapping ``trip`` in time.
+
+    Matches trips at ``trip.location_id``, or at any of ``location_ids`` when
+    given, ordered by days of overlap (longest first). Returns
+    ``(total, rows)`` where each row has ``trip_id``, ``user_id``,
+    ``username``, ``location_id``, ``location_name``, ``start_date``,
+    ``end_date`` and ``overlap_days``.
+    """
+    location_ids = list(location_ids) if location_ids else [trip.location_id]
+    # An overlapping trip at a location cannot start more than that location's
+    # longest public span before ours, so each location is a bounded range
+    # scan of the (location_id, start_date, end_date) index. Locations are
+    # grouped by span to keep the number of ranges small.
+    by_span = defaultdict(list)
+    for location_id, span in location_spans(location_ids).items():
+        by_span[span].append(location_id)
+    if not by_span:
+        return 0, []
+    ranges = or_(*(and_(Trip.location_id.in_(ids),
+                        Trip.start_date.between(trip.start_date - timedelta(days=span), trip.end_date))
+                   for span, ids in by_span.items()))
+
+    my_start = literal(trip.start_date, type_=db.Date)
+    my_end = literal(trip.end_date, type_=db.Date)
+    overlap_days = (
+        func.julianday(func.min(Trip.end_date, my_end))
+        - func.julianday(func.max(Trip.start_date, my_start)) + 1
+    ).label('overlap_days')
+
+    query = db.session.query(
+        Trip.id.label('trip_id'), Trip.user_id, User.username,
+        Trip.location_id, AdventureLocation.name.label('location_name'),
+        Trip.start_date, Trip.end_date, overlap_days
+    ).join(User, User.id == Trip.user_id)\
+     .join(AdventureLocation, AdventureLocation.id == Trip.location_id)\
+     .filter(
+        ranges,
+        Trip.end_date >= trip.start_date,
+        Trip.shared_publicly.is_(True),
+        Trip.user_id != trip.user_id
+    )
+
+    total = query.order_by(None).count()
+    rows = query.order_by(overlap_days.desc(), Trip.start_date, Trip.id)\
+        .limit(limit).offset(offset).all()
+    return total, rows
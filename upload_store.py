@@ -0,0 +1,282 @@
+"""Content-addressed storage for uploaded images.
+
+Uploads are streamed to a temporary file while being hashed and then
+stored as ``<sha256>.<ext>``, so identical files share one copy and two
+users' ``IMG_0001.jpg`` can no longer overwrite each other. Resized
+variants (``<name>@<variant>.<ext>``) are generated on a worker pool at
+upload time; ``@`` never survives ``secure_filename``, so variant names
+cannot collide with originals.
+
+Content-named files never change, so they are served with a strong ETag
+and a year-long ``immutable`` Cache-Control; pictures stored under their
+original names before this scheme get revalidated instead. With
+``UPLOAD_SEND_MODE`` set to ``x-accel-redirect`` (nginx) or ``x-sendfile``
+(Apache, lighttpd) the proxy sends the bytes and handles Range; otherwise
+werkzeug does, including Range and conditional requests. For nginx::
+
+    location /_uploads/ {
+        internal;
+        alias /path/to/instance/uploads/;
+    }
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import abort, current_app, request, url_for
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Pillow format -> stored extension
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif'}
+
+# Variant name -> bounding box. reviews.html shows photos 200px tall, so
+# 400px covers high-density screens. Variants are cached as immutable, so
+# changing a size needs a new variant name.
+VARIANTS = {
+    'thumb': (400, 400),
+}
+
+# <sha256>.<ext> or <sha256>@<variant>.<ext>: the name determines the bytes
+CONTENT_NAME = re.compile(r'^([0-9a-f]{64}(?:@[a-z]+)?)\.(?:jpg|png|gif)$')
+
+SEND_MODES = ('direct', 'x-accel-redirect', 'x-sendfile')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class InvalidUpload(ValueError):
+    """The uploaded file is not an image we accept."""
+
+
+class UploadStore:
+    def __init__(self):
+        self.folder = None
+        self._pool = None
+        self._pending = {}  # variant filename -> Future
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('MAX_CONTENT_LENGTH', 16 * 1024 * 1024)
+        app.config.setdefault('THUMBNAIL_WORKERS', 2)
+        app.config.setdefault('UPLOAD_SEND_MODE', 'direct')
+        app.config.setdefault('UPLOAD_ACCEL_PREFIX', '/_uploads/')  # internal nginx location
+        if app.config['UPLOAD_SEND_MODE'] not in SEND_MODES:
+            raise ValueError(f"UPLOAD_SEND_MODE must be one of {SEND_MODES}, "
+                             f"not {app.config['UPLOAD_SEND_MODE']!r}")
+        self.folder = app.config['UPLOAD_FOLDER']
+        os.makedirs(self.folder, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=app.config['THUMBNAIL_WORKERS'],
+                                        thread_name_prefix='thumbnail')
+        app.add_template_global(upload_url)
+
+    # --- Storing originals ---
+
+    def save(self, file_storage):
+        """Store an uploaded image and return its content-addressed filename.
+
+        Raises InvalidUpload if the bytes are not a JPEG, PNG or GIF image,
+        whatever the client-supplied filename says.
+        """
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.folder, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = file_storage.stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+            extension = self._image_extension(temp_path)
+            filename = f'{digest.hexdigest()}.{extension}'
+            path = os.path.join(self.folder, filename)
+            if os.path.exists(path):
+                os.remove(temp_path)  # already stored: duplicates cost nothing
+            else:
+                os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        for variant in VARIANTS:
+            self.schedule_variant(filename, variant)
+        return filename
+
+    @staticmethod
+    def _image_extension(path):
+        try:
+            with Image.open(path) as image:
+                image_format = image.format
+                image.verify()
+        except (UnidentifiedImageError, OSError, SyntaxError) as e:
+            raise InvalidUpload('File is not a valid image') from e
+        if image_format not in IMAGE_FORMATS:
+            raise InvalidUpload(f'Unsupported image format {image_format}')
+        return IMAGE_FORMATS[image_format]
+
+    # --- Variants ---
+
+    def schedule_variant(self, filename, variant):
+        """Start rendering a variant in the worker pool; returns its Future."""
+        name = variant_filename(filename, variant)
+        with self._lock:
+            future = self._pending.get(name)
+            if future is None:
+                if os.path.exists(os.path.join(self.folder, name)):
+                    return None
+                future = self._pending[name] = self._pool.submit(self._render_variant, filename, variant, name)
+                future.add_done_callback(lambda f: self._forget(name))
+        return future
+
+    def _forget(self, name):
+        with self._lock:
+            self._pending.pop(name, None)
+
+    def ensure_variant(self, filename, variant, timeout=30):
+        """Return the variant's filename, rendering it now if it does not exist yet.
+
+        Returns None when the original is missing or cannot be resized.
+        """
+        name = variant_filename(filename, variant)
+        if os.path.exists(os.path.join(self.folder, name)):
+            return name
+        if not os.path.exists(os.path.join(self.folder, filename)):
+            return None
+        future = self.schedule_variant(filename, variant)
+        try:
+            if future is not None:
+                future.result(timeout=timeout)
+        except Exception:
+            logger.exception('Could not render %s', name)
+            return None
+        return name if os.path.exists(os.path.join(self.folder, name)) else None
+
+    def variant_source(self, name):
+        """The stored original a variant filename was derived from, if any."""
+        parsed = parse_variant(name)
+        if parsed is None:
+            return None
+        variant, stem = parsed
+        for extension in ('jpg', 'jpeg', 'png', 'gif', 'JPG', 'JPEG', 'PNG', 'GIF'):
+            candidate = f'{stem}.{extension}'
+            if variant_filename(candidate, variant) == name and \
+                    os.path.exists(os.path.join(self.folder, candidate)):
+                return candidate
+        return None
+
+    def _render_variant(self, filename, variant, name):
+        source = os.path.join(self.folder, filename)
+        target = os.path.join(self.folder, name)
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(VARIANTS[variant], Image.LANCZOS)
+            if name.endswith('.jpg'):
+                image = image.convert('RGB')
+                options = {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}
+            else:
+                options = {'format': 'PNG', 'optimize': True}
+            fd, temp_path = tempfile.mkstemp(dir=self.folder, prefix='.variant-')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    image.save(out, **options)
+                os.replace(temp_path, target)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+    # --- Serving ---
+
+    def send(self, filename):
+        """Response for ``/uploads/<filename>``, rendering a missing variant first."""
+        path = safe_join(self.folder, filename)
+        if path is None:
+            abort(404)
+        variant = parse_variant(filename)
+        if variant and not os.path.exists(path):
+            # Variant not rendered yet (or an upload from before variants existed)
+            source = self.variant_source(filename)
+            if source is None or self.ensure_variant(source, variant[0]) is None:
+                abort(404)
+        if not os.path.isfile(path):
+            abort(404)
+
+        match = CONTENT_NAME.match(filename)
+        etag = match.group(1) if match else True  # werkzeug's mtime/size/name etag
+        mode = current_app.config['UPLOAD_SEND_MODE']
+        if mode == 'x-accel-redirect':
+            response = self._accel_response(filename, path, etag)
+        else:
+            # werkzeug answers If-None-Match and Range itself; with x-sendfile
+            # it sends the header instead of the body
+            response = send_file(path, request.environ, etag=etag, max_age=0,
+                                 use_x_sendfile=mode == 'x-sendfile',
+                                 response_class=current_app.response_class)
+            response.accept_ranges = 'bytes'
+
+        if match:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+            # HTTP/1.0 caches only read Expires, which send_file set to now
+            response.expires = int(time.time()) + IMMUTABLE_MAX_AGE
+        else:
+            response.cache_control.no_cache = True
+        return response
+
+    def _accel_response(self, filename, path, etag):
+        # nginx streams the file (and handles Range); we only answer revalidation
+        response = current_app.response_class()
+        response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        if etag is True:
+            stat = os.stat(path)
+            etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        response.set_etag(etag)
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            return response
+        prefix = current_app.config['UPLOAD_ACCEL_PREFIX'].rstrip('/')
+        response.headers['X-Accel-Redirect'] = f'{prefix}/{filename}'
+        return response
+
+
+def variant_filename(filename, variant):
+    """``abc.jpg`` -> ``abc@thumb.jpg``; GIF and PNG sources get PNG variants."""
+    stem, extension = os.path.splitext(filename)
+    extension = '.jpg' if extension.lower() in ('.jpg', '.jpeg') else '.png'
+    return f'{stem}@{variant}{extension}'
+
+
+def parse_variant(name):
+    """Split a variant filename into ``(variant, stem)``, or None for originals."""
+    stem, _ = os.path.splitext(name)
+    if '@' not in stem:
+        return None
+    stem, variant = stem.rsplit('@', 1)
+    return (variant, stem) if variant in VARIANTS else None
+
+
+def upload_url(filename, variant=None):
+    """URL for an uploaded file or one of its variants (template global)."""
+    if variant:
+        filename = variant_filename(filename, variant)
+    return url_for('uploaded_file', filename=filename)
+
+
+upload_store = UploadStore()
+
+
+def init_app(app):
+    upload_store.init_app(app)
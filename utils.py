@@ -1,4 +1,10 @@
+import base64
+import json
+import unicodedata
+from datetime import datetime
+
 from flask_login import login_required
+from sqlalchemy import tuple_
 
 def format_difficulty(value):
     if value == 1:
@@ -11,3 +17,79 @@ def format_difficulty(value):
         return value.capitalize()
     return "Unknown" # Default or for other values
 
+def normalize_name(name):
+    """Comparison key for place names: case-folded, accents stripped, whitespace collapsed."""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.split()).casefold()
+
+
+
+# --- Keyset (cursor) pagination ---
+
+def encode_cursor(values):
+    """Pack a row's sort-key values into an opaque, URL-safe token."""
+    raw = json.dumps(list(values), default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Reverse encode_cursor. Raises ValueError for malformed tokens."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+def decode_timestamp_cursor(token):
+    """Decode a ``[created_at, id]`` cursor; None for an empty token, ValueError if malformed."""
+    if not token:
+        return None
+    try:
+        created_at, row_id = decode_cursor(token)
+        return [datetime.fromisoformat(created_at), int(row_id)]
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def decode_id_cursor(token):
+    """Decode an ``[id]`` cursor; None for an empty token, ValueError if malformed."""
+    if not token:
+        return None
+    try:
+        (row_id,) = decode_cursor(token)
+        return [int(row_id)]
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def keyset_page(query, columns, key_of, per_page, after=None, before=None, descending=False):
+    """Fetch one page of ``query`` ordered by ``columns`` using keyset pagination.
+
+    ``after``/``before`` are the key values of the row the page starts after
+    or ends before. ``key_of(row)`` extracts those values from a result row.
+    Returns ``(rows, next_key, prev_key)``; a key is None when there is no
+    page in that direction.
+    """
+    key = tuple_(*columns) if len(columns) > 1 else columns[0]
+    bound = lambda values: tuple_(*values) if len(columns) > 1 else values[0]
+    forward = [c.desc() if descending else c.asc() for c in columns]
+    backward = [c.asc() if descending else c.desc() for c in columns]
+
+    if before is not None:
+        condition = key > bound(before) if descending else key < bound(before)
+        rows = query.filter(condition).order_by(*backward).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after is not None:
+            query = query.filter(key < bound(after) if descending else key > bound(after))
+        rows = query.order_by(*forward).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after is not None
+
+    next_key = key_of(rows[-1]) if rows and has_next else None
+    prev_key = key_of(rows[0]) if rows and has_prev else None
+    return rows, next_key, prev_key